@@ -1,6 +1,10 @@
 from django.contrib import admin
-from .models import Category, Budget, Transaction
+from .models import ArchivedTransaction, ArchivePeriod, BudgetAlert, Category, Budget, RecurringTransaction, Transaction
 
 admin.site.register(Category)
 admin.site.register(Budget)
 admin.site.register(Transaction)
+admin.site.register(ArchivedTransaction)
+admin.site.register(ArchivePeriod)
+admin.site.register(BudgetAlert)
+admin.site.register(RecurringTransaction)
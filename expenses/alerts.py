@@ -0,0 +1,124 @@
+"""
+Batch evaluation of every budget, recording BudgetAlerts
+
+Users are split into shards of consecutive ids. Each shard is evaluated
+with a fixed handful of queries whatever its size: its budgets, their
+BudgetPeriodSpend counters (missing ones come from one grouped ledger
+query) and the alerts already recorded. Shards run across a process
+pool, each worker on its own DB connection.
+"""
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+from django.db import connections
+
+from .budgets import get_percentage, get_period_window, get_spent_amounts, get_status_color
+from .concurrency import setup_worker
+from .models import Budget, BudgetAlert
+
+# Users per shard
+SHARD_SIZE = 1000
+
+# Alert level for each budget status color that warrants one
+ALERT_LEVELS = {
+    'amber': 'warning',
+    'rose': 'exceeded',
+}
+
+
+def get_shards(shard_size=SHARD_SIZE):
+    """
+    Split the users who have budgets into shards of consecutive ids
+
+    Returns:
+        list: Lists of user ids
+    """
+    user_ids = list(Budget.objects.order_by('user_id').values_list('user_id', flat=True).distinct())
+    return [user_ids[index:index + shard_size] for index in range(0, len(user_ids), shard_size)]
+
+
+def evaluate_shard(user_ids, target_date=None):
+    """
+    Evaluate the budgets of some users and record new alerts
+
+    A budget gets at most one alert per level per period: alerts already
+    recorded are skipped, and the unique constraint settles any race
+    with a concurrent sweep.
+
+    Args:
+        user_ids: Users to evaluate
+        target_date: Optional date to evaluate for (defaults to today)
+
+    Returns:
+        dict: 'users', 'budgets' and 'alerts' (new alerts recorded)
+    """
+    if target_date is None:
+        target_date = date.today()
+    budgets = list(Budget.objects.filter(user_id__in=user_ids).order_by('id'))
+
+    alerts = []
+    for budget, spent in zip(budgets, get_spent_amounts(budgets, target_date)):
+        percentage = get_percentage(budget.amount, spent)
+        level = ALERT_LEVELS.get(get_status_color(percentage))
+        if level is None:
+            continue
+        alerts.append(BudgetAlert(
+            budget=budget,
+            user_id=budget.user_id,
+            period_start=get_period_window(budget, target_date)[0],
+            level=level,
+            spent=spent,
+            percentage=percentage,
+        ))
+
+    if alerts:
+        recorded = set(BudgetAlert.objects.filter(
+            budget_id__in={alert.budget_id for alert in alerts},
+            period_start__in={alert.period_start for alert in alerts},
+        ).values_list('budget_id', 'period_start', 'level'))
+        alerts = [
+            alert for alert in alerts
+            if (alert.budget_id, alert.period_start, alert.level) not in recorded
+        ]
+        BudgetAlert.objects.bulk_create(alerts, ignore_conflicts=True)
+    return {'users': len(user_ids), 'budgets': len(budgets), 'alerts': len(alerts)}
+
+
+def evaluate_all(workers=1, shard_size=SHARD_SIZE, target_date=None):
+    """
+    Evaluate every budget of every user, shard by shard
+
+    Args:
+        workers: Processes to run shards in; 1 runs them in this process
+        shard_size: Users per shard
+        target_date: Optional date to evaluate for (defaults to today)
+
+    Returns:
+        dict: Totals of evaluate_shard's counts, plus 'shards', 'workers'
+            and 'seconds'
+    """
+    if target_date is None:
+        target_date = date.today()
+    started = time.perf_counter()
+    shards = get_shards(shard_size)
+
+    if workers > 1 and len(shards) > 1:
+        # Forked workers must not reuse this process's connections
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=setup_worker) as pool:
+            results = list(pool.map(evaluate_shard, shards, [target_date] * len(shards)))
+    else:
+        workers = 1
+        results = [evaluate_shard(shard, target_date) for shard in shards]
+
+    totals = {'users': 0, 'budgets': 0, 'alerts': 0}
+    for result in results:
+        for name in totals:
+            totals[name] += result[name]
+    return {
+        **totals,
+        'shards': len(shards),
+        'workers': workers,
+        'seconds': time.perf_counter() - started,
+    }
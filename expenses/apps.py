@@ -6,4 +6,5 @@ class ExpensesConfig(AppConfig):
     name = 'expenses'
 
     def ready(self):
+        import expenses.checks  # Register system checks
         import expenses.signals  # Register signals
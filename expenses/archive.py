@@ -0,0 +1,248 @@
+"""
+Cold storage for old transactions
+
+archive_transactions moves whole months of a user's ledger into the
+ArchivedTransaction table, keeping an ArchivePeriod row counting every
+archived month. MonthlySummary rollups and budget counters already cover
+both tiers and are left alone, so balances and budgets don't move.
+
+Only months before the hot horizon are archived, and every archived row is
+dated before the user's archive boundary. Queries whose date range starts
+inside the horizon, which is nearly all of them, read the live table
+without even looking the boundary up; the ones reaching further back read
+both tiers (see get_tiers).
+"""
+import heapq
+from datetime import date
+
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.db.models import F, Q
+
+from .caching import bump_data_version
+from .models import ArchivedTransaction, ArchivePeriod, Transaction
+from .pagination import PAGE_SIZE, encode_cursor, paginate_transactions
+from .periods import month_range
+
+# Calendar years kept in the live table, counting the current one
+HOT_YEARS = 2
+
+# Transactions moved per database transaction
+ARCHIVE_BATCH_SIZE = 1000
+
+# Columns copied between the tiers
+LEDGER_FIELDS = (
+    'id', 'user_id', 'category_string', 'category_id', 'transaction_type', 'amount', 'date', 'description',
+    'recurring_id',
+)
+
+
+def get_archive_cutoff(today=None):
+    """
+    Get the first date of the hot horizon, which is never archived
+
+    Raising ARCHIVE_HOT_YEARS later needs the months it brings back into
+    the horizon restored first.
+
+    Returns:
+        date: January 1st of the oldest hot year (ARCHIVE_HOT_YEARS
+            setting, else HOT_YEARS)
+    """
+    if today is None:
+        today = date.today()
+    hot_years = getattr(settings, 'ARCHIVE_HOT_YEARS', HOT_YEARS)
+    return date(today.year - hot_years + 1, 1, 1)
+
+
+def get_archive_boundary(user_id):
+    """
+    Get the date every archived transaction of a user is older than
+
+    Not cached: archiving runs in a separate command process, and the
+    boundary decides which tiers are read, including for budget counters
+    that get stored. It is one lookup on the unique (user, year, month)
+    index.
+
+    Returns:
+        date: The first day after the latest archived month, or date.min
+            when nothing is archived
+    """
+    latest = (
+        ArchivePeriod.objects.filter(user_id=user_id)
+        .order_by('-year', '-month')
+        .values_list('year', 'month')
+        .first()
+    )
+    if latest is None:
+        return date.min
+    return month_range(*latest)[1]
+
+
+def get_tiers(user_id, start=None):
+    """
+    Get the models holding a user's transactions dated start or later
+
+    Args:
+        user_id: Owner of the transactions
+        start: First date of the range, or None for all history
+
+    Returns:
+        list: [Transaction], plus ArchivedTransaction when the range
+            reaches back past the archive boundary
+    """
+    if start is not None and start >= get_archive_cutoff():
+        return [Transaction]
+    boundary = get_archive_boundary(user_id)
+    if boundary == date.min or (start is not None and start >= boundary):
+        return [Transaction]
+    return [Transaction, ArchivedTransaction]
+
+
+def get_tiers_for_users(user_ids, start=None):
+    """
+    Like get_tiers, for a query covering several users at once
+
+    Returns:
+        list: [Transaction], plus ArchivedTransaction when the range
+            leaves the hot horizon
+    """
+    if len(user_ids) == 1:
+        return get_tiers(next(iter(user_ids)), start)
+    if start is not None and start >= get_archive_cutoff():
+        return [Transaction]
+    return [Transaction, ArchivedTransaction]
+
+
+def paginate_ledger(user, cursor=None, page_size=None):
+    """
+    Keyset-paginate a user's live and archived transactions on (-date, -id)
+
+    The archive is only read once a page reaches back past the boundary;
+    pages of newer transactions just look the boundary up.
+
+    Returns:
+        tuple: (list of transactions, next cursor or None)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    if page_size is None:
+        page_size = PAGE_SIZE
+
+    page, next_cursor = paginate_transactions(
+        Transaction.objects.filter(user=user).select_related('category'), cursor, page_size
+    )
+    boundary = get_archive_boundary(user.id)
+    # Archived rows all sort after a full page ending at or after the boundary
+    if boundary == date.min or (next_cursor and page[-1].date >= boundary):
+        return page, next_cursor
+
+    archived, archived_cursor = paginate_transactions(
+        ArchivedTransaction.objects.filter(user=user).select_related('category'), cursor, page_size
+    )
+    merged = list(heapq.merge(page, archived, key=lambda row: (row.date, row.id), reverse=True))
+    if len(merged) > page_size or next_cursor or archived_cursor:
+        merged = merged[:page_size]
+        return merged, encode_cursor(merged[-1])
+    return merged, None
+
+
+def count_periods(rows):
+    """
+    Count rows of LEDGER_FIELDS per month
+
+    Returns:
+        dict: (year, month) -> count
+    """
+    periods = {}
+    for row in rows:
+        key = (row['date'].year, row['date'].month)
+        periods[key] = periods.get(key, 0) + 1
+    return periods
+
+
+def apply_period_deltas(user_id, periods, sign):
+    """
+    Add (sign 1) or remove (sign -1) monthly counts to the ArchivePeriod rows
+
+    Rows left without transactions are deleted. Amounts aren't kept here:
+    MonthlySummary rollups already total both tiers.
+    """
+    for (year, month), count in periods.items():
+        lookup = {'user_id': user_id, 'year': year, 'month': month}
+        updated = ArchivePeriod.objects.filter(**lookup).update(count=F('count') + sign * count)
+        if not updated and sign > 0:
+            ArchivePeriod.objects.create(**lookup, count=count)
+    if sign < 0:
+        ArchivePeriod.objects.filter(user_id=user_id, count=0).delete()
+
+
+def move_transactions(user, source, target, condition, sign, batch_size):
+    """
+    Move a user's rows matching condition from one tier to the other
+
+    Each batch is copied, deleted and summarized in its own DB
+    transaction, so an interrupted run leaves every row in exactly one
+    tier and can simply be run again.
+
+    Returns:
+        int: Number of transactions moved
+    """
+    moved = 0
+    while True:
+        with db_transaction.atomic():
+            rows = list(
+                source.objects.select_for_update()
+                .filter(condition, user=user)
+                .order_by('date', 'id')
+                .values(*LEDGER_FIELDS)[:batch_size]
+            )
+            if not rows:
+                return moved
+            # bulk_create and a raw delete skip save() and the delete signals:
+            # the rollups and budget counters already count both tiers
+            target.objects.bulk_create([target(**row) for row in rows])
+            source.objects.filter(pk__in=[row['id'] for row in rows])._raw_delete(source.objects.db)
+            apply_period_deltas(user.id, count_periods(rows), sign)
+            bump_data_version(user.id)
+        moved += len(rows)
+
+
+def archive_transactions(user, before=None, batch_size=ARCHIVE_BATCH_SIZE):
+    """
+    Move a user's transactions older than a month into the archive
+
+    Args:
+        user: Owner of the transactions
+        before: First date kept live, rounded down to the start of its
+            month (defaults to get_archive_cutoff())
+        batch_size: Transactions moved per DB transaction
+
+    Returns:
+        int: Number of transactions archived
+
+    Raises:
+        ValueError: If before lies after the hot horizon's start
+    """
+    cutoff = get_archive_cutoff()
+    before = (before or cutoff).replace(day=1)
+    if before > cutoff:
+        raise ValueError(f"Only transactions before {cutoff} can be archived")
+    return move_transactions(user, Transaction, ArchivedTransaction, Q(date__lt=before), 1, batch_size)
+
+
+def restore_transactions(user, since=None, batch_size=ARCHIVE_BATCH_SIZE):
+    """
+    Move a user's archived transactions back into the live table
+
+    Args:
+        user: Owner of the transactions
+        since: Restore the months from this date's on (defaults to
+            every archived month)
+        batch_size: Transactions moved per DB transaction
+
+    Returns:
+        int: Number of transactions restored
+    """
+    condition = Q(date__gte=since.replace(day=1)) if since else Q()
+    return move_transactions(user, ArchivedTransaction, Transaction, condition, -1, batch_size)
@@ -0,0 +1,55 @@
+"""
+Async variants of the query-heavy pages, used when ASYNC_VIEWS is on
+
+Under ASGI these run their independent queries concurrently (see
+concurrency.gather_queries) and only render once every result is in.
+"""
+from datetime import date
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.shortcuts import render
+
+from . import views
+from .budgets import summarize_budgets
+from .caching import get_cached
+from .concurrency import gather_queries
+from .routers import read_from_replicas
+from .dashboard import get_user_categories
+from .models import Budget
+
+
+def async_login_required(view):
+    """login_required for async views; Django 4.2's decorator only wraps sync ones"""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        # Resolving request.user loads the session, which is sync-only
+        is_authenticated = await sync_to_async(lambda: request.user.is_authenticated)()
+        if not is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+@async_login_required
+@read_from_replicas
+async def view_budget(request):
+    """Budget page with the summary and category queries run concurrently"""
+    if request.method == 'POST':
+        return await sync_to_async(views.save_budget)(request)
+
+    current_date = date.today()
+    user = request.user
+    budgets = Budget.objects.filter(user=user).select_related('category')
+    results = await gather_queries({
+        'budget_summary': lambda: get_cached(
+            user.id, 'budget_summary',
+            lambda: summarize_budgets(budgets, current_date),
+            current_date,
+        ),
+        'categories': lambda: get_user_categories(user),
+    })
+
+    context = {**results, 'current_date': current_date}
+    return await sync_to_async(render)(request, 'expenses/view_budget_tailwind.html', context)
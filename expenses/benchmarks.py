@@ -0,0 +1,193 @@
+import statistics
+import time
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .money import to_paise
+from .seeding import seed_benchmark_data
+
+# Benchmarked views: (name, HTTP method, URL name, request data)
+VIEWS = [
+    ('dashboard', 'get', 'expenses:dashboard', {}),
+    ('view_budget', 'get', 'expenses:view_budget', {}),
+    ('all_transactions', 'get', 'expenses:transactions', {}),
+    ('search_transactions', 'get', 'expenses:search_transactions', {'q': 'swiggy'}),
+    ('spending_heatmap', 'get', 'expenses:spending_heatmap', {}),
+    ('view_report', 'get', 'expenses:view_report', {}),
+    ('quick_add_transaction', 'post', 'expenses:quick_add_transaction', {
+        'category': 'Food & Dining',
+        'transaction_type': 'Expense',
+        'amount': '250.00',
+        'description': 'Benchmark lunch',
+    }),
+]
+
+# Transactions per user for each benchmark run
+DEFAULT_SIZES = [1000, 10000, 100000]
+
+# Queries timed by time_amount_sums, over a table with category and amount columns
+SUM_QUERIES = [
+    ('sum', 'SELECT SUM(amount) FROM {table}'),
+    ('sum by category', 'SELECT category, SUM(amount) FROM {table} GROUP BY category'),
+]
+
+
+def percentile(values, fraction):
+    """Get a percentile from a sorted list"""
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def time_view(client, method, url, data, repeat):
+    """
+    Time repeated requests to one view with a cold per-user cache
+
+    Returns:
+        dict: Latency statistics in milliseconds plus the query count of
+            the last request
+    """
+    timings = []
+    for _ in range(repeat):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = getattr(client, method)(url, data, secure=True)
+            timings.append((time.perf_counter() - started) * 1000)
+        if response.status_code != 200:
+            raise RuntimeError(f"{method.upper()} {url} returned {response.status_code}")
+
+    timings.sort()
+    return {
+        'queries': len(queries),
+        'p50_ms': round(percentile(timings, 0.50), 2),
+        'p95_ms': round(percentile(timings, 0.95), 2),
+        'mean_ms': round(statistics.mean(timings), 2),
+        'min_ms': round(timings[0], 2),
+    }
+
+
+def run_suite(sizes=DEFAULT_SIZES, users=1, repeat=20, seed=0, progress=None):
+    """
+    Seed data at each size and time every view in VIEWS against it
+
+    Must run against a throwaway database: it creates users and
+    transactions and leaves them behind.
+
+    Args:
+        sizes: Transactions per user for each run
+        users: Users seeded per run; the first one is timed
+        repeat: Timed requests per view, after one warm-up request
+        seed: Random seed for the synthetic data
+        progress: Optional callable(result) invoked after every view
+
+    Returns:
+        list: One dict per (size, view) with the time_view statistics
+    """
+    results = []
+    for size in sizes:
+        user = seed_benchmark_data(users, size, prefix=f'bench{size}', seed=seed)[0]
+        client = Client()
+        client.force_login(user)
+        for name, method, url_name, data in VIEWS:
+            url = reverse(url_name)
+            time_view(client, method, url, data, 1)
+            result = {'view': name, 'size': size, **time_view(client, method, url, data, repeat)}
+            results.append(result)
+            if progress is not None:
+                progress(result)
+    return results
+
+
+def compare_results(baseline, results):
+    """
+    Match results against a baseline run
+
+    Returns:
+        list: (result, baseline result or None) pairs
+    """
+    previous = {(row['view'], row['size']): row for row in baseline}
+    return [(row, previous.get((row['view'], row['size']))) for row in results]
+
+
+def fetch_paise_totals(cursor, sql, storage):
+    """
+    Run a SUM_QUERIES query and get its totals in paise, sorted by group
+
+    Decimal totals are rounded to paise as DecimalField would; SQLite sums
+    decimal columns as floats, so they can be off.
+    """
+    cursor.execute(sql)
+    totals = cursor.fetchall()
+    if storage == 'paise':
+        return sorted((*group, int(value)) for *group, value in totals)
+    return sorted((*group, to_paise(str(value))) for *group, value in totals)
+
+
+def time_amount_sums(rows, repeat=5, progress=None):
+    """
+    Time summing the same amounts stored as decimal rupees and as integer paise
+
+    Fills two temporary tables with identical synthetic amounts, using the
+    column types Django gives DecimalField and BigIntegerField on this
+    database, and times every query in SUM_QUERIES on each.
+
+    Args:
+        rows: Amounts per table
+        repeat: Timed runs per query, after one warm-up run
+        progress: Optional callable(result) invoked after every query
+
+    Returns:
+        list: One dict per (storage, query) with latency statistics,
+            rows per second and whether the total came out exact
+    """
+    tables = {
+        'decimal': connection.data_types['DecimalField'] % {'max_digits': 12, 'decimal_places': 2},
+        'paise': connection.data_types['BigIntegerField'],
+    }
+    results = []
+    with connection.cursor() as cursor:
+        for storage, column_type in tables.items():
+            cursor.execute(f'DROP TABLE IF EXISTS amounts_{storage}')
+            cursor.execute(
+                f'CREATE TEMPORARY TABLE amounts_{storage} '
+                f'(category integer NOT NULL, amount {column_type} NOT NULL)'
+            )
+        # Pseudo-random amounts up to 10,000 rupees, in 12 categories
+        cursor.execute(
+            'INSERT INTO amounts_paise (category, amount) '
+            'WITH RECURSIVE sequence(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM sequence WHERE n < %s) '
+            'SELECT n %% 12, (n * 2654435761) %% 1000000 + 1 FROM sequence',
+            [rows],
+        )
+        cursor.execute('INSERT INTO amounts_decimal (category, amount) SELECT category, amount / 100.0 FROM amounts_paise')
+
+        for name, sql in SUM_QUERIES:
+            expected = fetch_paise_totals(cursor, sql.format(table='amounts_paise'), 'paise')
+            for storage in tables:
+                timings = []
+                for run in range(repeat + 1):
+                    started = time.perf_counter()
+                    totals = fetch_paise_totals(cursor, sql.format(table=f'amounts_{storage}'), storage)
+                    if run:
+                        timings.append((time.perf_counter() - started) * 1000)
+                timings.sort()
+                p50 = percentile(timings, 0.50)
+                result = {
+                    'storage': storage,
+                    'query': name,
+                    'rows': rows,
+                    'p50_ms': round(p50, 2),
+                    'min_ms': round(timings[0], 2),
+                    'rows_per_s': round(rows / max(p50, 1e-6) * 1000),
+                    'exact': totals == expected,
+                }
+                results.append(result)
+                if progress is not None:
+                    progress(result)
+
+        for storage in tables:
+            cursor.execute(f'DROP TABLE amounts_{storage}')
+    return results
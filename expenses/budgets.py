@@ -0,0 +1,354 @@
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction as db_transaction
+from django.db.models import F, Sum
+
+from .archive import get_tiers_for_users
+from .models import Budget, BudgetPeriodSpend, Transaction
+from .money import money
+from .periods import date_range_filter, get_period_range
+
+
+def get_period_window(budget, target_date=None):
+    """
+    Get the half-open date window a budget covers
+
+    Args:
+        budget: Budget instance
+        target_date: Optional date to calculate for (defaults to today)
+
+    Returns:
+        tuple: (start, end) of the budget period; end is None for
+            one-time budgets, which cover everything since start_date
+    """
+    if budget.period in ('monthly', 'yearly'):
+        return get_period_range(budget.period, target_date)
+    return (budget.start_date, None)
+
+
+def compute_spent_amounts(budgets, target_date=None):
+    """
+    Calculate spent amounts for many budgets from the ledger, with a single
+    grouped query
+
+    Budgets sharing a period window (every monthly budget, every yearly
+    budget, one-time budgets with the same start date) share one
+    conditional SUM column, and rows are grouped by user and category.
+    Windows reaching back into the archive sum it with a second query.
+
+    Args:
+        budgets: Iterable of Budget instances, of one user or many
+        target_date: Optional date to calculate for (defaults to today)
+
+    Returns:
+        list: Decimal spent amounts, in the same order as ``budgets``
+    """
+    budgets = list(budgets)
+    if not budgets:
+        return []
+
+    windows = [get_period_window(budget, target_date) for budget in budgets]
+    columns = {window: f'w{index}' for index, window in enumerate(dict.fromkeys(windows))}
+
+    user_ids = {budget.user_id for budget in budgets}
+    earliest = min(start for start, end in windows)
+    totals = {}
+    for model in get_tiers_for_users(user_ids, earliest):
+        transactions = model.objects.filter(user_id__in=user_ids, transaction_type='Expense', date__gte=earliest)
+        if len(user_ids) == 1:
+            # Not for several users: the database would probe the (user,
+            # category) index once per user and category pair
+            transactions = transactions.filter(category_id__in={budget.category_id for budget in budgets})
+        rows = transactions.order_by().values('user_id', 'category_id').annotate(**{
+            alias: Sum('amount', filter=date_range_filter(start, end))
+            for (start, end), alias in columns.items()
+        })
+        for row in rows:
+            category_totals = totals.setdefault((row['user_id'], row['category_id']), {})
+            for alias in columns.values():
+                if row[alias] is not None:
+                    category_totals[alias] = category_totals.get(alias, Decimal('0.00')) + row[alias]
+
+    spent_amounts = []
+    for budget, window in zip(budgets, windows):
+        row = totals.get((budget.user_id, budget.category_id), {})
+        spent_amounts.append(row.get(columns[window]) or Decimal('0.00'))
+    return spent_amounts
+
+
+def get_spent_amounts(budgets, target_date=None):
+    """
+    Get spent amounts for many budgets from their BudgetPeriodSpend counters
+
+    Counters are read with one query. Missing ones (a new period, a
+    changed budget) are computed from the ledger and stored; a concurrent
+    writer that got there first wins.
+
+    Args:
+        budgets: Iterable of Budget instances, of one user or many
+        target_date: Optional date to calculate for (defaults to today)
+
+    Returns:
+        list: Decimal spent amounts, in the same order as ``budgets``
+    """
+    budgets = list(budgets)
+    if not budgets:
+        return []
+
+    buckets = [(budget.id, get_period_window(budget, target_date)[0]) for budget in budgets]
+    stored = {
+        (row['budget_id'], row['period_start']): row['spent']
+        for row in BudgetPeriodSpend.objects.filter(
+            budget_id__in={budget_id for budget_id, period_start in buckets},
+            period_start__in={period_start for budget_id, period_start in buckets},
+        ).values('budget_id', 'period_start', 'spent')
+    }
+
+    missing = [budget for budget, bucket in zip(budgets, buckets) if bucket not in stored]
+    if missing:
+        rows = []
+        for budget, spent in zip(missing, compute_spent_amounts(missing, target_date)):
+            period_start = get_period_window(budget, target_date)[0]
+            stored[(budget.id, period_start)] = spent
+            rows.append(BudgetPeriodSpend(budget=budget, period_start=period_start, spent=spent))
+        BudgetPeriodSpend.objects.bulk_create(rows, ignore_conflicts=True)
+
+    return [stored[bucket] for bucket in buckets]
+
+
+def get_spend_state(transaction):
+    """
+    Get what a transaction contributes to budget counters
+
+    Returns:
+        tuple: (category_id, date, amount), or None for rows no budget
+            counts (income, uncategorized)
+    """
+    if transaction.transaction_type != 'Expense' or transaction.category_id is None:
+        return None
+    opts = Transaction._meta
+    return (
+        transaction.category_id,
+        opts.get_field('date').to_python(transaction.date),
+        opts.get_field('amount').to_python(transaction.amount),
+    )
+
+
+def get_budget_buckets(budgets, transaction_date):
+    """
+    Yield the (budget id, period start) counters an expense on a date counts towards
+
+    Mirrors get_period_window: monthly and yearly budgets count the
+    period containing the date, one-time budgets everything since
+    start_date.
+    """
+    for budget in budgets:
+        if budget.period in ('monthly', 'yearly'):
+            yield budget.id, get_period_range(budget.period, transaction_date)[0]
+        elif transaction_date >= budget.start_date:
+            yield budget.id, budget.start_date
+
+
+def collect_spend_deltas(changes, deltas=None):
+    """
+    Sum expense changes per budget counter
+
+    Args:
+        changes: Iterable of (spend state, sign) pairs, sign being 1 for
+            an added expense and -1 for a removed one
+        deltas: Optional dict from a previous call to keep adding to
+
+    Returns:
+        dict: (budget id, period start) -> Decimal delta
+    """
+    if deltas is None:
+        deltas = {}
+    changes = [(state, sign) for state, sign in changes if state is not None]
+    if not changes:
+        return deltas
+
+    budgets = {}
+    for budget in Budget.objects.filter(
+        category_id__in={state[0] for state, sign in changes}
+    ).only('id', 'category_id', 'period', 'start_date'):
+        budgets.setdefault(budget.category_id, []).append(budget)
+
+    for (category_id, transaction_date, amount), sign in changes:
+        for bucket in get_budget_buckets(budgets.get(category_id, ()), transaction_date):
+            deltas[bucket] = deltas.get(bucket, 0) + sign * amount
+    return deltas
+
+
+def _create_counter(budget_id, period_start, spent, delta):
+    try:
+        with db_transaction.atomic():
+            BudgetPeriodSpend.objects.create(budget_id=budget_id, period_start=period_start, spent=spent)
+    except IntegrityError:
+        BudgetPeriodSpend.objects.filter(
+            budget_id=budget_id, period_start=period_start
+        ).update(spent=F('spent') + money(delta))
+
+
+def _create_counters(missing):
+    # Computed from the ledger, which already includes this transaction's
+    # own writes, so the deltas only matter if someone else creates a
+    # counter first. Counters sharing a period start share one query.
+    budgets = Budget.objects.in_bulk({budget_id for budget_id, period_start in missing})
+    groups = {}
+    for budget_id, period_start in missing:
+        groups.setdefault(period_start, []).append(budgets[budget_id])
+
+    spent = {}
+    for period_start, group in groups.items():
+        for budget, amount in zip(group, compute_spent_amounts(group, period_start)):
+            spent[(budget.id, period_start)] = amount
+
+    try:
+        with db_transaction.atomic():
+            BudgetPeriodSpend.objects.bulk_create([
+                BudgetPeriodSpend(budget_id=budget_id, period_start=period_start, spent=amount)
+                for (budget_id, period_start), amount in spent.items()
+            ])
+    except IntegrityError:
+        for (budget_id, period_start), amount in spent.items():
+            _create_counter(budget_id, period_start, amount, missing[(budget_id, period_start)])
+
+
+def apply_spend_deltas(deltas):
+    """
+    Apply summed deltas from collect_spend_deltas with F() updates
+
+    Must run inside the same DB transaction as the ledger writes. Counters
+    that don't exist yet are created from the ledger.
+    """
+    missing = {}
+    for (budget_id, period_start), delta in deltas.items():
+        if not delta:
+            continue
+        updated = BudgetPeriodSpend.objects.filter(
+            budget_id=budget_id, period_start=period_start
+        ).update(spent=F('spent') + money(delta))
+        if not updated:
+            missing[(budget_id, period_start)] = delta
+    if missing:
+        _create_counters(missing)
+
+
+def record_spend_change(previous, transaction):
+    """
+    Move a saved transaction's contribution between budget counters
+
+    Must run inside the same DB transaction as the save.
+
+    Args:
+        previous: Spend state before the save, or None
+        transaction: The saved Transaction instance
+
+    Returns:
+        tuple: The new spend state
+    """
+    current = get_spend_state(transaction)
+    if previous != current:
+        apply_spend_deltas(collect_spend_deltas([(previous, -1), (current, 1)]))
+    return current
+
+
+def record_spend_delete(transaction):
+    """Remove a deleted transaction's contribution from its budget counters"""
+    state = getattr(transaction, '_spend_state', None) or get_spend_state(transaction)
+    apply_spend_deltas(collect_spend_deltas([(state, -1)]))
+
+
+def reset_spend(budget):
+    """Drop a budget's counters, e.g. after its category or period changed"""
+    BudgetPeriodSpend.objects.filter(budget=budget).delete()
+
+
+def reconcile_spend(budgets=None, fix=True):
+    """
+    Compare stored budget counters with the ledger
+
+    Args:
+        budgets: Optional queryset of budgets to limit to
+        fix: Overwrite drifted counters with the ledger value
+
+    Returns:
+        list: (counter, expected spent) for every drifted counter
+    """
+    counters = BudgetPeriodSpend.objects.select_related('budget')
+    if budgets is not None:
+        counters = counters.filter(budget__in=budgets)
+
+    groups = {}
+    for counter in counters:
+        groups.setdefault(counter.period_start, []).append(counter)
+
+    mismatches = []
+    for period_start, group in groups.items():
+        # Counters are keyed by period start, which lies inside the period
+        expected = compute_spent_amounts([counter.budget for counter in group], period_start)
+        for counter, spent in zip(group, expected):
+            if counter.spent != spent:
+                mismatches.append((counter, spent))
+                if fix:
+                    BudgetPeriodSpend.objects.filter(pk=counter.pk).update(spent=spent)
+    return mismatches
+
+
+def get_percentage(amount, spent):
+    """
+    Calculate percentage of a budget amount that has been spent
+
+    Returns:
+        int: Percentage used (0-100+)
+    """
+    if amount == 0:
+        return 0
+    return int((spent / amount) * 100)
+
+
+def get_status_color(percentage):
+    """
+    Get color for a budget percentage
+
+    Returns:
+        str: 'emerald' (< 80%), 'amber' (80-99%), 'rose' (100%+)
+    """
+    if percentage >= 100:
+        return 'rose'
+    elif percentage >= 80:
+        return 'amber'
+    return 'emerald'
+
+
+def summarize_budgets(budgets, target_date=None):
+    """
+    Build ready-made summary rows for the budget page
+
+    Args:
+        budgets: Iterable of Budget instances belonging to one user,
+            ideally with ``select_related('category')``
+        target_date: Optional date to calculate for (defaults to today)
+
+    Returns:
+        list: One dict per budget with spent, remaining and status data
+    """
+    budgets = list(budgets)
+    spent_amounts = get_spent_amounts(budgets, target_date)
+
+    budget_summary = []
+    for budget, spent in zip(budgets, spent_amounts):
+        percentage = get_percentage(budget.amount, spent)
+        budget_summary.append({
+            'id': budget.id,
+            'category': budget.category.name,
+            'total_budget': budget.amount,
+            'total_expenses': spent,
+            'remaining_budget': budget.amount - spent,
+            'percentage': percentage,
+            'period_text': budget.get_period_display_text(target_date),
+            'status_color': get_status_color(percentage),
+            'is_over_budget': spent > budget.amount,
+            'period': budget.period,
+        })
+    return budget_summary
@@ -0,0 +1,86 @@
+import contextvars
+import time
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, router, transaction as db_transaction
+
+from .models import UserDataVersion
+
+# Versions already read while handling the current request, so each user's
+# is queried once per request; set up by DataVersionMiddleware
+request_versions = contextvars.ContextVar('finance_data_versions', default=None)
+
+
+def get_data_version(user_id):
+    """
+    Get the current data version of a user
+
+    Read from the database with one primary-key lookup, so a write made by
+    any process (another worker, a cron command) is seen by every other one
+    whatever the cache backend. Users whose data hasn't changed since
+    versions were tracked are at version 0.
+    """
+    known = request_versions.get()
+    # Per database: a replica's version may lag the primary's, and must
+    # only key data read from that same replica
+    key = (router.db_for_read(UserDataVersion), user_id)
+    if known is not None and key in known:
+        return known[key]
+    versions = UserDataVersion.objects.using(key[0]).filter(user_id=user_id).values_list('version', flat=True)
+    version = versions[0] if versions else 0
+    if known is not None:
+        known[key] = version
+    return version
+
+
+def _store_data_version(user_id):
+    version = time.time_ns()
+    try:
+        with db_transaction.atomic():
+            UserDataVersion.objects.bulk_create(
+                [UserDataVersion(user_id=user_id, version=version)],
+                update_conflicts=True, unique_fields=['user'], update_fields=['version'],
+            )
+    except IntegrityError:
+        return  # The user was deleted concurrently
+    known = request_versions.get()
+    if known is not None:
+        known[(DEFAULT_DB_ALIAS, user_id)] = version
+
+
+def bump_data_version(user_id):
+    """
+    Invalidate everything cached for a user
+
+    Runs once the surrounding DB transaction commits, so a concurrent
+    request can't cache pre-commit data under the new version.
+    """
+    db_transaction.on_commit(lambda: _store_data_version(user_id))
+
+
+def user_cache_key(user_id, name, *parts):
+    """Build a cache key tied to the user's current data version"""
+    suffix = ':'.join(str(part) for part in parts)
+    return f'finance:{name}:{user_id}:{get_data_version(user_id)}:{suffix}'
+
+
+def get_cached(user_id, name, compute, *parts):
+    """
+    Get a per-user value from the cache, computing and storing it on a miss
+
+    Args:
+        user_id: Owner of the data
+        name: Kind of value, e.g. 'dashboard'
+        compute: Zero-argument callable producing the value
+        *parts: Extra key parts, e.g. the date the value was computed for
+
+    Returns:
+        The cached or freshly computed value
+    """
+    key = user_cache_key(user_id, name, *parts)
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value)
+    return value
+
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Warn when deploying with a cache that each worker process keeps to itself
+
+    Cached pages and searches are keyed on the user's data version, which
+    lives in the database, so they stay correct; but every worker then
+    computes and holds its own copy, and a write made by one worker or a
+    command only drops entries lazily in the others.
+    """
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [Warning(
+        f"The default cache ({backend}) is local to each process.",
+        hint=(
+            "Deployments with more than one worker or instance should set CACHE_BACKEND "
+            "and CACHE_LOCATION to shared storage, e.g. Redis."
+        ),
+        id='expenses.W001',
+    )]
@@ -0,0 +1,59 @@
+import asyncio
+
+import django
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections, connection, connections
+
+
+def _run_in_worker(query):
+    try:
+        return query()
+    finally:
+        # Worker threads never see request_finished, which is where Django
+        # otherwise closes connections. Apply CONN_MAX_AGE here: with the
+        # default of 0 the connection is closed after each query, and a
+        # longer age lets the thread reuse it for that long.
+        close_old_connections()
+
+
+async def gather_queries(queries):
+    """
+    Run independent, read-only ORM queries concurrently
+
+    Each query runs in its own worker thread, and so on its own DB
+    connection, which is what lets them overlap; Django's async ORM would
+    otherwise queue them all on the request's single sync thread. When the
+    request is inside a transaction (ATOMIC_REQUESTS, tests) the queries run
+    one after another on its connection instead, so they see its writes.
+
+    Args:
+        queries: dict of name -> zero-argument callable returning a fully
+            evaluated result (lists, not querysets)
+
+    Returns:
+        dict: name -> result
+    """
+    in_transaction = await sync_to_async(lambda: connection.in_atomic_block)()
+    if in_transaction:
+        run_all = sync_to_async(lambda: {name: query() for name, query in queries.items()})
+        return await run_all()
+
+    results = await asyncio.gather(*(
+        sync_to_async(_run_in_worker, thread_sensitive=False)(query)
+        for query in queries.values()
+    ))
+    return dict(zip(queries, results))
+
+
+def setup_worker():
+    """
+    Prepare a process-pool worker for ORM work
+
+    Spawned workers start without Django set up; forked ones inherit the
+    parent's DB connections, which must not be shared between processes.
+    Either way the worker ends up with its own connections. Use it as the
+    pool's initializer, and keep it in a module without model imports so
+    spawned workers can load it.
+    """
+    django.setup()
+    connections.close_all()
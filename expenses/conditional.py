@@ -0,0 +1,85 @@
+"""
+Conditional GET for pages that only change with the user's data
+
+The ETag and Last-Modified headers come from the per-user data version
+(see caching.get_data_version), a database row which every Transaction,
+Budget and Category write bumps, so every worker sees a write as soon as
+it commits. A matching If-None-Match/If-Modified-Since is answered with
+304 after that one lookup, before the view runs any query or renders
+anything.
+"""
+import hashlib
+from datetime import date
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.middleware.csrf import get_token
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from .caching import get_data_version
+
+
+def get_validators(request):
+    """
+    Get the ETag and Last-Modified timestamp for the request's user
+
+    Besides the data version, the ETag covers the date (pages show today's
+    calendar) and the CSRF cookie (pages embed a token derived from it).
+
+    Returns:
+        tuple: (quoted ETag, Last-Modified as a POSIX timestamp)
+    """
+    version = get_data_version(request.user.id)
+    # Creates the CSRF secret on a first visit, so that visit's ETag already
+    # matches the cookie the browser sends next time
+    get_token(request)
+    parts = [request.user.id, version, date.today(), request.META['CSRF_COOKIE']]
+    digest = hashlib.md5(':'.join(str(part) for part in parts).encode(), usedforsecurity=False).hexdigest()
+    return quote_etag(digest), version // 1_000_000_000
+
+
+def _respond(request, validators):
+    """Get the 304 response if the client's copy is current, else None"""
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    etag, last_modified = validators
+    return get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+
+def _add_validators(response, validators):
+    """Set ETag, Last-Modified and Cache-Control on 200 and 304 responses"""
+    etag, last_modified = validators
+    if response.status_code in (200, 304):
+        response.headers.setdefault('ETag', etag)
+        response.headers.setdefault('Last-Modified', http_date(last_modified))
+        # Let browsers keep the page but check back every time
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def condition_on_user_data(view):
+    """
+    Answer GET/HEAD with 304 while the user's data is unchanged
+
+    Wraps sync and async views; apply it inside login_required so
+    anonymous requests are redirected first.
+    """
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            validators = await sync_to_async(get_validators)(request)
+            response = _respond(request, validators)
+            if response is None:
+                response = await view(request, *args, **kwargs)
+            return _add_validators(response, validators)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        validators = get_validators(request)
+        response = _respond(request, validators)
+        if response is None:
+            response = view(request, *args, **kwargs)
+        return _add_validators(response, validators)
+    return wrapper
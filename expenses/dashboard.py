@@ -0,0 +1,199 @@
+import bisect
+import calendar
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from django.db.models import Count, Q, Sum
+
+from . import rollups
+from .archive import get_tiers
+from .caching import get_cached
+from .models import Category, Transaction
+from .periods import date_range_filter, get_period_range
+
+# Shading levels for days with spending; 0 is reserved for days without
+HEATMAP_LEVELS = 4
+
+
+def get_recent_transactions(user, limit=5):
+    """Get the user's latest transactions for the Recent Activity card; the archive is never recent"""
+    return list(
+        Transaction.objects.filter(user=user).select_related('category').order_by('-date', '-id')[:limit]
+    )
+
+
+def get_daily_totals(user, start, end):
+    """
+    Aggregate the user's transactions per day in the database
+
+    Archived days are included when the range reaches back into the archive.
+
+    Args:
+        user: Owner of the transactions
+        start: First date included
+        end: First date excluded
+
+    Returns:
+        dict: date -> {'count', 'income', 'expense'} for days with transactions
+    """
+    totals = {}
+    for model in get_tiers(user.id, start):
+        rows = (
+            model.objects.filter(date_range_filter(start, end), user=user)
+            .order_by()
+            .values('date')
+            .annotate(
+                count=Count('id'),
+                income=Sum('amount', filter=Q(transaction_type='Income')),
+                expense=Sum('amount', filter=Q(transaction_type='Expense')),
+            )
+        )
+        for row in rows:
+            day = totals.setdefault(row['date'], {'count': 0, 'income': Decimal('0'), 'expense': Decimal('0')})
+            day['count'] += row['count']
+            day['income'] += row['income'] or Decimal('0')
+            day['expense'] += row['expense'] or Decimal('0')
+    return totals
+
+
+def get_transaction_days(user, today):
+    """
+    Get the current month's per-day totals for the calendar
+
+    Returns:
+        dict: day of month -> {'count', 'income', 'expense'}
+    """
+    start, end = get_period_range('monthly', today)
+    return {day.day: totals for day, totals in get_daily_totals(user, start, end).items()}
+
+
+def get_heatmap_level(expense, expenses):
+    """
+    Map a day's spending to a shading level
+
+    Args:
+        expense: The day's spending
+        expenses: Sorted non-zero spending of every day in the range
+
+    Returns:
+        int: 0 for no spending, else 1 to HEATMAP_LEVELS by quantile
+    """
+    if not expense:
+        return 0
+    rank = bisect.bisect_right(expenses, expense)
+    return -(-rank * HEATMAP_LEVELS // len(expenses))  # Ceiling division
+
+
+def compute_heatmap(user, year):
+    """
+    Build a year of daily spending as weeks of day cells
+
+    Days are shaded by the quartile their spending falls in among the
+    year's days with any spending, so one large purchase doesn't wash out
+    the rest of the year.
+
+    Args:
+        user: Owner of the transactions
+        year: Calendar year
+
+    Returns:
+        dict: 'weeks' (Sunday-first lists of cells, None outside the
+            year), 'total_expense', 'active_days' and 'levels', the
+            number of shades above zero
+    """
+    start, end = date(year, 1, 1), date(year + 1, 1, 1)
+    totals = get_daily_totals(user, start, end)
+    expenses = sorted(day['expense'] for day in totals.values() if day['expense'])
+
+    empty = {'count': 0, 'income': Decimal('0'), 'expense': Decimal('0')}
+    weeks = []
+    week = [None] * ((start.weekday() + 1) % 7)  # Pad up to the first day; weeks start on Sunday
+    day = start
+    while day < end:
+        day_totals = totals.get(day, empty)
+        week.append({
+            'date': day,
+            'count': day_totals['count'],
+            'expense': day_totals['expense'],
+            'level': get_heatmap_level(day_totals['expense'], expenses),
+        })
+        if len(week) == 7:
+            weeks.append(week)
+            week = []
+        day += timedelta(days=1)
+    if week:
+        weeks.append(week + [None] * (7 - len(week)))
+
+    return {
+        'weeks': weeks,
+        'total_expense': sum(expenses, Decimal('0')),
+        'active_days': len(totals),
+        'levels': HEATMAP_LEVELS,
+    }
+
+
+def get_heatmap(user, year):
+    """Get the spending heatmap, cached until the user's data version changes"""
+    return get_cached(user.id, 'heatmap', lambda: compute_heatmap(user, year), year)
+
+
+def get_user_categories(user):
+    """Get the user's categories for the dropdowns"""
+    return list(Category.objects.filter(user=user).order_by('name'))
+
+
+def get_calendar_context(current_date):
+    """
+    Build the data-independent calendar part of the dashboard context
+
+    Args:
+        current_date: datetime the dashboard is rendered for
+
+    Returns:
+        dict: Month, year and (day, weekday) pairs for the calendar
+    """
+    # Generate the calendar for the current month
+    cal = calendar.Calendar(firstweekday=6)  # 6 = Sunday
+    return {
+        # First day of the current month
+        'current_month_date': datetime(current_date.year, current_date.month, 1),
+        'current_year': current_date.year,
+        'current_date': current_date,
+        'month_days': cal.itermonthdays2(current_date.year, current_date.month),  # (day, weekday)
+    }
+
+
+def get_monthly_cashflow(user, today):
+    """Get the current month's income and spending for the Cash Flow cards"""
+    cashflow = rollups.get_cashflow(user, today.year, today.month)
+    return {'monthly_income': cashflow['incoming'], 'monthly_expense': cashflow['outgoing']}
+
+
+# Dashboard panels, each served and cached on its own: name -> callable(user, today)
+# returning the panel's data; the template is partials/dashboard_<name>.html
+DASHBOARD_PANELS = {
+    # Balance, cash flow and categories come from the monthly rollup table
+    'balance': lambda user, today: {'total_balance': rollups.get_balance(user)},
+    'cashflow': get_monthly_cashflow,
+    'recent': lambda user, today: {'last_three_transactions': get_recent_transactions(user)},
+    'calendar': lambda user, today: {'transaction_days': get_transaction_days(user, today)},
+    'categories': lambda user, today: {
+        'category_spending': rollups.get_category_spending(user, today.year, today.month),
+    },
+}
+
+
+def get_panel_data(user, panel, today):
+    """
+    Get one dashboard panel's data, cached until the user's data version changes
+
+    Args:
+        user: Owner of the data
+        panel: Name in DASHBOARD_PANELS
+        today: Date the dashboard is shown for
+
+    Returns:
+        dict: The panel's part of the template context
+    """
+    compute = DASHBOARD_PANELS[panel]
+    return get_cached(user.id, f'dashboard_{panel}', lambda: compute(user, today), today)
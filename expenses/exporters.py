@@ -0,0 +1,82 @@
+import csv
+import heapq
+import json
+from operator import itemgetter
+
+from .archive import get_tiers
+
+# Rows fetched per database round trip while streaming
+CHUNK_SIZE = 2000
+
+EXPORT_COLUMNS = ['date', 'type', 'amount', 'category', 'description']
+EXPORT_FIELDS = ['date', 'transaction_type', 'amount', 'category__name', 'description']
+
+
+class Echo:
+    """File-like object whose write() just returns the line, for csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def get_export_rows(user, start=None, end=None, category_ids=None):
+    """
+    Stream a user's ledger as tuples, oldest first
+
+    Only the exported columns are selected and rows are fetched CHUNK_SIZE
+    at a time (server-side cursors on PostgreSQL), so memory stays flat
+    whatever the ledger size. Archived transactions in the range are
+    merged in by date.
+
+    Args:
+        user: Owner of the transactions
+        start: Optional first date included
+        end: Optional last date included
+        category_ids: Optional list of category ids to limit to
+
+    Returns:
+        iterator: Tuples in EXPORT_FIELDS order
+    """
+    tiers = []
+    for model in get_tiers(user.id, start):
+        transactions = model.objects.filter(user=user)
+        if start:
+            transactions = transactions.filter(date__gte=start)
+        if end:
+            transactions = transactions.filter(date__lte=end)
+        if category_ids:
+            transactions = transactions.filter(category_id__in=category_ids)
+        tiers.append(transactions.order_by('date', 'id').values_list(*EXPORT_FIELDS).iterator(chunk_size=CHUNK_SIZE))
+
+    if len(tiers) == 1:
+        return tiers[0]
+    return heapq.merge(*tiers, key=itemgetter(0))
+
+
+def stream_csv(rows):
+    """Yield CSV lines, header first"""
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_COLUMNS)
+    for transaction_date, transaction_type, amount, category, description in rows:
+        yield writer.writerow([
+            transaction_date.isoformat(), transaction_type, amount, category or '', description or '',
+        ])
+
+
+def stream_ndjson(rows):
+    """Yield one JSON object per line"""
+    for transaction_date, transaction_type, amount, category, description in rows:
+        yield json.dumps({
+            'date': transaction_date.isoformat(),
+            'type': transaction_type,
+            # Keep amounts as strings so no precision is lost to floats
+            'amount': str(amount),
+            'category': category,
+            'description': description,
+        }) + '\n'
+
+
+FORMATS = {
+    'csv': (stream_csv, 'text/csv', 'csv'),
+    'ndjson': (stream_ndjson, 'application/x-ndjson', 'ndjson'),
+}
@@ -0,0 +1,116 @@
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+CARD_TEMPLATE = 'expenses/partials/transaction_card_tailwind.html'
+
+
+class FragmentCache:
+    """
+    Per-process LRU cache of rendered HTML fragments
+
+    Entries are stored per object id together with the version they were
+    rendered from; a lookup with any other version is a miss.
+
+    Args:
+        max_entries: Fragments kept before the least recently used go
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # id -> (version, html)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, version):
+        """Get the HTML rendered for a key at a version, or None"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, version, html):
+        with self.lock:
+            self.entries[key] = (version, html)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def discard(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        """Drop every fragment and reset the counters"""
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """
+        Get the cache counters
+
+        Returns:
+            dict: hits, misses, evictions, entries, max_entries and
+                hit_rate (0-1, or None before the first lookup)
+        """
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self.entries),
+                'max_entries': self.max_entries,
+                'hit_rate': self.hits / lookups if lookups else None,
+            }
+
+
+card_cache = FragmentCache(getattr(settings, 'FRAGMENT_CACHE_SIZE', 5000))
+
+
+def get_card_version(transaction):
+    """Get everything a transaction card displays, so any change is a new version"""
+    category = transaction.category
+    return (
+        transaction.transaction_type,
+        str(transaction.amount),
+        str(transaction.date),
+        transaction.description,
+        category.name if category else None,
+        transaction.is_archived,
+    )
+
+
+def render_transaction_cards(transactions):
+    """
+    Render transaction cards, reusing cached HTML for unchanged ones
+
+    Only cards missing from the cache, or rendered from an older version
+    of their transaction, go through the template.
+
+    Args:
+        transactions: Transactions with their category already loaded
+
+    Returns:
+        SafeString: The cards' concatenated HTML
+    """
+    cards = []
+    for transaction in transactions:
+        version = get_card_version(transaction)
+        html = card_cache.get(transaction.pk, version)
+        if html is None:
+            html = render_to_string(CARD_TEMPLATE, {'transaction': transaction})
+            card_cache.set(transaction.pk, version, html)
+        cards.append(html)
+    return mark_safe(''.join(cards))
@@ -0,0 +1,231 @@
+import csv
+import re
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction as db_transaction
+
+from . import budgets, rollups
+from .caching import bump_data_version
+from .models import Category, Transaction
+
+# Rows written per bulk_create/atomic batch
+BATCH_SIZE = 1000
+
+# Row errors kept for the report; further errors are only counted
+MAX_REPORTED_ERRORS = 500
+
+# Accepted besides ISO dates
+DATE_FORMATS = ['%d/%m/%Y', '%d-%m-%Y', '%d/%m/%y', '%Y%m%d']
+
+# Largest absolute amount Transaction.amount (max_digits=10, decimal_places=2) can hold
+MAX_AMOUNT = Decimal('99999999.99')
+
+
+class RowError(ValueError):
+    """A single input row could not be imported"""
+
+
+def parse_date(value):
+    """Parse an ISO date, or one in any of DATE_FORMATS"""
+    value = value.strip()
+    try:
+        # Fast path for ISO dates, by far the most common in exports
+        return date.fromisoformat(value)
+    except ValueError:
+        pass
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).date()
+        except ValueError:
+            continue
+    raise RowError(f"Unrecognised date '{value}'")
+
+
+def parse_amount(value):
+    """Parse a (possibly signed) amount, rounded to paise"""
+    try:
+        amount = Decimal(value.strip().replace(',', '').replace('₹', ''))
+    except InvalidOperation:
+        raise RowError(f"Invalid amount '{value}'")
+    if not amount.is_finite() or abs(amount) > MAX_AMOUNT:
+        raise RowError(f"Amount out of range '{value}'")
+    return amount.quantize(Decimal('0.01'))
+
+
+def parse_transaction_type(value, amount):
+    """Map a type/CR/DR column, or the amount's sign, to a transaction type"""
+    value = (value or '').strip().lower()
+    if value in ('income', 'credit', 'cr'):
+        return 'Income'
+    if value in ('expense', 'debit', 'dr'):
+        return 'Expense'
+    if not value:
+        # Signed amounts without a type column: negative means money out
+        return 'Expense' if amount < 0 else 'Income'
+    raise RowError(f"Unknown transaction type '{value}'")
+
+
+def read_csv(lines):
+    """
+    Stream rows from a CSV file
+
+    Expects a header with date and amount columns, plus optional type (or
+    transaction_type), category and description columns.
+
+    Yields:
+        tuple: (line number, dict of raw values)
+    """
+    reader = csv.DictReader(lines)
+    if reader.fieldnames is None:
+        return
+    reader.fieldnames = [name.strip().lower() for name in reader.fieldnames]
+    missing = {'date', 'amount'} - set(reader.fieldnames)
+    if missing:
+        raise RowError(f"CSV header is missing column(s): {', '.join(sorted(missing))}")
+
+    for row in reader:
+        yield reader.line_num, {
+            'date': row.get('date') or '',
+            'amount': row.get('amount') or '',
+            'type': row.get('type') or row.get('transaction_type') or '',
+            'category': row.get('category') or '',
+            'description': row.get('description') or '',
+        }
+
+
+OFX_TAG = re.compile(r'<(/?)([A-Z0-9.]+)>([^<\r\n]*)')
+
+
+def read_ofx(lines):
+    """
+    Stream <STMTTRN> records from an OFX (SGML or XML) bank statement
+
+    Yields:
+        tuple: (line number, dict of raw values)
+    """
+    record, start_line = None, 0
+    for line_number, line in enumerate(lines, start=1):
+        for closing, tag, value in OFX_TAG.findall(line):
+            if tag == 'STMTTRN':
+                if closing and record is not None:
+                    yield start_line, {
+                        'date': record.get('DTPOSTED', '')[:8],
+                        'amount': record.get('TRNAMT', ''),
+                        'type': {'CREDIT': 'income', 'DEBIT': 'expense'}.get(record.get('TRNTYPE', ''), ''),
+                        'category': '',
+                        'description': record.get('MEMO') or record.get('NAME', ''),
+                    }
+                    record = None
+                elif not closing:
+                    record, start_line = {}, line_number
+            elif record is not None and not closing:
+                record[tag] = value.strip()
+
+
+READERS = {
+    'csv': read_csv,
+    'ofx': read_ofx,
+}
+
+
+class CategoryResolver:
+    """Map category names to ids in memory, creating missing categories once"""
+
+    def __init__(self, user):
+        self.user = user
+        self.ids = {
+            name.lower(): pk
+            for pk, name in Category.objects.filter(user=user).values_list('id', 'name')
+        }
+
+    def resolve(self, name):
+        """Get the id of the named category, or None for a blank name"""
+        name = name.strip()
+        if not name:
+            return None
+        key = name.lower()
+        if key not in self.ids:
+            category, created = Category.objects.get_or_create(
+                user=self.user,
+                name=name[:50],
+                defaults={'icon': 'tag', 'color': '#64748b'}
+            )
+            self.ids[key] = category.id
+        return self.ids[key]
+
+
+def import_transactions(user, lines, file_format='csv', batch_size=BATCH_SIZE, progress=None):
+    """
+    Import transactions for a user from a text stream
+
+    Rows are parsed one at a time and written in bulk_create batches, so
+    memory stays flat however long the file is. The whole import is one DB
+    transaction: rollup and budget counter deltas are summed per bucket
+    across batches and applied once at the end. Invalid rows are skipped and reported.
+
+    Args:
+        user: Owner of the imported transactions
+        lines: Iterable of text lines (an open file works)
+        file_format: 'csv' or 'ofx'
+        batch_size: Rows per bulk_create batch
+        progress: Optional callable(result) invoked after every batch
+
+    Returns:
+        dict: {'processed', 'imported', 'failed', 'errors'} where errors is a
+            list of (line number, message), capped at MAX_REPORTED_ERRORS
+    """
+    if file_format not in READERS:
+        raise ValueError(f"Unsupported import format: {file_format}")
+
+    categories = CategoryResolver(user)
+    result = {'processed': 0, 'imported': 0, 'failed': 0, 'errors': []}
+    batch = []
+    deltas = {}
+    spend_deltas = {}
+
+    def flush():
+        Transaction.objects.bulk_create(batch)
+        # bulk_create skips save(), so track rollup and budget deltas here
+        rollups.collect_deltas(batch, deltas)
+        budgets.collect_spend_deltas(((budgets.get_spend_state(row), 1) for row in batch), spend_deltas)
+        result['imported'] += len(batch)
+        batch.clear()
+        if progress is not None:
+            progress(result)
+
+    with db_transaction.atomic():
+        try:
+            for line_number, row in READERS[file_format](lines):
+                result['processed'] += 1
+                try:
+                    amount = parse_amount(row['amount'])
+                    batch.append(Transaction(
+                        user=user,
+                        date=parse_date(row['date']),
+                        transaction_type=parse_transaction_type(row['type'], amount),
+                        amount=abs(amount),
+                        category_id=categories.resolve(row['category']),
+                        description=row['description'].strip(),
+                    ))
+                except RowError as error:
+                    result['failed'] += 1
+                    if len(result['errors']) < MAX_REPORTED_ERRORS:
+                        result['errors'].append((line_number, str(error)))
+                    continue
+
+                if len(batch) >= batch_size:
+                    flush()
+        except (RowError, csv.Error, UnicodeDecodeError) as error:
+            # The file itself is unreadable past this point
+            result['failed'] += 1
+            result['errors'].append((result['processed'] + 1, str(error)))
+
+        if batch:
+            flush()
+        rollups.apply_deltas(deltas)
+        budgets.apply_spend_deltas(spend_deltas)
+
+    if result['imported']:
+        bump_data_version(user.id)
+    return result
@@ -0,0 +1,59 @@
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from expenses.archive import ARCHIVE_BATCH_SIZE, archive_transactions, get_archive_cutoff, restore_transactions
+
+
+class Command(BaseCommand):
+    help = (
+        "Move transactions older than the hot horizon into the archive table, "
+        "or restore archived months to the live ledger"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', action='append', dest='usernames', metavar='USERNAME',
+            help='Limit to this user (can be repeated)',
+        )
+        parser.add_argument(
+            '--before', type=date.fromisoformat, metavar='YYYY-MM-DD',
+            help='Archive the months before this date\'s (defaults to the ARCHIVE_HOT_YEARS horizon)',
+        )
+        parser.add_argument('--restore', action='store_true', help='Move archived transactions back instead')
+        parser.add_argument(
+            '--since', type=date.fromisoformat, metavar='YYYY-MM-DD',
+            help='With --restore, only restore the months from this date\'s on',
+        )
+        parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE, help='Transactions moved per DB transaction')
+
+    def handle(self, *args, usernames=None, before=None, restore=False, since=None,
+               batch_size=ARCHIVE_BATCH_SIZE, **options):
+        if batch_size < 1:
+            raise CommandError("--batch-size must be at least 1")
+        users = User.objects.order_by('username')
+        if usernames:
+            users = users.filter(username__in=usernames)
+            missing = set(usernames) - set(users.values_list('username', flat=True))
+            if missing:
+                raise CommandError(f"Unknown user(s): {', '.join(sorted(missing))}")
+
+        if not restore:
+            before = before or get_archive_cutoff()
+            self.stdout.write(f"Archiving transactions before {before.replace(day=1)}")
+
+        total = 0
+        for user in users.iterator():
+            if restore:
+                moved = restore_transactions(user, since, batch_size)
+            else:
+                try:
+                    moved = archive_transactions(user, before, batch_size)
+                except ValueError as error:
+                    raise CommandError(str(error))
+            if moved:
+                self.stdout.write(f"{user.username}: {moved}")
+            total += moved
+        verb = 'Restored' if restore else 'Archived'
+        self.stdout.write(self.style.SUCCESS(f"{verb} {total} transaction(s)"))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from expenses.benchmarks import time_amount_sums
+
+
+class Command(BaseCommand):
+    help = (
+        "Time summing the same amounts stored as decimal rupees and as integer "
+        "paise, in temporary tables that are dropped afterwards"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10_000_000, help='Amounts per table')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per query, after one warm-up run')
+
+    def handle(self, *args, rows, repeat, **options):
+        if rows < 1 or repeat < 1:
+            raise CommandError("--rows and --repeat must be at least 1")
+
+        def progress(result):
+            self.stdout.write(
+                f"{result['storage']:<8} {result['query']:<16} p50 {result['p50_ms']:9.1f}ms  "
+                f"{result['rows_per_s'] / 1e6:6.1f}M rows/s  {'exact' if result['exact'] else 'INEXACT'}"
+            )
+
+        self.stdout.write(f"Filling two tables of {rows} amounts")
+        results = time_amount_sums(rows, repeat, progress)
+
+        by_query = {}
+        for result in results:
+            by_query.setdefault(result['query'], {})[result['storage']] = result['p50_ms']
+        for query, timings in by_query.items():
+            self.stdout.write(self.style.SUCCESS(
+                f"{query}: paise {timings['decimal'] / max(timings['paise'], 1e-6):.2f}x as fast as decimal"
+            ))
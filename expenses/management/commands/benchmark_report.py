@@ -0,0 +1,48 @@
+import time
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from expenses.benchmarks import percentile
+from expenses.models import Category
+from expenses.periods import month_window
+from expenses.reports import REPORT_MONTHS, load_columns, summarize_columns
+
+
+class Command(BaseCommand):
+    help = (
+        "Time report generation for one user, split into loading the columns "
+        "from the database and the vectorized calculations"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='User to report on; seed_benchmark_data creates large ones')
+        parser.add_argument('--months', type=int, default=REPORT_MONTHS)
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs, after one warm-up run')
+
+    def handle(self, *args, username, months=REPORT_MONTHS, repeat=5, **options):
+        try:
+            user = User.objects.get(username=username)
+        except User.DoesNotExist:
+            raise CommandError(f"Unknown user: {username}")
+
+        start, end = month_window(date.today(), months)
+        category_names = dict(Category.objects.filter(user=user).values_list('id', 'name'))
+        load_times, compute_times = [], []
+        for run in range(repeat + 1):
+            started = time.perf_counter()
+            columns = load_columns(user, start, end)
+            loaded = time.perf_counter()
+            summarize_columns(columns, start, months, category_names)
+            finished = time.perf_counter()
+            if run:
+                load_times.append((loaded - started) * 1000)
+                compute_times.append((finished - loaded) * 1000)
+
+        self.stdout.write(f"{len(columns['amount'])} transactions over {months} months, {repeat} runs")
+        for label, timings in (('load', load_times), ('compute', compute_times)):
+            timings.sort()
+            self.stdout.write(
+                f"{label:<8} p50 {percentile(timings, 0.50):8.1f}ms  max {timings[-1]:8.1f}ms"
+            )
@@ -0,0 +1,138 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, RequestFactory, override_settings
+from django.urls import reverse
+
+from expenses.benchmarks import percentile
+from expenses.dashboard import DASHBOARD_PANELS
+
+
+def get_page_paths():
+    """Paths of the measured pages: the dashboard shell, each of its panels and the budget page"""
+    return [
+        reverse('expenses:dashboard'),
+        *(reverse('expenses:dashboard_panel', args=[panel]) for panel in DASHBOARD_PANELS),
+        reverse('expenses:view_budget'),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure dashboard, dashboard panel and budget page latency under concurrent load through '
+        'the in-process WSGI or ASGI handler. Compare the two by running it with '
+        'ASYNC_VIEWS=False --handler wsgi and with ASYNC_VIEWS=True --handler asgi'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='User whose pages are requested; give them realistic data')
+        parser.add_argument('--handler', choices=['wsgi', 'asgi'], help='Defaults to asgi when ASYNC_VIEWS is on')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per page')
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--no-cache', action='store_true', help='Bypass the per-user cache so every request queries the DB')
+
+    def handle(self, *args, username, handler=None, requests=200, concurrency=16, no_cache=False, **options):
+        try:
+            user = User.objects.get(username=username)
+        except User.DoesNotExist:
+            raise CommandError(f"Unknown user: {username}")
+
+        handler = handler or ('asgi' if settings.ASYNC_VIEWS else 'wsgi')
+        host = next((host for host in settings.ALLOWED_HOSTS if host[:1] not in ('', '.', '*')), 'localhost')
+        client = Client()
+        client.force_login(user)
+        cookie = f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+
+        self.stdout.write(
+            f"{handler.upper()} handler, {'async' if settings.ASYNC_VIEWS else 'sync'} views, "
+            f"{requests} requests per page, concurrency {concurrency}, cache {'off' if no_cache else 'on'}"
+        )
+        caches = settings.CACHES
+        if no_cache:
+            caches = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+        with override_settings(CACHES=caches):
+            run = self.run_wsgi if handler == 'wsgi' else self.run_asgi
+            for path in get_page_paths():
+                # Warm up connections, templates and (unless disabled) the cache
+                run(path, host, cookie, 1, 1)
+                started = time.perf_counter()
+                latencies, failures = run(path, host, cookie, requests, concurrency)
+                self.report(path, sorted(latencies), failures, time.perf_counter() - started)
+
+    def report(self, path, latencies, failures, elapsed):
+        ms = [latency * 1000 for latency in latencies]
+        line = (
+            f"{path:<28} p50 {percentile(ms, 0.50):7.1f}ms  p95 {percentile(ms, 0.95):7.1f}ms  "
+            f"p99 {percentile(ms, 0.99):7.1f}ms  max {ms[-1]:7.1f}ms  {len(ms) / elapsed:6.1f} req/s"
+        )
+        if failures:
+            self.stdout.write(self.style.ERROR(f"{line}  {failures} non-200 responses"))
+        else:
+            self.stdout.write(line)
+
+    def run_wsgi(self, path, host, cookie, requests, concurrency):
+        """Serve requests from a thread pool, like a threaded WSGI server"""
+        application = WSGIHandler()
+        factory = RequestFactory(HTTP_HOST=host, HTTP_COOKIE=cookie)
+
+        def request(_):
+            statuses = []
+            started = time.perf_counter()
+            response = application(
+                factory.get(path, secure=True).environ,
+                lambda status, headers, exc_info=None: statuses.append(status),
+            )
+            b''.join(response)
+            response.close()
+            return time.perf_counter() - started, statuses[0].startswith('200')
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(request, range(requests)))
+        return [latency for latency, ok in results], sum(not ok for latency, ok in results)
+
+    def run_asgi(self, path, host, cookie, requests, concurrency):
+        """Serve requests from one event loop, like uvicorn"""
+        application = ASGIHandler()
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'https',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': b'',
+            'root_path': '',
+            'headers': [(b'host', host.encode()), (b'cookie', cookie.encode())],
+            'client': ('127.0.0.1', 0),
+            'server': (host, 443),
+        }
+
+        async def request(slots):
+            statuses = []
+
+            async def receive():
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    statuses.append(message['status'])
+
+            async with slots:
+                started = time.perf_counter()
+                await application(dict(scope), receive, send)
+                return time.perf_counter() - started, statuses[0] == 200
+
+        async def main():
+            slots = asyncio.Semaphore(concurrency)
+            return await asyncio.gather(*(request(slots) for _ in range(requests)))
+
+        results = asyncio.run(main())
+        return [latency for latency, ok in results], sum(not ok for latency, ok in results)
@@ -0,0 +1,40 @@
+import os
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from expenses.alerts import SHARD_SIZE, evaluate_all
+
+
+class Command(BaseCommand):
+    help = (
+        "Evaluate every user's budgets and record warning/over-budget alerts, "
+        "with users split into shards run across a process pool"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help='Worker processes (defaults to the CPU count; 1 runs in this process)',
+        )
+        parser.add_argument('--shard-size', type=int, default=SHARD_SIZE, help='Users per shard')
+        parser.add_argument(
+            '--date', type=date.fromisoformat, dest='target_date', metavar='YYYY-MM-DD',
+            help='Evaluate the budget periods containing this date (defaults to today)',
+        )
+
+    def handle(self, *args, workers, shard_size=SHARD_SIZE, target_date=None, **options):
+        if workers < 1 or shard_size < 1:
+            raise CommandError("--workers and --shard-size must be at least 1")
+
+        result = evaluate_all(workers, shard_size, target_date)
+        seconds = max(result['seconds'], 1e-9)
+        self.stdout.write(
+            f"Evaluated {result['budgets']} budget(s) of {result['users']} user(s) "
+            f"in {result['shards']} shard(s) on {result['workers']} worker(s)"
+        )
+        self.stdout.write(
+            f"{result['seconds']:.2f}s: {result['users'] / seconds:.0f} users/s, "
+            f"{result['budgets'] / seconds:.0f} budgets/s"
+        )
+        self.stdout.write(self.style.SUCCESS(f"Recorded {result['alerts']} new alert(s)"))
@@ -0,0 +1,45 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from expenses.importers import BATCH_SIZE, READERS, import_transactions
+
+
+class Command(BaseCommand):
+    help = 'Import transactions for a user from a CSV or OFX file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('path')
+        parser.add_argument('--format', dest='file_format', choices=sorted(READERS), help='Defaults to the file extension')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, username, path, file_format=None, batch_size=BATCH_SIZE, **options):
+        try:
+            user = User.objects.get(username=username)
+        except User.DoesNotExist:
+            raise CommandError(f"Unknown user: {username}")
+
+        file_format = file_format or ('ofx' if path.lower().endswith(('.ofx', '.qfx')) else 'csv')
+        started = time.perf_counter()
+
+        def progress(result):
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"{result['processed']} rows read, {result['imported']} imported, "
+                f"{result['failed']} failed ({result['imported'] / elapsed:.0f} rows/s)"
+            )
+
+        try:
+            with open(path, encoding='utf-8-sig', newline='') as lines:
+                result = import_transactions(user, lines, file_format, batch_size, progress)
+        except OSError as error:
+            raise CommandError(str(error))
+
+        for line_number, message in result['errors']:
+            self.stderr.write(f"Line {line_number}: {message}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result['imported']} of {result['processed']} rows "
+            f"in {time.perf_counter() - started:.1f}s ({result['failed']} failed)"
+        ))
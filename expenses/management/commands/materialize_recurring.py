@@ -0,0 +1,31 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from expenses.recurring import BATCH_SIZE, materialize_due
+
+
+class Command(BaseCommand):
+    help = (
+        "Create the transactions of every due recurring rule, catching up on "
+        "occurrences missed while the scheduler wasn't running"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date', type=date.fromisoformat, dest='today', metavar='YYYY-MM-DD',
+            help='Materialize occurrences up to this date (defaults to today)',
+        )
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Rules per DB transaction')
+
+    def handle(self, *args, today=None, batch_size=BATCH_SIZE, **options):
+        if batch_size < 1:
+            raise CommandError("--batch-size must be at least 1")
+
+        started = time.perf_counter()
+        result = materialize_due(today, batch_size)
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {result['transactions']} transaction(s) from {result['rules']} due rule(s) "
+            f"in {time.perf_counter() - started:.2f}s"
+        ))
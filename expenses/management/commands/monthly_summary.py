@@ -0,0 +1,38 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from expenses.rollups import rebuild_rollups, verify_rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild or verify the MonthlySummary rollup table against the transaction ledger'
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['rebuild', 'verify'])
+        parser.add_argument(
+            '--user', action='append', dest='usernames', metavar='USERNAME',
+            help='Limit to this user (can be repeated)',
+        )
+
+    def handle(self, *args, action, usernames=None, **options):
+        users = None
+        if usernames:
+            users = User.objects.filter(username__in=usernames)
+            missing = set(usernames) - set(users.values_list('username', flat=True))
+            if missing:
+                raise CommandError(f"Unknown user(s): {', '.join(sorted(missing))}")
+
+        if action == 'rebuild':
+            count = rebuild_rollups(users)
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} monthly summary rows"))
+            return
+
+        mismatches = verify_rollups(users)
+        for bucket, stored, expected in mismatches:
+            self.stdout.write(f"{bucket}: stored={stored} expected={expected}")
+        if mismatches:
+            raise CommandError(
+                f"{len(mismatches)} monthly summary bucket(s) out of date; "
+                "run 'manage.py monthly_summary rebuild'"
+            )
+        self.stdout.write(self.style.SUCCESS("Monthly summaries match the ledger"))
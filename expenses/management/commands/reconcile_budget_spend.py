@@ -0,0 +1,38 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from expenses.budgets import reconcile_spend
+from expenses.models import Budget
+
+
+class Command(BaseCommand):
+    help = 'Check BudgetPeriodSpend counters against the transaction ledger and fix any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', action='append', dest='usernames', metavar='USERNAME',
+            help='Limit to this user (can be repeated)',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without fixing it')
+
+    def handle(self, *args, usernames=None, dry_run=False, **options):
+        budgets = None
+        if usernames:
+            users = User.objects.filter(username__in=usernames)
+            missing = set(usernames) - set(users.values_list('username', flat=True))
+            if missing:
+                raise CommandError(f"Unknown user(s): {', '.join(sorted(missing))}")
+            budgets = Budget.objects.filter(user__in=users)
+
+        mismatches = reconcile_spend(budgets, fix=not dry_run)
+        for counter, expected in mismatches:
+            self.stdout.write(
+                f"Budget {counter.budget_id} from {counter.period_start}: "
+                f"stored={counter.spent} expected={expected}"
+            )
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS("Budget counters match the ledger"))
+        elif dry_run:
+            raise CommandError(f"{len(mismatches)} budget counter(s) out of date")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Fixed {len(mismatches)} budget counter(s)"))
@@ -0,0 +1,101 @@
+import json
+import platform
+import subprocess
+from datetime import datetime
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from expenses.benchmarks import DEFAULT_SIZES, compare_results, run_suite
+
+
+def get_commit():
+    """Get the current git commit, if the project is a checkout"""
+    try:
+        result = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+class Command(BaseCommand):
+    help = (
+        'Time the main views at several data sizes against a throwaway test '
+        'database and write the results as JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='Transactions per user')
+        parser.add_argument('--users', type=int, default=1, help='Users seeded per size')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed requests per view')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write the JSON results here')
+        parser.add_argument('--compare', help='Earlier JSON results to compare against')
+
+    def handle(self, *args, sizes, users, repeat, seed, output=None, compare=None, **options):
+        baseline = None
+        if compare:
+            try:
+                with open(compare) as results_file:
+                    baseline = json.load(results_file)
+            except (OSError, ValueError) as error:
+                raise CommandError(f"Can't read {compare}: {error}")
+
+        def progress(result):
+            self.stdout.write(
+                f"{result['size']:>8} {result['view']:<24} {result['queries']:>3} queries  "
+                f"p50 {result['p50_ms']:8.2f}ms  p95 {result['p95_ms']:8.2f}ms"
+            )
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            # Static files needn't be collected to render the pages
+            with override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage'):
+                results = run_suite(sizes, users, repeat, seed, progress)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        report = {
+            'commit': get_commit(),
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'users': users,
+            'repeat': repeat,
+            'seed': seed,
+            'results': results,
+        }
+        if output:
+            with open(output, 'w') as results_file:
+                json.dump(report, results_file, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {output}"))
+
+        if baseline:
+            self.write_comparison(baseline, results)
+
+    def write_comparison(self, baseline, results):
+        self.stdout.write(f"\nCompared with {baseline.get('commit') or 'baseline'}:")
+        for row, previous in compare_results(baseline['results'], results):
+            label = f"{row['size']:>8} {row['view']:<24}"
+            if previous is None:
+                self.stdout.write(f"{label} (new)")
+                continue
+            change = (row['p50_ms'] - previous['p50_ms']) / previous['p50_ms'] * 100 if previous['p50_ms'] else 0
+            line = (
+                f"{label} p50 {previous['p50_ms']:8.2f} -> {row['p50_ms']:8.2f}ms ({change:+.0f}%)  "
+                f"queries {previous['queries']} -> {row['queries']}"
+            )
+            if row['queries'] > previous['queries']:
+                self.stdout.write(self.style.WARNING(line))
+            else:
+                self.stdout.write(line)
@@ -0,0 +1,38 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from expenses.seeding import delete_users, seed_benchmark_data
+
+
+class Command(BaseCommand):
+    help = 'Create users with realistic synthetic transactions and budgets'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1)
+        parser.add_argument('--transactions', type=int, default=10000, help='Transactions per user')
+        parser.add_argument('--days', type=int, default=365, help='Spread transactions over this many days')
+        parser.add_argument('--prefix', default='bench', help='Users are named <prefix>_0, <prefix>_1, ...')
+        parser.add_argument('--seed', type=int, default=0, help='Same seed, same data')
+        parser.add_argument('--replace', action='store_true', help='Delete existing users with the prefix first')
+
+    def handle(self, *args, users, transactions, days, prefix, seed, replace, **options):
+        existing = User.objects.filter(username__startswith=f'{prefix}_')
+        if existing.exists():
+            if not replace:
+                raise CommandError(f"Users named {prefix}_* already exist; pass --replace to recreate them")
+            delete_users(existing)
+
+        started = time.perf_counter()
+
+        def progress(user):
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"Created {user.username} ({elapsed:.1f}s)")
+
+        seed_benchmark_data(users, transactions, days, prefix, seed, progress)
+        total = users * transactions
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {users} users with {total} transactions in {elapsed:.1f}s ({total / elapsed:.0f} rows/s)"
+        ))
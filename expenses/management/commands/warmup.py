@@ -0,0 +1,39 @@
+import json
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Boot fresh worker processes with the warm start and report how long "
+        "each boot phase takes"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=3, help='Fresh interpreters to boot')
+
+    def handle(self, *args, repeat, **options):
+        if repeat < 1:
+            raise CommandError("--repeat must be at least 1")
+
+        runs = []
+        for _ in range(repeat):
+            # A fresh interpreter, since this one already loaded settings and apps
+            result = subprocess.run(
+                [sys.executable, '-m', 'expenses.warmup'],
+                cwd=settings.BASE_DIR, capture_output=True, text=True,
+            )
+            if result.returncode:
+                raise CommandError(f"Worker boot failed:\n{result.stderr.strip()}")
+            runs.append(json.loads(result.stdout.strip().splitlines()[-1]))
+
+        self.stdout.write(f"{'phase':<12} {'p50':>10}  detail")
+        for index, (phase, _, detail) in enumerate(runs[0]):
+            p50 = statistics.median(run[index][1] for run in runs)
+            self.stdout.write(f"{phase:<12} {p50 * 1000:8.1f}ms  {detail}")
+        total = statistics.median(sum(seconds for _, seconds, _ in run) for run in runs)
+        self.stdout.write(self.style.SUCCESS(f"Worker boot takes {total * 1000:.0f}ms (median of {repeat})"))
@@ -0,0 +1,190 @@
+import bisect
+import contextvars
+import threading
+import time
+
+from django.template.backends.django import DjangoTemplates, Template
+
+from .fragments import card_cache
+
+# Upper bounds of the histogram buckets; everything above the last one
+# lands in an overflow bucket
+TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 20, 30, 50, 100, 200, 500)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Metric name -> (help text, buckets); each is recorded once per request
+METRICS = {
+    'request_seconds': ('Wall time per request', TIME_BUCKETS),
+    'db_queries': ('DB queries per request', COUNT_BUCKETS),
+    'db_seconds': ('DB time per request', TIME_BUCKETS),
+    'template_seconds': ('Template render time per request', TIME_BUCKETS),
+}
+
+
+class Histogram:
+    """Fixed-bucket histogram; quantiles are interpolated within a bucket"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, fraction):
+        """Estimate a quantile, e.g. 0.95 for p95"""
+        if not self.count:
+            return 0
+        rank = fraction * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            if count and cumulative + count >= rank:
+                lower = self.buckets[index - 1] if index else 0
+                if index == len(self.buckets):
+                    # Overflow bucket has no upper bound
+                    return lower
+                return lower + (self.buckets[index] - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+
+_histograms = {}  # (metric, view) -> Histogram
+_lock = threading.Lock()
+
+
+def observe(view, values):
+    """
+    Record one request's measurements
+
+    Args:
+        view: View name the request resolved to
+        values: dict of metric name -> value
+    """
+    with _lock:
+        for metric, value in values.items():
+            histogram = _histograms.get((metric, view))
+            if histogram is None:
+                histogram = _histograms[(metric, view)] = Histogram(METRICS[metric][1])
+            histogram.observe(value)
+
+
+def reset():
+    """Forget every recorded measurement"""
+    with _lock:
+        _histograms.clear()
+
+
+def _label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_prometheus():
+    """
+    Render the recorded metrics in the Prometheus text exposition format
+
+    Each metric is a summary per view with p50/p95/p99, sum and count,
+    followed by the card fragment cache counters. Values are per process;
+    every worker reports its own.
+
+    Returns:
+        str: Exposition text
+    """
+    lines = []
+    with _lock:
+        for metric, (help_text, buckets) in METRICS.items():
+            name = f'finance_{metric}'
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} summary')
+            for (recorded, view), histogram in sorted(_histograms.items()):
+                if recorded != metric:
+                    continue
+                label = f'view="{_label(view)}"'
+                for fraction in QUANTILES:
+                    lines.append(f'{name}{{{label},quantile="{fraction}"}} {histogram.quantile(fraction):.6g}')
+                lines.append(f'{name}_sum{{{label}}} {histogram.sum:.6g}')
+                lines.append(f'{name}_count{{{label}}} {histogram.count}')
+    lines.extend(render_fragment_cache_stats())
+    return '\n'.join(lines) + '\n'
+
+
+def render_fragment_cache_stats():
+    """Render the transaction card cache counters as Prometheus lines"""
+    stats = card_cache.stats()
+    lines = []
+    for counter in ('hits', 'misses', 'evictions'):
+        name = f'finance_card_cache_{counter}_total'
+        lines.append(f'# HELP {name} Transaction card fragment cache {counter}')
+        lines.append(f'# TYPE {name} counter')
+        lines.append(f'{name} {stats[counter]}')
+    lines.append('# HELP finance_card_cache_entries Transaction cards currently cached')
+    lines.append('# TYPE finance_card_cache_entries gauge')
+    lines.append(f"finance_card_cache_entries {stats['entries']}")
+    return lines
+
+
+class RequestStats:
+    """Measurements collected while one request is handled"""
+
+    __slots__ = ('queries', 'template_seconds', 'template_depth')
+
+    def __init__(self):
+        self.queries = []  # (sql, seconds)
+        self.template_seconds = 0
+        self.template_depth = 0  # Instrumented renders in progress
+
+
+# Stats of the request being handled; context variables follow the request
+# into sync_to_async worker threads, so concurrent queries are counted too
+current_stats = contextvars.ContextVar('finance_request_stats', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    """DB execute wrapper timing each query of an instrumented request"""
+    stats = current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries.append((sql, time.perf_counter() - started))
+
+
+class InstrumentedTemplate(Template):
+    """Template that adds its render time to the current request's stats"""
+
+    def render(self, context=None, request=None):
+        stats = current_stats.get()
+        # Renders nested in a timed one (render_to_string from a view helper
+        # or template tag) are already inside its time
+        if stats is None or stats.template_depth:
+            return super().render(context, request)
+        stats.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            stats.template_seconds += time.perf_counter() - started
+            stats.template_depth -= 1
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """
+    Django template backend timing top-level renders
+
+    Includes and extends render inside their parent, and templates rendered
+    while another is rendering (e.g. cached transaction cards) are skipped,
+    so their time is counted once.
+    """
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return InstrumentedTemplate(super().get_template(template_name).template, self)
@@ -0,0 +1,132 @@
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.deprecation import MiddlewareMixin
+
+from . import caching, metrics
+from .routers import PIN_COOKIE
+
+logger = logging.getLogger(__name__)
+
+# Statements included in a slow-request log entry, slowest first
+SLOW_REQUEST_QUERIES = 10
+
+
+class InstrumentationMiddleware:
+    """
+    Record per-view wall time, DB query count/time and template render time
+
+    Measurements go to the in-process histograms in metrics.py. Requests
+    slower than settings.SLOW_REQUEST_SECONDS are logged with their slowest
+    SQL. Works natively under both WSGI and ASGI.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_seconds = getattr(settings, 'SLOW_REQUEST_SECONDS', 0)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        stats, token, started = self.start()
+        try:
+            return self.get_response(request)
+        finally:
+            metrics.current_stats.reset(token)
+            self.finish(request, stats, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        stats, token, started = self.start()
+        try:
+            return await self.get_response(request)
+        finally:
+            metrics.current_stats.reset(token)
+            self.finish(request, stats, time.perf_counter() - started)
+
+    def start(self):
+        stats = metrics.RequestStats()
+        return stats, metrics.current_stats.set(stats), time.perf_counter()
+
+    def finish(self, request, stats, elapsed):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unresolved'
+        db_seconds = sum(seconds for sql, seconds in stats.queries)
+        metrics.observe(view, {
+            'request_seconds': elapsed,
+            'db_queries': len(stats.queries),
+            'db_seconds': db_seconds,
+            'template_seconds': stats.template_seconds,
+        })
+
+        if self.slow_seconds and elapsed >= self.slow_seconds:
+            slowest = sorted(stats.queries, key=lambda query: query[1], reverse=True)[:SLOW_REQUEST_QUERIES]
+            logger.warning(
+                "Slow request %s %s (%s): %.3fs, %d queries in %.3fs, templates %.3fs\n%s",
+                request.method, request.path, view, elapsed, len(stats.queries), db_seconds,
+                stats.template_seconds,
+                '\n'.join(f'  {seconds * 1000:.1f}ms  {sql}' for sql, seconds in slowest),
+            )
+
+
+class DataVersionMiddleware:
+    """
+    Read each user's data version at most once per request
+
+    The version is a database row (caching.get_data_version); the ETag
+    check and every cache lookup of a request share the value read first.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        token = caching.request_versions.set({})
+        try:
+            return self.get_response(request)
+        finally:
+            caching.request_versions.reset(token)
+
+    async def __acall__(self, request):
+        token = caching.request_versions.set({})
+        try:
+            return await self.get_response(request)
+        finally:
+            caching.request_versions.reset(token)
+
+
+class ReplicaPinMiddleware(MiddlewareMixin):
+    """
+    Pin a browser to the primary database for a while after it writes
+
+    Any non-GET/HEAD request counts as a write. While the PIN_COOKIE it
+    sets lives (settings.REPLICA_PIN_SECONDS), read_from_replicas views
+    read from the primary, so the user sees their own changes even if the
+    replicas lag behind.
+    """
+
+    def process_response(self, request, response):
+        if getattr(settings, 'REPLICA_DATABASES', []) and request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                secure=settings.SESSION_COOKIE_SECURE,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
@@ -0,0 +1,62 @@
+# Generated by Django 4.2.28 on 2026-10-18 18:52
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+
+def backfill_monthly_summaries(apps, schema_editor):
+    Transaction = apps.get_model('expenses', 'Transaction')
+    MonthlySummary = apps.get_model('expenses', 'MonthlySummary')
+    rows = Transaction.objects.order_by().annotate(
+        year=ExtractYear('date'),
+        month=ExtractMonth('date'),
+    ).values(
+        'user_id', 'year', 'month', 'category_id', 'transaction_type'
+    ).annotate(
+        total=Sum('amount'),
+        count=Count('id'),
+    )
+    MonthlySummary.objects.bulk_create(
+        (MonthlySummary(**row) for row in rows),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('expenses', '0005_alter_budget_options_alter_category_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('month', models.PositiveSmallIntegerField()),
+                ('transaction_type', models.CharField(choices=[('Income', 'Income'), ('Expense', 'Expense')], max_length=10)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='monthly_summaries', to='expenses.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_summaries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Monthly summaries',
+                'ordering': ['-year', '-month'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='monthlysummary',
+            constraint=models.UniqueConstraint(condition=models.Q(('category__isnull', False)), fields=('user', 'year', 'month', 'category', 'transaction_type'), name='unique_monthly_summary'),
+        ),
+        migrations.AddConstraint(
+            model_name='monthlysummary',
+            constraint=models.UniqueConstraint(condition=models.Q(('category__isnull', True)), fields=('user', 'year', 'month', 'transaction_type'), name='unique_monthly_summary_uncategorized'),
+        ),
+        migrations.RunPython(backfill_monthly_summaries, migrations.RunPython.noop),
+    ]
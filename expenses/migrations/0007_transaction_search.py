@@ -0,0 +1,83 @@
+from django.db import migrations
+
+# Frozen copies of the search backends' SQL as of this migration, so later
+# changes to expenses.search don't alter what it does
+FTS_TABLE = 'expenses_transaction_fts'
+
+SQLITE_INSTALL_SQL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "user_id, category, description, prefix='2 3', tokenize='unicode61 remove_diacritics 2')",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON expenses_transaction BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, user_id, category, description) VALUES (
+            new.id, new.user_id,
+            COALESCE((SELECT name FROM expenses_category WHERE id = new.category_id), ''),
+            COALESCE(new.description, ''));
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update
+    AFTER UPDATE OF user_id, category_id, description ON expenses_transaction BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+        INSERT INTO {FTS_TABLE}(rowid, user_id, category, description) VALUES (
+            new.id, new.user_id,
+            COALESCE((SELECT name FROM expenses_category WHERE id = new.category_id), ''),
+            COALESCE(new.description, ''));
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON expenses_transaction BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_category_rename
+    AFTER UPDATE OF name ON expenses_category BEGIN
+        UPDATE {FTS_TABLE} SET category = new.name
+        WHERE rowid IN (SELECT id FROM expenses_transaction WHERE category_id = new.id);
+    END""",
+]
+
+SQLITE_POPULATE_SQL = f"""
+    INSERT INTO {FTS_TABLE}(rowid, user_id, category, description)
+    SELECT t.id, t.user_id, COALESCE(c.name, ''), COALESCE(t.description, '')
+    FROM expenses_transaction t LEFT JOIN expenses_category c ON c.id = t.category_id
+"""
+
+POSTGRESQL_INSTALL_SQL = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS expenses_transaction_description_trgm '
+    'ON expenses_transaction USING gin (UPPER(description::text) gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS expenses_category_name_trgm '
+    'ON expenses_category USING gin (UPPER(name::text) gin_trgm_ops)',
+]
+
+
+def install_search(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+            created = cursor.fetchone() is None
+            for statement in SQLITE_INSTALL_SQL:
+                cursor.execute(statement)
+            if created:
+                cursor.execute(SQLITE_POPULATE_SQL)
+    elif vendor == 'postgresql':
+        for statement in POSTGRESQL_INSTALL_SQL:
+            schema_editor.execute(statement)
+
+
+def uninstall_search(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+        for suffix in ('insert', 'update', 'delete', 'category_rename'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}')
+    elif vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS expenses_transaction_description_trgm')
+        schema_editor.execute('DROP INDEX IF EXISTS expenses_category_name_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0006_monthlysummary'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search, uninstall_search),
+    ]
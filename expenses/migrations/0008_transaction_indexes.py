@@ -0,0 +1,25 @@
+# Generated by Django 4.2.28 on 2026-10-18 18:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0007_transaction_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='monthlysummary',
+            index=models.Index(fields=['user', 'year', 'month'], name='monthly_summary_user_month_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', '-date', '-id'], name='txn_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', 'category', 'transaction_type', 'date'], name='txn_user_cat_type_date_idx'),
+        ),
+    ]
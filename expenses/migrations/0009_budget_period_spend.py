@@ -0,0 +1,30 @@
+# Generated by Django 4.2.28 on 2026-10-18 19:25
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0008_transaction_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BudgetPeriodSpend',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_start', models.DateField()),
+                ('spent', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('budget', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='period_spends', to='expenses.budget')),
+            ],
+            options={
+                'ordering': ['-period_start'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='budgetperiodspend',
+            constraint=models.UniqueConstraint(fields=('budget', 'period_start'), name='unique_budget_period_spend'),
+        ),
+    ]
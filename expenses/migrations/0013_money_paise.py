@@ -0,0 +1,109 @@
+# Generated by Django 4.2.28 on 2026-10-18 20:20
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import F, Value
+from django.db.models.functions import Round
+import expenses.money
+
+# (model, field, max_digits, default) of every money column
+MONEY_FIELDS = [
+    ('archivedtransaction', 'amount', 10, None),
+    ('archiveperiod', 'expense', 14, 0),
+    ('archiveperiod', 'income', 14, 0),
+    ('budget', 'amount', 10, None),
+    ('budgetalert', 'spent', 14, None),
+    ('budgetperiodspend', 'spent', 14, 0),
+    ('monthlysummary', 'total', 14, 0),
+    ('recurringtransaction', 'amount', 10, None),
+    ('transaction', 'amount', 10, None),
+]
+
+# Wide enough for any amount in paise while the column is still decimal
+CONVERSION_DIGITS = 18
+
+
+def alter_fields(field_class, max_digits=None):
+    return [
+        migrations.AlterField(
+            model_name=model_name,
+            name=name,
+            field=field_class(
+                decimal_places=2,
+                max_digits=max_digits or digits,
+                **({} if default is None else {'default': default}),
+            ),
+        )
+        for model_name, name, digits, default in MONEY_FIELDS
+    ]
+
+
+# Frozen copy of the SQLite search triggers as of this migration
+SEARCH_TRIGGERS_SQL = [
+    """CREATE TRIGGER IF NOT EXISTS expenses_transaction_fts_insert AFTER INSERT ON expenses_transaction BEGIN
+        INSERT INTO expenses_transaction_fts(rowid, user_id, category, description) VALUES (
+            new.id, new.user_id,
+            COALESCE((SELECT name FROM expenses_category WHERE id = new.category_id), ''),
+            COALESCE(new.description, ''));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS expenses_transaction_fts_update
+    AFTER UPDATE OF user_id, category_id, description ON expenses_transaction BEGIN
+        DELETE FROM expenses_transaction_fts WHERE rowid = old.id;
+        INSERT INTO expenses_transaction_fts(rowid, user_id, category, description) VALUES (
+            new.id, new.user_id,
+            COALESCE((SELECT name FROM expenses_category WHERE id = new.category_id), ''),
+            COALESCE(new.description, ''));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS expenses_transaction_fts_delete AFTER DELETE ON expenses_transaction BEGIN
+        DELETE FROM expenses_transaction_fts WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS expenses_transaction_fts_category_rename
+    AFTER UPDATE OF name ON expenses_category BEGIN
+        UPDATE expenses_transaction_fts SET category = new.name
+        WHERE rowid IN (SELECT id FROM expenses_transaction WHERE category_id = new.id);
+    END""",
+]
+
+
+def drop_search_triggers(apps, schema_editor):
+    # SQLite changes a column's type by rebuilding the table, which the FTS
+    # triggers on expenses_transaction would break
+    if schema_editor.connection.vendor == 'sqlite':
+        for suffix in ('insert', 'update', 'delete', 'category_rename'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS expenses_transaction_fts_{suffix}')
+
+
+def install_search_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in SEARCH_TRIGGERS_SQL:
+            schema_editor.execute(statement)
+
+
+def rupees_to_paise(apps, schema_editor):
+    # Rounded so float-backed decimals (SQLite) land on whole numbers
+    for model_name, name, digits, default in MONEY_FIELDS:
+        apps.get_model('expenses', model_name).objects.update(**{name: Round(F(name) * 100)})
+
+
+def paise_to_rupees(apps, schema_editor):
+    # Multiplied rather than divided: SQLite divides integers as integers
+    for model_name, name, digits, default in MONEY_FIELDS:
+        apps.get_model('expenses', model_name).objects.update(**{name: F(name) * Value(Decimal('0.01'))})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0012_recurringtransaction'),
+    ]
+
+    # Widen the decimals, scale them to paise, then switch the columns to
+    # bigint, which keeps every value exactly; reversing runs it backwards
+    operations = [
+        migrations.RunPython(drop_search_triggers, install_search_triggers),
+        *alter_fields(models.DecimalField, CONVERSION_DIGITS),
+        migrations.RunPython(rupees_to_paise, paise_to_rupees),
+        *alter_fields(expenses.money.MoneyField),
+        migrations.RunPython(install_search_triggers, drop_search_triggers),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.28 on 2026-10-18 20:48
+
+import django.core.validators
+from django.db import migrations, models
+
+
+def fix_zero_intervals(apps, schema_editor):
+    # Rules saved with interval 0 would fail the new constraint
+    apps.get_model('expenses', 'RecurringTransaction').objects.filter(interval=0).update(interval=1)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0013_money_paise'),
+    ]
+
+    operations = [
+        migrations.RunPython(fix_zero_intervals, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='recurringtransaction',
+            name='interval',
+            field=models.PositiveSmallIntegerField(default=1, validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+        migrations.AddConstraint(
+            model_name='recurringtransaction',
+            constraint=models.CheckConstraint(check=models.Q(('interval__gte', 1)), name='recurring_interval_positive'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.28 on 2026-10-18 21:11
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0015_userdataversion'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='archiveperiod',
+            name='expense',
+        ),
+        migrations.RemoveField(
+            model_name='archiveperiod',
+            name='income',
+        ),
+    ]
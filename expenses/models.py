@@ -1,11 +1,12 @@
-from django.db import models
+from django.core.validators import MinValueValidator
+from django.db import models, transaction as db_transaction
 from django.contrib.auth.models import User
 from django.utils.timezone import now
-from django.db.models import Sum, Q
-from django.db.models.functions import Coalesce
-from decimal import Decimal
 from datetime import date
 
+from .money import MoneyField
+
+
 class Category(models.Model):
     """User-specific categories for organizing transactions and budgets"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='categories', null=True, blank=True)
@@ -33,7 +34,7 @@ class Budget(models.Model):
     
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     category = models.ForeignKey(Category, on_delete=models.CASCADE)
-    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    amount = MoneyField(max_digits=10, decimal_places=2)
     period = models.CharField(max_length=10, choices=PERIOD_CHOICES, default='monthly')
     start_date = models.DateField(default=date.today)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -54,40 +55,8 @@ class Budget(models.Model):
         Returns:
             Decimal: Total spent in the current period
         """
-        if target_date is None:
-            target_date = date.today()
-        
-        # Get transactions for this category and user
-        transactions = Transaction.objects.filter(
-            user=self.user,
-            category=self.category,
-            transaction_type='Expense'
-        )
-        
-        # Filter by period
-        if self.period == 'monthly':
-            # Current month and year
-            transactions = transactions.filter(
-                date__year=target_date.year,
-                date__month=target_date.month
-            )
-        elif self.period == 'yearly':
-            # Current year
-            transactions = transactions.filter(
-                date__year=target_date.year
-            )
-        elif self.period == 'one-time':
-            # All time since start_date
-            transactions = transactions.filter(
-                date__gte=self.start_date
-            )
-        
-        # Calculate total with Coalesce to handle None
-        total = transactions.aggregate(
-            total=Coalesce(Sum('amount'), Decimal('0.00'))
-        )['total']
-        
-        return total
+        from .budgets import get_spent_amounts
+        return get_spent_amounts([self], target_date)[0]
 
     def get_remaining_amount(self, target_date=None):
         """
@@ -106,12 +75,10 @@ class Budget(models.Model):
         Returns:
             int: Percentage used (0-100+)
         """
+        from .budgets import get_percentage
         if self.amount == 0:
             return 0
-        
-        spent = self.get_spent_amount(target_date)
-        percentage = (spent / self.amount) * 100
-        return int(percentage)
+        return get_percentage(self.amount, self.get_spent_amount(target_date))
 
     def get_period_display_text(self, target_date=None):
         """
@@ -148,14 +115,8 @@ class Budget(models.Model):
         Returns:
             str: 'emerald' (< 80%), 'amber' (80-99%), 'rose' (100%+)
         """
-        percentage = self.get_percentage_used(target_date)
-        
-        if percentage >= 100:
-            return 'rose'
-        elif percentage >= 80:
-            return 'amber'
-        else:
-            return 'emerald'
+        from .budgets import get_status_color
+        return get_status_color(self.get_percentage_used(target_date))
 
 
 class Transaction(models.Model):
@@ -170,12 +131,33 @@ class Transaction(models.Model):
     # New ForeignKey category
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True, related_name='transactions')
     transaction_type = models.CharField(max_length=10, choices=TRANSACTION_TYPE_CHOICES)
-    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    amount = MoneyField(max_digits=10, decimal_places=2)
     date = models.DateField(default=now)
     description = models.TextField(blank=True, null=True)
+    # Rule this transaction was created from by materialize_recurring
+    recurring = models.ForeignKey(
+        'RecurringTransaction', on_delete=models.SET_NULL, null=True, blank=True, related_name='transactions'
+    )
+
+    # Rows of the live ledger can be edited and deleted
+    is_archived = False
 
     class Meta:
         ordering = ['-date', '-id']
+        indexes = [
+            # Dashboard month range, recent activity and keyset-paginated lists
+            models.Index(fields=['user', '-date', '-id'], name='txn_user_date_idx'),
+            # Budget spend: one user's expenses in some categories over a date range
+            models.Index(fields=['user', 'category', 'transaction_type', 'date'], name='txn_user_cat_type_date_idx'),
+        ]
+        constraints = [
+            # One transaction per occurrence of a recurring rule
+            models.UniqueConstraint(
+                fields=['recurring', 'date'],
+                condition=models.Q(recurring__isnull=False),
+                name='unique_recurring_occurrence',
+            ),
+        ]
 
     def __str__(self):
         if self.category:
@@ -185,6 +167,219 @@ class Transaction(models.Model):
         else:
             category_name = 'Uncategorized'
         return f"{category_name} - {self.transaction_type}: {self.amount}"
-    
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the persisted values so save() can move the rollup delta
+        from .budgets import get_spend_state
+        from .rollups import ROLLUP_FIELDS, get_rollup_state
+        if all(name in field_names for name in ROLLUP_FIELDS):
+            instance._rollup_state = get_rollup_state(instance)
+            instance._spend_state = get_spend_state(instance)
+        return instance
+
+    def save(self, *args, **kwargs):
+        from .budgets import get_spend_state, record_spend_change
+        from .rollups import get_rollup_state, load_persisted, record_transaction_change
+        with db_transaction.atomic(using=kwargs.get('using')):
+            previous = getattr(self, '_rollup_state', None)
+            previous_spend = getattr(self, '_spend_state', None)
+            if previous is None and self.pk is not None:
+                persisted = load_persisted(self.pk)
+                if persisted is not None:
+                    previous, previous_spend = get_rollup_state(persisted), get_spend_state(persisted)
+            super().save(*args, **kwargs)
+            self._rollup_state = record_transaction_change(previous, self)
+            self._spend_state = record_spend_change(previous_spend, self)
+
+
+class RecurringTransaction(models.Model):
+    """A repeating income or expense, e.g. rent or a salary, materialized by materialize_recurring"""
+    FREQUENCY_CHOICES = [
+        ('daily', 'Daily'),
+        ('weekly', 'Weekly'),
+        ('monthly', 'Monthly'),
+        ('yearly', 'Yearly'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='recurring_transactions')
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True, related_name='recurring_transactions')
+    transaction_type = models.CharField(max_length=10, choices=Transaction.TRANSACTION_TYPE_CHOICES)
+    amount = MoneyField(max_digits=10, decimal_places=2)
+    description = models.TextField(blank=True, null=True)
+    frequency = models.CharField(max_length=10, choices=FREQUENCY_CHOICES, default='monthly')
+    # Repeat every `interval` days/weeks/months/years
+    interval = models.PositiveSmallIntegerField(default=1, validators=[MinValueValidator(1)])
+    # First occurrence; monthly and yearly rules keep its day of the month
+    start_date = models.DateField(default=date.today)
+    # Last date an occurrence may fall on, if the rule ends
+    end_date = models.DateField(null=True, blank=True)
+    # Next occurrence to create; None once the rule has ended
+    next_date = models.DateField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['next_date']
+        indexes = [
+            # The scheduler only ever looks at rules that are due
+            models.Index(fields=['next_date'], name='recurring_next_date_idx'),
+        ]
+        constraints = [
+            # An interval of 0 would never move past an occurrence
+            models.CheckConstraint(check=models.Q(interval__gte=1), name='recurring_interval_positive'),
+        ]
+
+    # Unit of `interval` for each frequency
+    FREQUENCY_UNITS = {'daily': 'days', 'weekly': 'weeks', 'monthly': 'months', 'yearly': 'years'}
+
+    def __str__(self):
+        every = self.get_frequency_display()
+        if self.interval != 1:
+            every = f"Every {self.interval} {self.FREQUENCY_UNITS[self.frequency]}"
+        return f"{self.description or self.transaction_type}: ₹{self.amount} ({every})"
+
+    def save(self, *args, **kwargs):
+        if self._state.adding and self.next_date is None:
+            self.next_date = self.start_date
+        super().save(*args, **kwargs)
+
+
+class ArchivedTransaction(models.Model):
+    """A transaction moved out of the live ledger by archive_transactions; read-only"""
+    # The live row's id, so cursors, cached cards and restores keep working
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_transactions')
+    category_string = models.CharField(max_length=100, null=True, blank=True)
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True, related_name='archived_transactions')
+    transaction_type = models.CharField(max_length=10, choices=Transaction.TRANSACTION_TYPE_CHOICES)
+    amount = MoneyField(max_digits=10, decimal_places=2)
+    date = models.DateField()
+    description = models.TextField(blank=True, null=True)
+    recurring = models.ForeignKey(
+        'RecurringTransaction', on_delete=models.SET_NULL, null=True, blank=True, related_name='archived_transactions'
+    )
+
+    is_archived = True
 
+    class Meta:
+        ordering = ['-date', '-id']
+        indexes = [
+            models.Index(fields=['user', '-date', '-id'], name='archived_txn_user_date_idx'),
+        ]
+
+    def __str__(self):
+        category_name = self.category.name if self.category else self.category_string or 'Uncategorized'
+        return f"{category_name} - {self.transaction_type}: {self.amount} (archived)"
+
+
+class ArchivePeriod(models.Model):
+    """One month of a user's ledger that has archived transactions, and how many"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archive_periods')
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    count = models.PositiveIntegerField(default=0)
+    archived_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-year', '-month']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'year', 'month'], name='unique_archive_period'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} {self.year}-{self.month:02d}: {self.count} archived"
+
+
+class MonthlySummary(models.Model):
+    """Per-user rollup of transaction totals for one month, category and type"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='monthly_summaries')
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, blank=True, related_name='monthly_summaries')
+    transaction_type = models.CharField(max_length=10, choices=Transaction.TRANSACTION_TYPE_CHOICES)
+    total = MoneyField(max_digits=14, decimal_places=2, default=0)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-year', '-month']
+        verbose_name_plural = 'Monthly summaries'
+        indexes = [
+            models.Index(fields=['user', 'year', 'month'], name='monthly_summary_user_month_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'year', 'month', 'category', 'transaction_type'],
+                condition=models.Q(category__isnull=False),
+                name='unique_monthly_summary',
+            ),
+            models.UniqueConstraint(
+                fields=['user', 'year', 'month', 'transaction_type'],
+                condition=models.Q(category__isnull=True),
+                name='unique_monthly_summary_uncategorized',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} {self.year}-{self.month:02d} {self.transaction_type}: {self.total}"
+
+
+class BudgetPeriodSpend(models.Model):
+    """Running total of a budget's category expenses within one budget period"""
+    budget = models.ForeignKey(Budget, on_delete=models.CASCADE, related_name='period_spends')
+    # First day of the period: the month or year start, or start_date for one-time budgets
+    period_start = models.DateField()
+    spent = MoneyField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['-period_start']
+        constraints = [
+            models.UniqueConstraint(fields=['budget', 'period_start'], name='unique_budget_period_spend'),
+        ]
+
+    def __str__(self):
+        return f"{self.budget} from {self.period_start}: {self.spent}"
+
+
+class UserDataVersion(models.Model):
+    """
+    When a user's data last changed, as nanoseconds since the epoch
+
+    Keys the per-user cache entries and the pages' ETags. Kept in the
+    database so a write in any process (another worker, a cron command)
+    reaches every other one; see caching.bump_data_version.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='data_version')
+    version = models.BigIntegerField()
+
+    def __str__(self):
+        return f"{self.user_id}: {self.version}"
+
+
+class BudgetAlert(models.Model):
+    """A budget reaching a warning level in one of its periods, recorded once"""
+    LEVEL_CHOICES = [
+        ('warning', 'Warning'),
+        ('exceeded', 'Exceeded'),
+    ]
+
+    budget = models.ForeignKey(Budget, on_delete=models.CASCADE, related_name='alerts')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='budget_alerts')
+    # First day of the period, as in BudgetPeriodSpend
+    period_start = models.DateField()
+    level = models.CharField(max_length=10, choices=LEVEL_CHOICES)
+    spent = MoneyField(max_digits=14, decimal_places=2)
+    percentage = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='budget_alert_user_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['budget', 'period_start', 'level'], name='unique_budget_alert'),
+        ]
+
+    def __str__(self):
+        return f"{self.budget} from {self.period_start}: {self.get_level_display()} at {self.percentage}%"
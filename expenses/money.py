@@ -0,0 +1,62 @@
+"""
+Money amounts stored as whole paise
+
+Python code sees rupee Decimals with 2 decimal places, as it always has;
+MoneyField converts at the model boundary, so the database stores,
+compares and sums plain integers, exactly and without decimal arithmetic.
+"""
+from decimal import Decimal
+
+from django.db import models
+from django.db.models import Value
+
+# One paisa, the smallest amount stored
+PAISA = Decimal('0.01')
+
+
+def to_paise(amount):
+    """Convert a rupee amount to a whole number of paise, rounding like DecimalField did"""
+    return int(Decimal(amount).quantize(PAISA).scaleb(2))
+
+
+def to_money(paise):
+    """Convert a whole number of paise back to a rupee Decimal"""
+    return Decimal(int(paise)).scaleb(-2)
+
+
+class MoneyField(models.DecimalField):
+    """
+    A DecimalField of rupees kept in a bigint column of paise
+
+    max_digits and decimal_places still drive validation and forms.
+    Aggregates over the column (Sum, Coalesce of a Sum) come back as
+    rupee Decimals as well.
+    """
+
+    def get_internal_type(self):
+        return 'BigIntegerField'
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if not prepared:
+            value = self.get_prep_value(value)
+        if value is None or hasattr(value, 'as_sql'):
+            return value
+        return to_paise(value)
+
+    def get_db_prep_save(self, value, connection):
+        if hasattr(value, 'as_sql'):
+            return value
+        return self.get_db_prep_value(value, connection)
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return to_money(value)
+
+
+def money(amount):
+    """
+    Wrap a rupee amount for use in database expressions, e.g.
+    ``F('total') + money(delta)``, so it is sent in paise
+    """
+    return Value(amount, output_field=MoneyField())
@@ -0,0 +1,65 @@
+from datetime import date
+
+from django.db.models import Q
+
+# Transactions per "load more" page
+PAGE_SIZE = 50
+
+
+def encode_cursor(transaction):
+    """Encode a transaction's (date, id) position as an opaque cursor string"""
+    return f"{transaction.date.isoformat()}_{transaction.id}"
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by encode_cursor
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    cursor_date, _, cursor_id = cursor.partition('_')
+    return date.fromisoformat(cursor_date), int(cursor_id)
+
+
+def keyset_filter(cursor_date, cursor_id):
+    """
+    Build a Q for rows strictly after (cursor_date, cursor_id) in (-date, -id) order
+
+    The redundant ``date__lte`` bound lets the database seek straight to
+    the cursor in the (user, -date, -id) index instead of filtering every
+    newer row.
+    """
+    return Q(date__lte=cursor_date) & (Q(date__lt=cursor_date) | Q(id__lt=cursor_id))
+
+
+def paginate_transactions(transactions, cursor=None, page_size=None):
+    """
+    Keyset-paginate transactions on (-date, -id)
+
+    Instead of OFFSET, each page starts strictly after the last row of the
+    previous one, so deep pages cost the same as the first.
+
+    Args:
+        transactions: Transaction queryset
+        cursor: Optional cursor string from a previous page
+        page_size: Number of transactions per page (defaults to PAGE_SIZE)
+
+    Returns:
+        tuple: (list of transactions, next cursor or None)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    if page_size is None:
+        page_size = PAGE_SIZE
+
+    transactions = transactions.order_by('-date', '-id')
+    if cursor:
+        transactions = transactions.filter(keyset_filter(*decode_cursor(cursor)))
+
+    page = list(transactions[:page_size + 1])
+    if len(page) > page_size:
+        page = page[:page_size]
+        return page, encode_cursor(page[-1])
+    return page, None
@@ -0,0 +1,101 @@
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db.models import Q
+
+# Month the fiscal year starts in (April, as in India) unless settings override it
+FISCAL_YEAR_START_MONTH = 4
+
+PERIODS = ['daily', 'weekly', 'monthly', 'quarterly', 'yearly', 'fiscal-year']
+
+
+def _add_months(day, months):
+    """Shift the first day of a month by a number of months"""
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_range(year, month):
+    """
+    Get the half-open date range covering one calendar month
+
+    Returns:
+        tuple: (first day of the month, first day of the next month)
+    """
+    start = date(year, month, 1)
+    return start, _add_months(start, 1)
+
+
+def month_window(target_date, months):
+    """
+    Get the half-open date range covering a run of whole calendar months
+
+    Args:
+        target_date: Date inside the last month of the run
+        months: Number of months in the run
+
+    Returns:
+        tuple: (first day of the first month, first day after the last month)
+    """
+    end = _add_months(date(target_date.year, target_date.month, 1), 1)
+    return _add_months(end, -months), end
+
+
+def get_period_range(period, target_date=None):
+    """
+    Get the half-open date range of the period containing a date
+
+    Filtering with ``date__gte=start, date__lt=end`` keeps the predicate
+    sargable, unlike ``date__year``/``date__month`` which wrap the column
+    in a function and defeat any index on it.
+
+    Args:
+        period: One of PERIODS
+        target_date: Optional date inside the period (defaults to today)
+
+    Returns:
+        tuple: (start, end) with ``start <= date < end``
+    """
+    if target_date is None:
+        target_date = date.today()
+
+    if period == 'daily':
+        return target_date, target_date + timedelta(days=1)
+    elif period == 'weekly':
+        # Weeks start on Sunday, like the dashboard calendar
+        start = target_date - timedelta(days=(target_date.weekday() + 1) % 7)
+        return start, start + timedelta(days=7)
+    elif period == 'monthly':
+        return month_range(target_date.year, target_date.month)
+    elif period == 'quarterly':
+        start = date(target_date.year, (target_date.month - 1) // 3 * 3 + 1, 1)
+        return start, _add_months(start, 3)
+    elif period == 'yearly':
+        return date(target_date.year, 1, 1), date(target_date.year + 1, 1, 1)
+    elif period == 'fiscal-year':
+        start_month = getattr(settings, 'FISCAL_YEAR_START_MONTH', FISCAL_YEAR_START_MONTH)
+        year = target_date.year if target_date.month >= start_month else target_date.year - 1
+        start = date(year, start_month, 1)
+        return start, _add_months(start, 12)
+
+    raise ValueError(f"Unknown period: {period}")
+
+
+def date_range_filter(start, end=None, field='date'):
+    """
+    Build a sargable Q for ``start <= field < end``
+
+    Args:
+        start: First date included
+        end: First date excluded, or None for no upper bound
+        field: Date field or lookup path to filter on
+    """
+    q = Q(**{f'{field}__gte': start})
+    if end is not None:
+        q &= Q(**{f'{field}__lt': end})
+    return q
+
+
+def period_filter(period, target_date=None, field='date'):
+    """Build a sargable Q matching the period containing target_date"""
+    return date_range_filter(*get_period_range(period, target_date), field=field)
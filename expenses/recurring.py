@@ -0,0 +1,140 @@
+import calendar
+from datetime import date, timedelta
+
+from django.db import transaction as db_transaction
+
+from . import budgets, rollups
+from .caching import bump_data_version
+from .models import RecurringTransaction, Transaction
+
+# Due rules materialized per DB transaction
+BATCH_SIZE = 500
+
+
+def add_months(day, months, anchor_day):
+    """
+    Move a date by whole months, onto the anchor day or the month's last day
+
+    A rule started on Jan 31st falls on Feb 28th (or 29th), then Mar 31st.
+    """
+    index = day.year * 12 + day.month - 1 + months
+    year, month = index // 12, index % 12 + 1
+    return date(year, month, min(anchor_day, calendar.monthrange(year, month)[1]))
+
+
+def get_following_occurrence(rule, occurrence):
+    """Get the occurrence of a rule after the one on the given date"""
+    if rule.frequency == 'daily':
+        return occurrence + timedelta(days=rule.interval)
+    if rule.frequency == 'weekly':
+        return occurrence + timedelta(weeks=rule.interval)
+    months = rule.interval * (12 if rule.frequency == 'yearly' else 1)
+    return add_months(occurrence, months, rule.start_date.day)
+
+
+def get_due_occurrences(rule, today):
+    """
+    List a rule's occurrences from its next_date up to today, for catch-up
+    after any downtime
+
+    Returns:
+        tuple: (list of due dates, the next_date to store afterwards,
+            None once the rule has ended)
+
+    Raises:
+        ValueError: If the rule's interval doesn't move it forward
+    """
+    due = []
+    occurrence = rule.next_date
+    while occurrence <= today and (rule.end_date is None or occurrence <= rule.end_date):
+        due.append(occurrence)
+        following = get_following_occurrence(rule, occurrence)
+        if following <= occurrence:
+            raise ValueError(f"Recurring rule {rule.pk} does not advance past {occurrence} (interval {rule.interval})")
+        occurrence = following
+    if rule.end_date is not None and occurrence > rule.end_date:
+        occurrence = None
+    return due, occurrence
+
+
+def materialize_batch(today, batch_size):
+    """
+    Create the due occurrences of up to batch_size rules
+
+    Runs in one DB transaction: the new transactions, the rules' advanced
+    next_date and the rollup and budget counter deltas commit together.
+    Rules are locked (skipping ones another run holds, on databases that
+    support it), and occurrences that already have a transaction are left
+    out, so batches are safe to repeat.
+
+    Returns:
+        tuple: (rules processed, transactions created)
+    """
+    with db_transaction.atomic():
+        rules = list(
+            RecurringTransaction.objects.select_for_update(skip_locked=True)
+            .filter(next_date__lte=today)
+            .order_by('next_date', 'id')[:batch_size]
+        )
+        if not rules:
+            return 0, 0
+
+        due = {rule.id: get_due_occurrences(rule, today) for rule in rules}
+        existing = set(Transaction.objects.filter(
+            recurring_id__in=due,
+            date__gte=min(rule.next_date for rule in rules),
+        ).values_list('recurring_id', 'date'))
+
+        transactions = [
+            Transaction(
+                user_id=rule.user_id,
+                category_id=rule.category_id,
+                transaction_type=rule.transaction_type,
+                amount=rule.amount,
+                date=occurrence,
+                description=rule.description,
+                recurring_id=rule.id,
+            )
+            for rule in rules
+            for occurrence in due[rule.id][0]
+            if (rule.id, occurrence) not in existing
+        ]
+        Transaction.objects.bulk_create(transactions)
+        # bulk_create skips save(), so move the rollups and budget counters here
+        rollups.record_bulk_create(transactions)
+        budgets.apply_spend_deltas(
+            budgets.collect_spend_deltas((budgets.get_spend_state(row), 1) for row in transactions)
+        )
+
+        for rule in rules:
+            rule.next_date = due[rule.id][1]
+        RecurringTransaction.objects.bulk_update(rules, ['next_date'])
+        for user_id in {row.user_id for row in transactions}:
+            bump_data_version(user_id)
+    return len(rules), len(transactions)
+
+
+def materialize_due(today=None, batch_size=BATCH_SIZE):
+    """
+    Create every due occurrence of every user's recurring rules
+
+    Only rules with next_date on or before today are read, through the
+    next_date index, so a run costs in proportion to the due rules, not
+    to the number of users or transactions.
+
+    Args:
+        today: Optional date to materialize up to (defaults to today)
+        batch_size: Rules per DB transaction
+
+    Returns:
+        dict: 'rules' processed and 'transactions' created
+    """
+    if today is None:
+        today = date.today()
+    result = {'rules': 0, 'transactions': 0}
+    while True:
+        rules, transactions = materialize_batch(today, batch_size)
+        if not rules:
+            return result
+        result['rules'] += rules
+        result['transactions'] += transactions
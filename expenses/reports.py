@@ -0,0 +1,247 @@
+from datetime import date
+
+import numpy as np
+from django.db.models import BigIntegerField, CharField
+from django.db.models.functions import Cast, Coalesce
+
+from .archive import get_tiers
+from .caching import get_cached
+from .models import Category
+from .money import to_money
+from .periods import month_window
+
+# Months covered by a report unless the request asks otherwise
+REPORT_MONTHS = 12
+
+# Longest report a request may ask for
+MAX_REPORT_MONTHS = 60
+
+# Report lengths offered on the page
+REPORT_MONTH_CHOICES = [3, 6, 12, 24]
+
+# Rows in the top merchants table
+TOP_MERCHANTS = 10
+
+# Row layout of load_columns' query
+ROW_DTYPE = [
+    ('date', 'datetime64[D]'),
+    ('transaction_type', 'U10'),
+    ('amount', 'int64'),
+    ('category_id', 'int64'),
+    ('description', 'O'),
+]
+
+
+def factorize(values):
+    """
+    Encode a sequence as integer codes
+
+    The lookups run inside dict/map, so even a million values take well
+    under a second, unlike np.unique on Python strings.
+
+    Returns:
+        tuple: (int64 array of codes, list of distinct values by code)
+    """
+    index = {value: code for code, value in enumerate(dict.fromkeys(values))}
+    codes = np.fromiter(map(index.__getitem__, values), dtype=np.int64, count=len(values))
+    return codes, list(index)
+
+
+def group_sum(groups, values, size):
+    """
+    Sum int64 values per group, exactly
+
+    np.bincount would go through float64 and could round large totals.
+
+    Args:
+        groups: Group code of every value
+        values: int64 array
+        size: Number of groups
+
+    Returns:
+        int64 array: Total per group code
+    """
+    totals = np.zeros(size, dtype=np.int64)
+    np.add.at(totals, groups, values)
+    return totals
+
+
+def get_rate(part, whole):
+    """Get part as a percentage of whole, or None when whole is zero"""
+    if not whole:
+        return None
+    return round(float(part) / float(whole) * 100, 1)
+
+
+def load_columns(user, start, end):
+    """
+    Pull the report columns of the user's transactions with one query
+
+    Dates and amounts are cast in the database, so rows arrive as plain
+    strings and integer paise without per-row model field conversion. Windows
+    reaching back into the archive take a second query for it.
+
+    Args:
+        user: Owner of the transactions
+        start: First date included
+        end: First date excluded
+
+    Returns:
+        dict: Column name -> array, all of the same length: 'month'
+            (datetime64[M]), 'income' (bool), 'amount' (int64 paise),
+            'category_id' (int64, 0 when uncategorized) and 'description'
+    """
+    rows = []
+    for model in get_tiers(user.id, start):
+        rows += (
+            model.objects.filter(user=user, date__gte=start, date__lt=end)
+            .order_by()
+            .values_list(
+                Cast('date', CharField()),
+                'transaction_type',
+                Cast('amount', BigIntegerField()),
+                Coalesce('category_id', 0),
+                'description',
+            )
+        )
+    # Parsed straight into typed columns in C, rather than column by column
+    table = np.array(rows, dtype=ROW_DTYPE)
+    return {
+        'month': table['date'].astype('datetime64[M]'),
+        'income': table['transaction_type'] == 'Income',
+        'amount': table['amount'],
+        'category_id': table['category_id'],
+        'description': table['description'],
+    }
+
+
+def get_monthly_trends(columns, start, months):
+    """
+    Total income and spending per month
+
+    Returns:
+        list: One dict per month, oldest first, empty months included
+    """
+    first = np.datetime64(start, 'M')
+    index = (columns['month'] - first).astype(np.int64)
+    incomes = group_sum(index, np.where(columns['income'], columns['amount'], 0), months)
+    expenses = group_sum(index, np.where(columns['income'], 0, columns['amount']), months)
+    counts = np.bincount(index, minlength=months)
+    return [
+        {
+            'month': (first + offset).astype(date),
+            'income': to_money(incomes[offset]),
+            'expense': to_money(expenses[offset]),
+            'net': to_money(incomes[offset] - expenses[offset]),
+            'count': int(counts[offset]),
+            'savings_rate': get_rate(incomes[offset] - expenses[offset], incomes[offset]),
+        }
+        for offset in range(months)
+    ]
+
+
+def get_category_breakdown(columns, category_names):
+    """
+    Spending per category, largest first
+
+    Args:
+        columns: Result of load_columns
+        category_names: dict of category id -> name
+
+    Returns:
+        list: Dicts of name, total, count and share of all spending
+    """
+    spent = ~columns['income']
+    category_ids, index = np.unique(columns['category_id'][spent], return_inverse=True)
+    totals = group_sum(index, columns['amount'][spent], len(category_ids))
+    counts = np.bincount(index, minlength=len(category_ids))
+    overall = totals.sum()
+    return [
+        {
+            'name': category_names.get(int(category_ids[position]), 'Uncategorized'),
+            'total': to_money(totals[position]),
+            'count': int(counts[position]),
+            'share': get_rate(totals[position], overall),
+        }
+        for position in np.argsort(-totals, kind='stable')
+    ]
+
+
+def get_top_merchants(columns, limit=TOP_MERCHANTS):
+    """
+    Descriptions with the most spending, as a stand-in for merchants
+
+    Descriptions are compared case- and whitespace-insensitively; blank
+    ones are left out.
+
+    Returns:
+        list: Up to limit dicts of name, total and count, largest first
+    """
+    codes, descriptions = factorize(columns['description'])
+    # Normalize each distinct description once, then map the row codes through
+    spellings = [' '.join((text or '').split()) for text in descriptions]
+    merchant_codes, merchants = factorize([spelling.lower() for spelling in spellings])
+    spent = ~columns['income']
+    merchant_of_row = merchant_codes[codes][spent]
+    totals = group_sum(merchant_of_row, columns['amount'][spent], len(merchants))
+    counts = np.bincount(merchant_of_row, minlength=len(merchants))
+
+    # Show each merchant by its most common spelling
+    uses = np.bincount(codes, minlength=len(descriptions)).tolist()
+    names = {}
+    for code in sorted(range(len(descriptions)), key=lambda code: (-uses[code], spellings[code])):
+        names.setdefault(merchant_codes[code], spellings[code])
+    top = [position for position in np.argsort(-totals, kind='stable') if counts[position] and merchants[position]]
+    return [
+        {
+            'name': names[position],
+            'total': to_money(totals[position]),
+            'count': int(counts[position]),
+        }
+        for position in top[:limit]
+    ]
+
+
+def summarize_columns(columns, start, months, category_names):
+    """
+    Compute every report section from the loaded columns
+
+    Returns:
+        dict: 'monthly_trends', 'categories', 'top_merchants' and the
+            window totals 'income', 'expense', 'net', 'savings_rate' and
+            'transaction_count'
+    """
+    income = int(columns['amount'][columns['income']].sum())
+    expense = int(columns['amount'][~columns['income']].sum())
+    return {
+        'monthly_trends': get_monthly_trends(columns, start, months),
+        'categories': get_category_breakdown(columns, category_names),
+        'top_merchants': get_top_merchants(columns),
+        'income': to_money(income),
+        'expense': to_money(expense),
+        'net': to_money(income - expense),
+        'savings_rate': get_rate(income - expense, income),
+        'transaction_count': len(columns['amount']),
+    }
+
+
+def compute_report(user, months, today):
+    """
+    Build the report for the months up to and including today's
+
+    Returns:
+        dict: summarize_columns output plus the 'start' and 'end' dates
+    """
+    start, end = month_window(today, months)
+    columns = load_columns(user, start, end)
+    category_names = dict(Category.objects.filter(user=user).values_list('id', 'name'))
+    return {
+        'start': start,
+        'end': end,
+        **summarize_columns(columns, start, months, category_names),
+    }
+
+
+def get_report(user, months, today):
+    """Get the report, cached until the user's data version changes"""
+    return get_cached(user.id, 'report', lambda: compute_report(user, months, today), months, today)
@@ -0,0 +1,338 @@
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction as db_transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+from .models import ArchivedTransaction, MonthlySummary, Transaction
+from .money import money
+
+# Transaction attributes that decide which MonthlySummary bucket a row counts towards
+ROLLUP_FIELDS = ('user_id', 'date', 'category_id', 'transaction_type', 'amount')
+
+
+def get_rollup_state(transaction):
+    """
+    Get the normalized rollup bucket and amount for a transaction
+
+    Returns:
+        tuple: (user_id, year, month, category_id, transaction_type, amount)
+    """
+    opts = Transaction._meta
+    transaction_date = opts.get_field('date').to_python(transaction.date)
+    amount = opts.get_field('amount').to_python(transaction.amount)
+    return (
+        transaction.user_id,
+        transaction_date.year,
+        transaction_date.month,
+        transaction.category_id,
+        transaction.transaction_type,
+        amount,
+    )
+
+
+def load_persisted(transaction_id):
+    """Read the persisted ROLLUP_FIELDS of a transaction as an unsaved instance, or None"""
+    row = Transaction.objects.filter(pk=transaction_id).values(*ROLLUP_FIELDS).first()
+    if row is None:
+        return None
+    return Transaction(**row)
+
+
+def _apply_delta(bucket, amount, count):
+    user_id, year, month, category_id, transaction_type = bucket
+    lookup = {
+        'user_id': user_id,
+        'year': year,
+        'month': month,
+        'category_id': category_id,
+        'transaction_type': transaction_type,
+    }
+    updates = {
+        'total': F('total') + money(amount),
+        'count': F('count') + count,
+    }
+
+    if count < 0:
+        # A removal always targets an existing row; never create one here, the
+        # user may be mid-cascade-delete
+        MonthlySummary.objects.filter(**lookup).update(**updates)
+        MonthlySummary.objects.filter(**lookup, count=0).delete()
+        return
+
+    if MonthlySummary.objects.filter(**lookup).update(**updates):
+        return
+    try:
+        with db_transaction.atomic():
+            MonthlySummary.objects.create(**lookup, total=amount, count=count)
+    except IntegrityError:
+        # Another request created the bucket first
+        MonthlySummary.objects.filter(**lookup).update(**updates)
+
+
+def record_transaction_change(previous, transaction):
+    """
+    Move a saved transaction's contribution between rollup buckets
+
+    Must run inside the same DB transaction as the save.
+
+    Args:
+        previous: Rollup state before the save, or None for new rows
+        transaction: The saved Transaction instance
+
+    Returns:
+        tuple: The new rollup state
+    """
+    current = get_rollup_state(transaction)
+    if previous != current:
+        if previous is not None:
+            _apply_delta(previous[:-1], -previous[-1], -1)
+        _apply_delta(current[:-1], current[-1], 1)
+    return current
+
+
+def record_transaction_delete(transaction):
+    """Remove a deleted transaction's contribution from its rollup bucket"""
+    state = getattr(transaction, '_rollup_state', None) or get_rollup_state(transaction)
+    _apply_delta(state[:-1], -state[-1], -1)
+
+
+def collect_deltas(transactions, deltas=None):
+    """
+    Sum transactions' rollup contributions per bucket
+
+    Args:
+        transactions: Iterable of Transaction instances
+        deltas: Optional dict from a previous call to keep adding to
+
+    Returns:
+        dict: bucket -> (amount, count)
+    """
+    if deltas is None:
+        deltas = {}
+    for transaction in transactions:
+        state = get_rollup_state(transaction)
+        total, count = deltas.get(state[:-1], (0, 0))
+        deltas[state[:-1]] = (total + state[-1], count + 1)
+    return deltas
+
+
+def record_bulk_create(transactions):
+    """
+    Add rows inserted with bulk_create (which skips save()) to the rollups
+
+    Must run inside the same DB transaction as the insert.
+    """
+    apply_deltas(collect_deltas(transactions))
+
+
+def apply_deltas(deltas):
+    """
+    Apply summed bucket deltas from collect_deltas
+
+    The touched buckets are locked, read once and written back with
+    bulk_update/bulk_create, so this costs a handful of queries however
+    many buckets are involved.
+    """
+    if not deltas:
+        return
+
+    existing = MonthlySummary.objects.select_for_update().filter(
+        user_id__in={bucket[0] for bucket in deltas},
+        year__in={bucket[1] for bucket in deltas},
+        month__in={bucket[2] for bucket in deltas},
+    )
+    rows = {
+        (row.user_id, row.year, row.month, row.category_id, row.transaction_type): row
+        for row in existing
+    }
+
+    to_update, to_create = [], []
+    for bucket, (total, count) in deltas.items():
+        row = rows.get(bucket)
+        if row is None:
+            user_id, year, month, category_id, transaction_type = bucket
+            to_create.append(MonthlySummary(
+                user_id=user_id, year=year, month=month, category_id=category_id,
+                transaction_type=transaction_type, total=total, count=count,
+            ))
+        else:
+            row.total += total
+            row.count += count
+            to_update.append(row)
+
+    MonthlySummary.objects.bulk_update(to_update, ['total', 'count'], batch_size=500)
+    try:
+        with db_transaction.atomic():
+            MonthlySummary.objects.bulk_create(to_create)
+    except IntegrityError:
+        # A concurrent write created some of these buckets; go one by one
+        for row in to_create:
+            _apply_delta(
+                (row.user_id, row.year, row.month, row.category_id, row.transaction_type),
+                row.total, row.count,
+            )
+
+
+def fold_category(category):
+    """
+    Merge a category's rollup rows into the uncategorized bucket
+
+    Mirrors Transaction.category's SET_NULL so totals survive the category
+    being deleted.
+    """
+    with db_transaction.atomic():
+        rows = list(MonthlySummary.objects.filter(category=category))
+        for row in rows:
+            updates = {'total': F('total') + money(row.total), 'count': F('count') + row.count}
+            updated = MonthlySummary.objects.filter(
+                user_id=row.user_id,
+                year=row.year,
+                month=row.month,
+                category__isnull=True,
+                transaction_type=row.transaction_type,
+            ).update(**updates)
+            if not updated:
+                row.pk = None
+                row.category = None
+                row.save()
+        MonthlySummary.objects.filter(category=category).delete()
+
+
+def compute_rollups(transactions):
+    """
+    Aggregate transactions straight from the ledger into rollup rows
+
+    Returns:
+        QuerySet: dicts keyed like MonthlySummary fields
+    """
+    return transactions.order_by().annotate(
+        year=ExtractYear('date'),
+        month=ExtractMonth('date'),
+    ).values(
+        'user_id', 'year', 'month', 'category_id', 'transaction_type'
+    ).annotate(
+        total=Sum('amount'),
+        count=Count('id'),
+    )
+
+
+def compute_ledger_rollups(users=None):
+    """
+    Aggregate the live and archived transactions into rollup buckets
+
+    Returns:
+        dict: (user_id, year, month, category_id, transaction_type) -> (total, count)
+    """
+    buckets = {}
+    for model in (Transaction, ArchivedTransaction):
+        transactions = model.objects.all()
+        if users is not None:
+            transactions = transactions.filter(user__in=users)
+        for row in compute_rollups(transactions):
+            key = (row['user_id'], row['year'], row['month'], row['category_id'], row['transaction_type'])
+            total, count = buckets.get(key, (Decimal('0.00'), 0))
+            buckets[key] = (total + row['total'], count + row['count'])
+    return buckets
+
+
+def rebuild_rollups(users=None, batch_size=1000):
+    """
+    Recompute MonthlySummary rows from the ledger, archive included
+
+    Args:
+        users: Optional queryset/list of users to limit the rebuild to
+        batch_size: Rows per bulk_create batch
+
+    Returns:
+        int: Number of rollup rows written
+    """
+    summaries = MonthlySummary.objects.all()
+    if users is not None:
+        summaries = summaries.filter(user__in=users)
+
+    with db_transaction.atomic():
+        summaries.delete()
+        rows = [
+            MonthlySummary(
+                user_id=user_id, year=year, month=month, category_id=category_id,
+                transaction_type=transaction_type, total=total, count=count,
+            )
+            for (user_id, year, month, category_id, transaction_type), (total, count)
+            in compute_ledger_rollups(users).items()
+        ]
+        MonthlySummary.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
+
+
+def verify_rollups(users=None):
+    """
+    Compare stored rollup rows with the ledger, archive included
+
+    Returns:
+        list: (key, stored, expected) tuples for every mismatching bucket,
+            where stored/expected are (total, count) or None
+    """
+    summaries = MonthlySummary.objects.all()
+    if users is not None:
+        summaries = summaries.filter(user__in=users)
+
+    def key(row):
+        return (row['user_id'], row['year'], row['month'], row['category_id'], row['transaction_type'])
+
+    stored = {}
+    for row in summaries.values('user_id', 'year', 'month', 'category_id', 'transaction_type', 'total', 'count'):
+        bucket = stored.setdefault(key(row), [Decimal('0.00'), 0])
+        bucket[0] += row['total']
+        bucket[1] += row['count']
+    expected = compute_ledger_rollups(users)
+
+    mismatches = []
+    for bucket in sorted(stored.keys() | expected.keys(), key=str):
+        have = tuple(stored[bucket]) if bucket in stored else None
+        want = expected.get(bucket)
+        if have != want:
+            mismatches.append((bucket, have, want))
+    return mismatches
+
+
+def get_cashflow(user, year, month):
+    """
+    Get income and expense totals for one month from the rollup table
+
+    Returns:
+        dict: {'incoming': Decimal, 'outgoing': Decimal}
+    """
+    return MonthlySummary.objects.filter(user=user, year=year, month=month).aggregate(
+        incoming=Sum('total', filter=Q(transaction_type='Income'), default=0),
+        outgoing=Sum('total', filter=Q(transaction_type='Expense'), default=0),
+    )
+
+
+def get_balance(user):
+    """
+    Get the all-time balance from the rollup table
+
+    Returns:
+        Decimal: Total income minus total expenses
+    """
+    totals = MonthlySummary.objects.filter(user=user).aggregate(
+        total_income=Sum('total', filter=Q(transaction_type='Income'), default=0),
+        total_expense=Sum('total', filter=Q(transaction_type='Expense'), default=0),
+    )
+    return totals['total_income'] - totals['total_expense']
+
+
+def get_category_spending(user, year, month, limit=5):
+    """
+    Get one month's largest spending categories from the rollup table
+
+    Returns:
+        list: Expense MonthlySummary rows with their categories, largest
+            first; the uncategorized bucket has no category
+    """
+    return list(
+        MonthlySummary.objects.filter(user=user, year=year, month=month, transaction_type='Expense')
+        .select_related('category')
+        .order_by('-total')[:limit]
+    )
@@ -0,0 +1,83 @@
+import contextvars
+import random
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+
+# Cookie that keeps a browser on the primary for a while after it writes,
+# so it reads its own writes despite replication lag
+PIN_COOKIE = 'primary_pin'
+
+# The replica the view being run reads from, if any; context variables
+# follow the request into sync_to_async worker threads
+_replica_reads = contextvars.ContextVar('finance_replica_reads', default=None)
+
+
+class ReplicaRouter:
+    """
+    Route reads of read_from_replicas views to the replica picked for them
+
+    Every other read, and every write and migration, goes to the primary
+    ('default'). Replicas are the aliases in settings.REPLICA_DATABASES.
+    """
+
+    def db_for_read(self, model, **hints):
+        return _replica_reads.get() or 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+def uses_replicas(request):
+    """Check whether a request may read from the replicas"""
+    return request.method in ('GET', 'HEAD') and PIN_COOKIE not in request.COOKIES
+
+
+def pick_replica(request):
+    """
+    Pick a random replica for all of a request's reads, or None for the primary
+
+    One replica per request, so the data version and the data it keys
+    (ETags, cached values) come from the same point of replication.
+    """
+    replicas = getattr(settings, 'REPLICA_DATABASES', [])
+    if replicas and uses_replicas(request):
+        return random.choice(replicas)
+    return None
+
+
+def read_from_replicas(view):
+    """
+    Let a view's GET/HEAD requests read from the replicas
+
+    Browsers holding PIN_COOKIE (set by ReplicaPinMiddleware after a write)
+    keep reading from the primary. Wraps sync and async views; apply it
+    outside condition_on_user_data so the ETag's data version is read from
+    the same replica as the page's data.
+    """
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            token = _replica_reads.set(pick_replica(request))
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                _replica_reads.reset(token)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        token = _replica_reads.set(pick_replica(request))
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _replica_reads.reset(token)
+    return wrapper
@@ -0,0 +1,329 @@
+import hashlib
+import re
+import unicodedata
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, connections, router
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+from .archive import get_tiers
+from .caching import user_cache_key
+from .models import ArchivedTransaction, Category, Transaction
+
+# Upper bound on ranked matches returned for one query
+MAX_RESULTS = 1000
+
+# Transactions per "load more" page of search results
+PAGE_SIZE = 50
+
+# Seconds a query's matches are kept for refinements typed after it
+SEARCH_SESSION_SECONDS = 60
+
+
+class SearchBackend:
+    """Find a user's transactions matching a query, best match first"""
+
+    def search(self, user, query, limit=MAX_RESULTS):
+        """
+        Args:
+            user: Owner of the transactions
+            query: Raw search text
+            limit: Maximum number of ids to return
+
+        Returns:
+            list: Transaction ids ordered by relevance
+        """
+        return [row[0] for row in self.search_candidates(user, query, limit)]
+
+    def search_candidates(self, user, query, limit=MAX_RESULTS):
+        """
+        Like search, with the searched text of every match
+
+        Returns:
+            list: (id, category name, description) tuples ordered by relevance
+        """
+        raise NotImplementedError
+
+    def matches(self, query, category, description):
+        """Check in memory whether a transaction's text matches the query, as the database would"""
+        raise NotImplementedError
+
+    def install(self, db_connection, populate=True):
+        """Create whatever indexes or shadow tables the backend relies on"""
+
+
+class SimpleSearchBackend(SearchBackend):
+    """Substring match with no index support; newest matches first"""
+
+    CANDIDATE_FIELDS = ('id', 'category__name', 'description')
+
+    def get_matches(self, user, query, model=Transaction):
+        """
+        Get the user's transactions whose description or category name
+        contains the query
+
+        Categories are resolved first (a user has few of them), so the
+        transaction filter never needs a join.
+
+        Args:
+            model: Transaction, or ArchivedTransaction to search the archive
+
+        Returns:
+            tuple: (queryset of model, list of matching category ids)
+        """
+        category_ids = list(
+            Category.objects.filter(user=user, name__icontains=query).values_list('id', flat=True)
+        )
+        matches = model.objects.filter(user=user).filter(
+            Q(description__icontains=query) | Q(category_id__in=category_ids)
+        )
+        return matches, category_ids
+
+    def search_candidates(self, user, query, limit=MAX_RESULTS):
+        matches, category_ids = self.get_matches(user, query)
+        return list(matches.order_by('-date', '-id').values_list(*self.CANDIDATE_FIELDS)[:limit])
+
+    def matches(self, query, category, description):
+        query = query.lower()
+        return query in (description or '').lower() or query in (category or '').lower()
+
+
+class TrigramSearchBackend(SimpleSearchBackend):
+    """
+    PostgreSQL backend using pg_trgm GIN indexes
+
+    The indexes cover UPPER(column::text), which is exactly what Django's
+    icontains lookup compiles to, so substring matches stay index scans.
+    Results are ranked by trigram word similarity.
+    """
+
+    INSTALL_SQL = [
+        'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+        'CREATE INDEX IF NOT EXISTS expenses_transaction_description_trgm '
+        'ON expenses_transaction USING gin (UPPER(description::text) gin_trgm_ops)',
+        'CREATE INDEX IF NOT EXISTS expenses_category_name_trgm '
+        'ON expenses_category USING gin (UPPER(name::text) gin_trgm_ops)',
+    ]
+
+    def search_candidates(self, user, query, limit=MAX_RESULTS):
+        from django.contrib.postgres.search import TrigramWordSimilarity
+        from django.db.models import Case, FloatField, Value, When
+        from django.db.models.functions import Coalesce
+
+        matches, category_ids = self.get_matches(user, query)
+        matches = matches.annotate(
+            rank=TrigramWordSimilarity(query, Coalesce('description', Value('')))
+            + Case(When(category_id__in=category_ids, then=Value(1.0)), default=Value(0.0), output_field=FloatField())
+        )
+        return list(matches.order_by('-rank', '-date', '-id').values_list(*self.CANDIDATE_FIELDS)[:limit])
+
+    def install(self, db_connection, populate=True):
+        with db_connection.cursor() as cursor:
+            for statement in self.INSTALL_SQL:
+                cursor.execute(statement)
+
+
+class FTSSearchBackend(SearchBackend):
+    """
+    SQLite backend using an FTS5 shadow table
+
+    expenses_transaction_fts mirrors each transaction's user, category name
+    and description, and is kept in sync by triggers on the transaction and
+    category tables. Query words match as prefixes, ranked by bm25.
+    """
+
+    TABLE = 'expenses_transaction_fts'
+
+    INSTALL_SQL = [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5("
+        "user_id, category, description, prefix='2 3', tokenize='unicode61 remove_diacritics 2')",
+        f"""CREATE TRIGGER IF NOT EXISTS {TABLE}_insert AFTER INSERT ON expenses_transaction BEGIN
+            INSERT INTO {TABLE}(rowid, user_id, category, description) VALUES (
+                new.id, new.user_id,
+                COALESCE((SELECT name FROM expenses_category WHERE id = new.category_id), ''),
+                COALESCE(new.description, ''));
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {TABLE}_update
+        AFTER UPDATE OF user_id, category_id, description ON expenses_transaction BEGIN
+            DELETE FROM {TABLE} WHERE rowid = old.id;
+            INSERT INTO {TABLE}(rowid, user_id, category, description) VALUES (
+                new.id, new.user_id,
+                COALESCE((SELECT name FROM expenses_category WHERE id = new.category_id), ''),
+                COALESCE(new.description, ''));
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {TABLE}_delete AFTER DELETE ON expenses_transaction BEGIN
+            DELETE FROM {TABLE} WHERE rowid = old.id;
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {TABLE}_category_rename
+        AFTER UPDATE OF name ON expenses_category BEGIN
+            UPDATE {TABLE} SET category = new.name
+            WHERE rowid IN (SELECT id FROM expenses_transaction WHERE category_id = new.id);
+        END""",
+    ]
+
+    POPULATE_SQL = f"""
+        INSERT INTO {TABLE}(rowid, user_id, category, description)
+        SELECT t.id, t.user_id, COALESCE(c.name, ''), COALESCE(t.description, '')
+        FROM expenses_transaction t LEFT JOIN expenses_category c ON c.id = t.category_id
+    """
+
+    def build_match(self, user, query):
+        """Build an FTS5 MATCH expression, or None if the query has no words"""
+        words = re.findall(r'\w+', query)
+        if not words:
+            return None
+        terms = ' '.join(f'"{word}"*' for word in words)
+        return f'user_id : "{user.id}" AND {{category description}} : ({terms})'
+
+    def search_candidates(self, user, query, limit=MAX_RESULTS):
+        match = self.build_match(user, query)
+        if match is None:
+            return []
+        # Raw SQL bypasses the router, so ask it where to read
+        with connections[router.db_for_read(Transaction)].cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid, category, description FROM {self.TABLE} WHERE {self.TABLE} MATCH %s "
+                f"ORDER BY bm25({self.TABLE}, 0.0, 2.0, 1.0), rowid DESC LIMIT %s",
+                [match, limit],
+            )
+            return cursor.fetchall()
+
+    def get_words(self, text):
+        """Split text into lowercase words without diacritics, roughly as the unicode61 tokenizer does"""
+        text = unicodedata.normalize('NFKD', text.lower())
+        return re.findall(r'\w+', ''.join(char for char in text if not unicodedata.combining(char)))
+
+    def matches(self, query, category, description):
+        # Every query word must start some word of the category or description
+        words = set(self.get_words(f"{category or ''} {description or ''}"))
+        return all(any(word.startswith(prefix) for word in words) for prefix in self.get_words(query))
+
+    def install(self, db_connection, populate=True):
+        with db_connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [self.TABLE]
+            )
+            created = cursor.fetchone() is None
+            for statement in self.INSTALL_SQL:
+                cursor.execute(statement)
+            if created and populate:
+                cursor.execute(self.POPULATE_SQL)
+
+
+VENDOR_BACKENDS = {
+    'postgresql': TrigramSearchBackend,
+    'sqlite': FTSSearchBackend,
+}
+
+
+def get_search_backend(vendor=None):
+    """
+    Get the search backend for the current database
+
+    TRANSACTION_SEARCH_BACKEND can name a SearchBackend subclass by dotted
+    path; otherwise the backend is picked from the database vendor.
+    """
+    backend_path = getattr(settings, 'TRANSACTION_SEARCH_BACKEND', None)
+    if backend_path:
+        return import_string(backend_path)()
+    return VENDOR_BACKENDS.get(vendor or connection.vendor, SimpleSearchBackend)()
+
+
+def search_archive(user, query, limit=MAX_RESULTS):
+    """
+    Substring-match a user's archived transactions, newest first
+
+    The archive has no search index, whatever the backend; it is only
+    scanned for users who have one.
+
+    Returns:
+        list: (id, category name, description) tuples
+    """
+    matches, category_ids = SimpleSearchBackend().get_matches(user, query, ArchivedTransaction)
+    return list(matches.order_by('-date', '-id').values_list(*SimpleSearchBackend.CANDIDATE_FIELDS)[:limit])
+
+
+def get_candidates(user, query):
+    """
+    Get a query's ranked matches, narrowing cached ones where possible
+
+    Every query's matches are cached for SEARCH_SESSION_SECONDS. A query
+    that extends a cached one ("foo" after "fo") can only match a subset
+    of it, so it is answered by filtering those candidates in memory
+    instead of searching the database again; they keep the shorter
+    query's order. Cached results for a user go stale with their data
+    version, so any write invalidates them.
+
+    Archived matches are ranked after every live one. They are cached
+    apart from the live ones and narrowed with the archive's substring
+    test rather than the backend's.
+
+    Returns:
+        list: (id, category name, description) tuples, best match first
+    """
+    backend = get_search_backend()
+    archive_backend = SimpleSearchBackend()
+    query = query.lower()
+    prefix = user_cache_key(user.id, 'search')
+    # Longest first: the exact query, then the queries it extends
+    keys = [
+        prefix + hashlib.md5(query[:length].encode(), usedforsecurity=False).hexdigest()
+        for length in range(len(query), 0, -1)
+    ]
+    cached = cache.get_many(keys)
+    for key in keys:
+        if key not in cached:
+            continue
+        complete, live, archived = cached[key]
+        if key == keys[0]:
+            return live + archived
+        if complete:
+            live = [row for row in live if backend.matches(query, row[1], row[2])]
+            archived = [row for row in archived if archive_backend.matches(query, row[1], row[2])]
+            cache.set(keys[0], (True, live, archived), SEARCH_SESSION_SECONDS)
+            return live + archived
+
+    live = backend.search_candidates(user, query, MAX_RESULTS)
+    archived = []
+    if len(live) < MAX_RESULTS and ArchivedTransaction in get_tiers(user.id):
+        archived = search_archive(user, query, MAX_RESULTS - len(live))
+    # Only a result under the limit holds every match of longer queries too
+    complete = len(live) + len(archived) < MAX_RESULTS
+    cache.set(keys[0], (complete, live, archived), SEARCH_SESSION_SECONDS)
+    return live + archived
+
+
+def paginate_search(user, query, cursor=None, page_size=None):
+    """
+    Get one page of ranked search results
+
+    The cursor is the position in the ranked id list, which is bounded by
+    MAX_RESULTS and comes straight from the search index.
+
+    Returns:
+        tuple: (list of transactions, next cursor or None)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    if page_size is None:
+        page_size = PAGE_SIZE
+    start = int(cursor) if cursor else 0
+    if start < 0:
+        raise ValueError(f"Invalid search cursor: {cursor}")
+
+    ids = [row[0] for row in get_candidates(user, query)]
+    page_ids = ids[start:start + page_size]
+    transactions = Transaction.objects.filter(user=user, id__in=page_ids).select_related('category').in_bulk()
+    missing = [pk for pk in page_ids if pk not in transactions]
+    if missing:
+        # Archived matches, or rows deleted since the matches were cached
+        transactions.update(
+            ArchivedTransaction.objects.filter(user=user, id__in=missing).select_related('category').in_bulk()
+        )
+    page = [transactions[pk] for pk in page_ids if pk in transactions]
+
+    next_cursor = str(start + page_size) if len(ids) > start + page_size else None
+    return page, next_cursor
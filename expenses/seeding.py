@@ -0,0 +1,189 @@
+import itertools
+import math
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction as db_transaction
+
+from . import rollups
+from .caching import bump_data_version
+from .models import Budget, Category, Transaction
+
+# Rows written per bulk_create batch
+BATCH_SIZE = 5000
+
+# Expense category -> (relative frequency, median amount, lognormal sigma, descriptions)
+# Category names match the defaults created for every new user
+EXPENSE_PROFILE = {
+    'Food & Dining': (30, 350, 0.8, ['Swiggy order', 'Zomato order', 'BigBasket groceries', 'Cafe Coffee Day', 'Dinner out']),
+    'Transportation': (18, 180, 0.9, ['Uber ride', 'Ola ride', 'Metro card recharge', 'Petrol', 'Auto rickshaw']),
+    'Shopping': (14, 1200, 1.0, ['Amazon order', 'Flipkart order', 'Myntra order', 'DMart']),
+    'Bills & Utilities': (10, 1500, 0.6, ['Electricity bill', 'Mobile recharge', 'Broadband bill', 'Water bill']),
+    'Entertainment': (8, 500, 0.7, ['Netflix subscription', 'Movie tickets', 'Spotify subscription', 'Concert tickets']),
+    'Healthcare': (5, 800, 1.1, ['Pharmacy', 'Doctor visit', 'Lab tests']),
+    'Savings': (3, 5000, 0.5, ['SIP instalment', 'Recurring deposit', 'PPF deposit']),
+    None: (5, 300, 1.2, ['Cash withdrawal', 'Misc', '']),
+}
+
+# Income rows: (relative frequency, median amount, lognormal sigma, descriptions)
+INCOME_PROFILE = (6, 30000, 0.9, ['Salary', 'Freelance payment', 'Refund', 'Interest credit'])
+
+# Weekend days see more spending
+WEEKEND_WEIGHT = 1.4
+
+# Budget period -> multiple of the category's median amount
+BUDGET_SIZES = {
+    'monthly': 25,
+    'yearly': 250,
+    'one-time': 10,
+}
+
+
+def random_amount(rng, median, sigma):
+    """Draw a lognormally distributed amount, rounded to paise"""
+    amount = rng.lognormvariate(math.log(median), sigma)
+    return Decimal(str(round(min(max(amount, 1), 9999999), 2)))
+
+
+def generate_transactions(user, categories, count, days, rng, today=None):
+    """
+    Yield unsaved synthetic transactions for a user
+
+    Args:
+        user: Owner of the transactions
+        categories: dict of category name -> Category
+        count: Number of transactions
+        days: Spread the dates over this many days up to today
+        rng: random.Random instance, for reproducible output
+        today: Last date used (defaults to today)
+
+    Yields:
+        Transaction: Unsaved instances
+    """
+    today = today or date.today()
+    dates = [today - timedelta(days=offset) for offset in range(days)]
+    # Cumulative weights, so each draw is a bisect rather than a full scan
+    date_weights = list(itertools.accumulate(WEEKEND_WEIGHT if day.weekday() >= 5 else 1 for day in dates))
+
+    profiles = [('Expense', name, profile) for name, profile in EXPENSE_PROFILE.items()]
+    profiles.append(('Income', 'Income', INCOME_PROFILE))
+    profile_weights = list(itertools.accumulate(profile[0] for _, _, profile in profiles))
+
+    for _ in range(count):
+        transaction_type, name, (_, median, sigma, descriptions) = rng.choices(profiles, cum_weights=profile_weights)[0]
+        yield Transaction(
+            user=user,
+            category=categories.get(name),
+            transaction_type=transaction_type,
+            amount=random_amount(rng, median, sigma),
+            date=rng.choices(dates, cum_weights=date_weights)[0],
+            description=rng.choice(descriptions),
+        )
+
+
+def create_budgets(user, categories, rng, days, today=None):
+    """Create one budget of every Budget.PERIOD_CHOICES kind on distinct categories"""
+    today = today or date.today()
+    names = rng.sample([name for name in EXPENSE_PROFILE if name in categories], len(BUDGET_SIZES))
+    budgets = []
+    for (period, size), name in zip(BUDGET_SIZES.items(), names):
+        median = EXPENSE_PROFILE[name][1]
+        budgets.append(Budget(
+            user=user,
+            category=categories[name],
+            amount=Decimal(median * size),
+            period=period,
+            start_date=today - timedelta(days=30 if period == 'one-time' else days),
+        ))
+    return Budget.objects.bulk_create(budgets)
+
+
+def seed_user(username, transactions, days=365, rng=None, batch_size=BATCH_SIZE):
+    """
+    Create a user with a synthetic ledger and budgets
+
+    Transactions are written with bulk_create in batches; their rollup
+    deltas are applied once at the end, as for imports.
+
+    Args:
+        username: Name of the new user
+        transactions: Number of transactions to create
+        days: Spread the dates over this many days up to today
+        rng: Optional random.Random instance, for reproducible output
+        batch_size: Rows per bulk_create batch
+
+    Returns:
+        User: The new user
+    """
+    rng = rng or random.Random()
+    with db_transaction.atomic():
+        user = User(username=username)
+        user.set_unusable_password()
+        user.save()  # Default categories come from the post_save signal
+        categories = {category.name: category for category in Category.objects.filter(user=user)}
+
+        deltas = {}
+        batch = []
+        for transaction in generate_transactions(user, categories, transactions, days, rng):
+            batch.append(transaction)
+            if len(batch) >= batch_size:
+                Transaction.objects.bulk_create(batch)
+                rollups.collect_deltas(batch, deltas)
+                batch = []
+        if batch:
+            Transaction.objects.bulk_create(batch)
+            rollups.collect_deltas(batch, deltas)
+        rollups.apply_deltas(deltas)
+
+        create_budgets(user, categories, rng, days)
+    bump_data_version(user.id)
+    return user
+
+
+def seed_benchmark_data(users, transactions, days=365, prefix='bench', seed=0, progress=None):
+    """
+    Create users with synthetic ledgers
+
+    Args:
+        users: Number of users, named <prefix>_0, <prefix>_1, ...
+        transactions: Transactions per user
+        days: Spread the dates over this many days up to today
+        prefix: Username prefix
+        seed: Random seed; the same seed produces the same data
+        progress: Optional callable(user) invoked after every user
+
+    Returns:
+        list: The created users
+    """
+    rng = random.Random(seed)
+    created = []
+    for index in range(users):
+        user = seed_user(f'{prefix}_{index}', transactions, days, rng)
+        created.append(user)
+        if progress is not None:
+            progress(user)
+    return created
+
+
+def delete_users(users):
+    """
+    Delete users along with their whole ledgers, quickly
+
+    A plain delete() sends per-row signals for every transaction. Since the
+    users' rollups, budgets and categories all go with them, the
+    transactions are removed with one DELETE first.
+
+    Args:
+        users: QuerySet of users
+    """
+    user_ids = list(users.values_list('id', flat=True))
+    if not user_ids:
+        return
+    table = connection.ops.quote_name(Transaction._meta.db_table)
+    placeholders = ', '.join(['%s'] * len(user_ids))
+    with db_transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {table} WHERE user_id IN ({placeholders})', user_ids)
+        User.objects.filter(id__in=user_ids).delete()
@@ -1,7 +1,14 @@
-from django.db.models.signals import post_save
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete, pre_delete, post_migrate
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import Category
+from .models import Budget, Category, Transaction
+from . import budgets, rollups
+from .search import FTSSearchBackend
+from .caching import bump_data_version
+from .fragments import card_cache
+from .metrics import record_query
 
 
 @receiver(post_save, sender=User)
@@ -60,3 +67,91 @@ def create_default_categories(sender, instance, created, **kwargs):
                 icon=category_data['icon'],
                 color=category_data['color']
             )
+
+
+@receiver(post_delete, sender=Transaction)
+def remove_transaction_from_rollup(sender, instance, origin=None, **kwargs):
+    """
+    Keep MonthlySummary and budget counters in step with deleted transactions
+
+    Runs inside the deletion's DB transaction. Skipped when the whole user
+    is being deleted, since their rollup rows cascade anyway.
+    """
+    if isinstance(origin, User):
+        return
+    rollups.record_transaction_delete(instance)
+    budgets.record_spend_delete(instance)
+
+
+@receiver(post_save, sender=Budget)
+def refresh_budget_spend(sender, instance, created, **kwargs):
+    """
+    Recount an edited budget's current period
+
+    Its category, period or start date may have changed, so every stored
+    counter is dropped first.
+    """
+    if not created:
+        budgets.reset_spend(instance)
+    budgets.get_spent_amounts([instance])
+
+
+@receiver(pre_delete, sender=Category)
+def fold_category_rollup(sender, instance, origin=None, **kwargs):
+    """
+    Move a deleted category's rollup totals to the uncategorized bucket
+    """
+    if isinstance(origin, User):
+        return
+    rollups.fold_category(instance)
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+@receiver(post_save, sender=Budget)
+@receiver(post_delete, sender=Budget)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_user_cache(sender, instance, origin=None, **kwargs):
+    """
+    Bump the owner's data version so cached dashboard/budget data is dropped
+    """
+    if isinstance(origin, User) or instance.user_id is None:
+        return
+    bump_data_version(instance.user_id)
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+def discard_transaction_card(sender, instance, **kwargs):
+    """
+    Drop the transaction's rendered card from this process's fragment cache
+
+    Other processes notice the changed card version on their next lookup.
+    """
+    card_cache.discard(instance.pk)
+
+
+@receiver(post_migrate)
+def ensure_search_triggers(sender, using, **kwargs):
+    """
+    Re-create the SQLite FTS triggers after migrations
+
+    SQLite rebuilds a table for most ALTERs, which silently drops the
+    triggers that keep the search shadow table in sync. Every statement
+    is idempotent.
+    """
+    connection = connections[using]
+    if sender.label != 'expenses' or connection.vendor != 'sqlite':
+        return
+    if FTSSearchBackend.TABLE in connection.introspection.table_names():
+        FTSSearchBackend().install(connection, populate=False)
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    """
+    Time queries for InstrumentationMiddleware on every DB connection
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
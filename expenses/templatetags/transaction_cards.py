@@ -0,0 +1,11 @@
+from django import template
+
+from expenses.fragments import render_transaction_cards
+
+register = template.Library()
+
+
+@register.simple_tag
+def transaction_cards(transactions):
+    """Render transaction cards through the per-process fragment cache"""
+    return render_transaction_cards(transactions)
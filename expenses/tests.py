@@ -1 +1,1563 @@
-from django.test import TestCase
+import json
+import re
+import threading
+from datetime import date, timedelta
+from io import StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+from collections import Counter
+from decimal import Decimal
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, connections, transaction as db_transaction
+from django.db.models import F, Sum
+from django.template import engines
+from django.test import AsyncRequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from . import alerts, archive, async_views, benchmarks, checks, metrics, recurring, reports, rollups, warmup
+from .budgets import compute_spent_amounts, get_spent_amounts, reconcile_spend, summarize_budgets
+from .pagination import decode_cursor, keyset_filter, paginate_transactions
+from .search import SimpleSearchBackend, get_candidates, get_search_backend
+from .periods import get_period_range, period_filter
+from .importers import import_transactions
+from .concurrency import gather_queries
+from .dashboard import DASHBOARD_PANELS, compute_heatmap, get_daily_totals, get_transaction_days
+from .seeding import delete_users, seed_benchmark_data
+from .fragments import FragmentCache, card_cache
+from .money import money, to_money, to_paise
+from .routers import PIN_COOKIE, ReplicaRouter, read_from_replicas
+from .models import (
+    ArchivedTransaction, ArchivePeriod, Budget, BudgetAlert, BudgetPeriodSpend, Category, MonthlySummary,
+    RecurringTransaction, Transaction, UserDataVersion,
+)
+
+
+def data_queries(queries):
+    """SQL of captured queries that read app data, leaving out the data version lookup"""
+    return [
+        query['sql'] for query in queries
+        if 'expenses_' in query['sql'] and 'expenses_userdataversion' not in query['sql']
+    ]
+
+
+@override_settings(
+    SECURE_SSL_REDIRECT=False,
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+)
+class FinanceTestCase(TestCase):
+    """Shared fixtures: one logged-in user with a couple of categories"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='alice', password='secret')
+        self.client.force_login(self.user)
+        self.food = Category.objects.get(user=self.user, name='Food & Dining')
+        self.transport = Category.objects.get(user=self.user, name='Transportation')
+
+    def add_transaction(self, amount, category=None, transaction_type='Expense',
+                        on=None, description=''):
+        return Transaction.objects.create(
+            user=self.user,
+            category=category,
+            transaction_type=transaction_type,
+            amount=Decimal(amount),
+            date=on or date.today(),
+            description=description,
+        )
+
+
+class BudgetSummaryTests(FinanceTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.target = date(2026, 2, 15)
+        self.add_transaction('100.00', self.food, on=date(2026, 2, 1))
+        self.add_transaction('50.00', self.food, on=date(2026, 1, 20))
+        self.add_transaction('25.00', self.food, on=date(2025, 12, 31))
+        self.add_transaction('999.00', self.food, transaction_type='Income', on=date(2026, 2, 2))
+        self.add_transaction('40.00', self.transport, on=date(2026, 2, 3))
+
+        self.monthly = Budget.objects.create(
+            user=self.user, category=self.food, amount=Decimal('120.00'), period='monthly')
+        self.yearly = Budget.objects.create(
+            user=self.user, category=self.food, amount=Decimal('100.00'), period='yearly')
+        self.one_time = Budget.objects.create(
+            user=self.user, category=self.food, amount=Decimal('500.00'),
+            period='one-time', start_date=date(2026, 1, 1))
+        self.other = Budget.objects.create(
+            user=self.user, category=self.transport, amount=Decimal('0.00'), period='monthly')
+
+    def test_summary_matches_per_budget_methods(self):
+        budgets = Budget.objects.filter(user=self.user).select_related('category')
+        summary = {row['id']: row for row in summarize_budgets(budgets, self.target)}
+
+        self.assertEqual(summary[self.monthly.id]['total_expenses'], Decimal('100.00'))
+        self.assertEqual(summary[self.yearly.id]['total_expenses'], Decimal('150.00'))
+        self.assertEqual(summary[self.one_time.id]['total_expenses'], Decimal('150.00'))
+        self.assertEqual(summary[self.other.id]['total_expenses'], Decimal('40.00'))
+
+        for budget in budgets:
+            row = summary[budget.id]
+            self.assertEqual(row['total_expenses'], budget.get_spent_amount(self.target))
+            self.assertEqual(row['remaining_budget'], budget.get_remaining_amount(self.target))
+            self.assertEqual(row['percentage'], budget.get_percentage_used(self.target))
+            self.assertEqual(row['status_color'], budget.get_status_color(self.target))
+            self.assertEqual(row['is_over_budget'], budget.is_over_budget(self.target))
+
+    def test_summary_uses_constant_queries(self):
+        budgets = list(Budget.objects.filter(user=self.user).select_related('category'))
+        # Counters for a new period: read, one grouped ledger query, one insert
+        with self.assertNumQueries(3):
+            summarize_budgets(budgets, self.target)
+        with self.assertNumQueries(1):
+            summarize_budgets(budgets, self.target)
+
+    def test_view_budget_renders_summary(self):
+        response = self.client.get(reverse('expenses:view_budget'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['budget_summary']), 4)
+
+
+class MonthlySummaryTests(FinanceTestCase):
+
+    def assertRollupsMatchLedger(self):
+        self.assertEqual(rollups.verify_rollups(), [])
+
+    def test_rollup_follows_create_update_delete(self):
+        txn = self.add_transaction('100.00', self.food, on=date(2026, 2, 1))
+        self.add_transaction('300.00', transaction_type='Income', on=date(2026, 2, 5))
+        self.assertEqual(rollups.get_cashflow(self.user, 2026, 2),
+                         {'incoming': Decimal('300.00'), 'outgoing': Decimal('100.00')})
+
+        txn.amount = Decimal('60.00')
+        txn.date = date(2026, 1, 31)
+        txn.category = self.transport
+        txn.save()
+        self.assertRollupsMatchLedger()
+        self.assertEqual(rollups.get_cashflow(self.user, 2026, 2)['outgoing'], Decimal('0.00'))
+        self.assertEqual(rollups.get_balance(self.user), Decimal('240.00'))
+
+        txn.delete()
+        self.assertRollupsMatchLedger()
+        self.assertEqual(rollups.get_balance(self.user), Decimal('300.00'))
+
+    def test_deleting_category_keeps_totals(self):
+        self.add_transaction('10.00', self.food, on=date(2026, 2, 1))
+        self.add_transaction('5.00', on=date(2026, 2, 1))
+        self.food.delete()
+        self.assertRollupsMatchLedger()
+        self.assertEqual(MonthlySummary.objects.get(user=self.user).total, Decimal('15.00'))
+
+    def test_deleting_user_cascades(self):
+        self.add_transaction('10.00', self.food)
+        self.user.delete()
+        self.assertFalse(MonthlySummary.objects.exists())
+
+    def test_rebuild_and_verify_command(self):
+        self.add_transaction('10.00', self.food)
+        MonthlySummary.objects.update(total=Decimal('1.00'))
+        with self.assertRaises(CommandError):
+            call_command('monthly_summary', 'verify', stdout=StringIO())
+        call_command('monthly_summary', 'rebuild', stdout=StringIO())
+        self.assertRollupsMatchLedger()
+
+    def test_dashboard_reads_rollups(self):
+        self.add_transaction('250.00', transaction_type='Income')
+        self.add_transaction('50.00', self.food)
+        response = self.client.get(reverse('expenses:dashboard_panel', args=['balance']))
+        self.assertEqual(response.context['total_balance'], Decimal('200.00'))
+        response = self.client.get(reverse('expenses:dashboard_panel', args=['cashflow']))
+        self.assertEqual(response.context['monthly_expense'], Decimal('50.00'))
+        response = self.client.get(reverse('expenses:dashboard_panel', args=['categories']))
+        self.assertEqual([row.total for row in response.context['category_spending']], [Decimal('50.00')])
+
+
+class DashboardPanelTests(FinanceTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.add_transaction('1500.00', transaction_type='Income')
+        self.add_transaction('40.00', self.food, description='Groceries')
+
+    def test_shell_runs_no_data_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('expenses:dashboard'))
+        self.assertEqual(data_queries(queries), [])
+        for panel in DASHBOARD_PANELS:
+            self.assertContains(response, f'hx-get="{reverse("expenses:dashboard_panel", args=[panel])}"')
+        self.assertNotContains(response, 'Groceries')
+
+    def test_panels(self):
+        expected = {
+            'balance': '₹1460.00',
+            'cashflow': '₹1500.00',
+            'recent': 'Groceries',
+            'calendar': str(date.today().day),
+            'categories': 'Food &amp; Dining',
+        }
+        for panel, text in expected.items():
+            with self.subTest(panel):
+                response = self.client.get(reverse('expenses:dashboard_panel', args=[panel]))
+                self.assertTemplateUsed(response, f'expenses/partials/dashboard_{panel}.html')
+                self.assertTemplateNotUsed(response, 'base_tailwind.html')
+                self.assertContains(response, text)
+
+    def test_unknown_panel(self):
+        self.assertEqual(self.client.get(reverse('expenses:dashboard_panel', args=['nope'])).status_code, 404)
+
+class KeysetPaginationTests(FinanceTestCase):
+
+    def setUp(self):
+        super().setUp()
+        for day in range(1, 8):
+            for index in range(3):
+                self.add_transaction(f'{day}.0{index}', self.food, on=date(2026, 1, day),
+                                     description=f'lunch {day}' if index else f'taxi {day}')
+
+    def test_pages_cover_ledger_in_order(self):
+        expected = list(Transaction.objects.filter(user=self.user).values_list('id', flat=True))
+        seen, cursor = [], None
+        while True:
+            page, cursor = paginate_transactions(
+                Transaction.objects.filter(user=self.user), cursor, page_size=4)
+            seen.extend(txn.id for txn in page)
+            if cursor is None:
+                break
+        self.assertEqual(seen, expected)
+
+    @patch('expenses.pagination.PAGE_SIZE', 5)
+    def test_load_more_follows_cursor(self):
+        url = reverse('expenses:search_transactions')
+        expected = list(Transaction.objects.filter(user=self.user).values_list('id', flat=True))
+
+        seen, params = [], {}
+        while True:
+            response = self.client.get(url, params)
+            seen.extend(txn.id for txn in response.context['transactions'])
+            cursor = response.context['next_cursor']
+            if cursor is None:
+                self.assertNotContains(response, 'load-more-transactions')
+                break
+            self.assertContains(response, 'hx-trigger="revealed, click"')
+            params = {'cursor': cursor}
+        self.assertEqual(seen, expected)
+
+    def test_invalid_cursor(self):
+        url = reverse('expenses:search_transactions')
+        self.assertEqual(self.client.get(url, {'cursor': 'bogus'}).status_code, 400)
+
+
+class SearchBackendTests(FinanceTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.groceries = self.add_transaction('10.00', self.food, description='Weekly groceries')
+        self.taxi = self.add_transaction('20.00', self.transport, description='Taxi to the food market')
+        self.cinema = self.add_transaction('30.00', description='Cinema tickets')
+        other = User.objects.create_user(username='bob', password='secret')
+        Transaction.objects.create(user=other, transaction_type='Expense',
+                                   amount=Decimal('5.00'), description='Food truck')
+
+    def search(self, query):
+        return get_search_backend().search(self.user, query)
+
+    def test_ranked_prefix_matches(self):
+        # The category match outranks the description match
+        self.assertEqual(self.search('foo'), [self.groceries.id, self.taxi.id])
+        self.assertEqual(self.search('groc'), [self.groceries.id])
+        self.assertEqual(self.search('!!'), [])
+
+    def test_index_follows_writes(self):
+        self.cinema.description = 'Concert tickets'
+        self.cinema.save()
+        self.assertEqual(self.search('cinema'), [])
+        self.assertEqual(self.search('concert'), [self.cinema.id])
+
+        self.transport.name = 'Travel'
+        self.transport.save()
+        self.assertEqual(self.search('travel'), [self.taxi.id])
+
+        self.groceries.delete()
+        self.assertEqual(self.search('groceries'), [])
+
+    @override_settings(TRANSACTION_SEARCH_BACKEND='expenses.search.SimpleSearchBackend')
+    def test_backend_setting(self):
+        self.assertIsInstance(get_search_backend(), SimpleSearchBackend)
+        self.assertEqual(self.search('ood'), [self.taxi.id, self.groceries.id])
+
+    @patch('expenses.search.PAGE_SIZE', 1)
+    def test_search_view_pages(self):
+        url = reverse('expenses:search_transactions')
+        response = self.client.get(url, {'q': 'food'})
+        self.assertEqual(response.context['transactions'], [self.groceries])
+        response = self.client.get(url, {'q': 'food', 'cursor': response.context['next_cursor']})
+        self.assertEqual(response.context['transactions'], [self.taxi])
+        self.assertIsNone(response.context['next_cursor'])
+
+
+class SearchSessionTests(FinanceTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.add_transaction('10.00', self.food, description='Weekly groceries')
+        self.add_transaction('20.00', self.transport, description='Taxi to the food market')
+        self.add_transaction('30.00', description='Café Coffee Day')
+        self.add_transaction('40.00', description='Grocery run, Fresh Foods')
+
+    def assertNarrowsLikeTheDatabase(self, queries):
+        backend = get_search_backend()
+        get_candidates(self.user, queries[0])
+        for query in queries[1:]:
+            with CaptureQueriesContext(connection) as captured:
+                narrowed = get_candidates(self.user, query)
+            self.assertEqual(data_queries(captured), [])
+            self.assertEqual({row[0] for row in narrowed}, set(backend.search(self.user, query)), query)
+
+    def test_refinements_skip_the_database(self):
+        self.assertNarrowsLikeTheDatabase(['f', 'fo', 'foo', 'food', 'food m', 'food ma'])
+        self.assertNarrowsLikeTheDatabase(['g', 'gr', 'groc', 'groce'])
+        self.assertNarrowsLikeTheDatabase(['c', 'ca', 'caf', 'cafe'])
+
+    @override_settings(TRANSACTION_SEARCH_BACKEND='expenses.search.SimpleSearchBackend')
+    def test_refinements_with_substring_backend(self):
+        self.assertNarrowsLikeTheDatabase(['o', 'oo', 'ood', 'ood ', 'ood m'])
+        self.assertNarrowsLikeTheDatabase(['Tr', 'Tra', 'tran'])
+
+    def test_writes_invalidate(self):
+        get_candidates(self.user, 'taxi')
+        with self.captureOnCommitCallbacks(execute=True):
+            taxi = self.add_transaction('5.00', self.transport, description='Taxi home')
+        self.assertIn(taxi.id, [row[0] for row in get_candidates(self.user, 'taxi h')])
+
+    @patch('expenses.search.MAX_RESULTS', 1)
+    def test_truncated_results_are_not_narrowed(self):
+        get_candidates(self.user, 'g')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(len(get_candidates(self.user, 'gr')), 1)
+        self.assertTrue(queries)
+
+
+class PeriodRangeTests(TestCase):
+
+    def test_period_ranges(self):
+        day = date(2026, 2, 18)  # a Wednesday
+        self.assertEqual(get_period_range('daily', day), (day, date(2026, 2, 19)))
+        self.assertEqual(get_period_range('weekly', day), (date(2026, 2, 15), date(2026, 2, 22)))
+        self.assertEqual(get_period_range('monthly', day), (date(2026, 2, 1), date(2026, 3, 1)))
+        self.assertEqual(get_period_range('quarterly', day), (date(2026, 1, 1), date(2026, 4, 1)))
+        self.assertEqual(get_period_range('yearly', day), (date(2026, 1, 1), date(2027, 1, 1)))
+        self.assertEqual(get_period_range('fiscal-year', day), (date(2025, 4, 1), date(2026, 4, 1)))
+        self.assertEqual(get_period_range('monthly', date(2026, 12, 31)), (date(2026, 12, 1), date(2027, 1, 1)))
+        with self.assertRaises(ValueError):
+            get_period_range('fortnightly', day)
+
+
+class IndexUsageTests(FinanceTestCase):
+    """EXPLAIN every hot query and check it is served by the intended index"""
+
+    def setUp(self):
+        super().setUp()
+        for day in range(1, 29):
+            self.add_transaction('10.00', self.food, on=date(2026, 2, day))
+
+    def assertUsesIndex(self, queryset, index_name):
+        if connection.vendor == 'postgresql':
+            # Tiny test tables would otherwise always be sequentially scanned
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        plan = queryset.explain()
+        self.assertIn(index_name, plan, f"{index_name} not used:\n{plan}\n{queryset.query}")
+
+    def test_dashboard_month_range(self):
+        month = Transaction.objects.filter(period_filter('monthly', date(2026, 2, 10)), user=self.user)
+        self.assertUsesIndex(month, 'txn_user_date_idx')
+
+    def test_recent_activity_and_keyset_page(self):
+        transactions = Transaction.objects.filter(user=self.user)
+        self.assertUsesIndex(transactions.order_by('-date', '-id')[:5], 'txn_user_date_idx')
+        page, cursor = paginate_transactions(transactions, page_size=10)
+        next_page = transactions.filter(keyset_filter(*decode_cursor(cursor)))
+        self.assertUsesIndex(next_page.order_by('-date', '-id')[:10], 'txn_user_date_idx')
+        if connection.vendor == 'sqlite':
+            # The index seek is bounded by the cursor date, not a full walk
+            self.assertIn('date<?', next_page.explain().replace(' ', ''))
+
+    def test_budget_spend(self):
+        budget = Budget.objects.create(user=self.user, category=self.food, amount=Decimal('100.00'))
+        spend = Transaction.objects.filter(
+            period_filter('monthly', date(2026, 2, 10)),
+            user=self.user, category=budget.category, transaction_type='Expense',
+        )
+        self.assertUsesIndex(spend, 'txn_user_cat_type_date_idx')
+
+    def test_monthly_summary_cashflow(self):
+        cashflow = MonthlySummary.objects.filter(user=self.user, year=2026, month=2)
+        self.assertUsesIndex(cashflow, 'monthly_summary_user_month_idx')
+
+
+class UserCacheTests(FinanceTestCase):
+
+    def aggregate_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return data_queries(queries)
+
+    def test_repeat_dashboard_makes_no_data_queries(self):
+        self.add_transaction('50.00', self.food)
+        for panel in DASHBOARD_PANELS:
+            with self.subTest(panel):
+                url = reverse('expenses:dashboard_panel', args=[panel])
+                self.assertTrue(self.aggregate_queries(url))
+                self.assertEqual(self.aggregate_queries(url), [])
+
+    def test_writes_invalidate_dashboard_and_budgets(self):
+        Budget.objects.create(user=self.user, category=self.food, amount=Decimal('100.00'))
+        cashflow = reverse('expenses:dashboard_panel', args=['cashflow'])
+        self.client.get(cashflow)
+        self.client.get(reverse('expenses:view_budget'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.add_transaction('40.00', self.food)
+
+        response = self.client.get(cashflow)
+        self.assertEqual(response.context['monthly_expense'], Decimal('40.00'))
+        response = self.client.get(reverse('expenses:view_budget'))
+        self.assertEqual(response.context['budget_summary'][0]['total_expenses'], Decimal('40.00'))
+
+    def test_versions_are_per_user(self):
+        other = User.objects.create_user(username='bob', password='secret')
+        url = reverse('expenses:dashboard_panel', args=['balance'])
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Transaction.objects.create(user=other, transaction_type='Income', amount=Decimal('1.00'))
+        self.assertEqual(self.aggregate_queries(url), [])
+
+
+class SharedCacheCheckTests(TestCase):
+
+    def test_warns_about_process_local_cache(self):
+        local = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        with override_settings(CACHES=local):
+            self.assertEqual([warning.id for warning in checks.check_shared_cache(None)], ['expenses.W001'])
+        shared = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://x'}}
+        with override_settings(CACHES=shared):
+            self.assertEqual(checks.check_shared_cache(None), [])
+
+
+class ImportTests(FinanceTestCase):
+
+    CSV = (
+        'Date,Type,Amount,Category,Description\n'
+        '2026-02-01,Expense,120.50,food & dining,Groceries\n'
+        '02/02/2026,Income,"5,000.00",Salary,February pay\n'
+        '2026-02-03,,-40,Transportation,Metro card\n'
+        'yesterday,Expense,10,,Bad date\n'
+        '2026-02-04,Expense,abc,,Bad amount\n'
+    )
+
+    OFX = (
+        'OFXHEADER:100\n<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>\n'
+        '<STMTTRN>\n<TRNTYPE>DEBIT\n<DTPOSTED>20260205120000\n<TRNAMT>-99.99\n<NAME>Coffee\n</STMTTRN>\n'
+        '<STMTTRN><TRNTYPE>CREDIT</TRNTYPE><DTPOSTED>20260206</DTPOSTED>'
+        '<TRNAMT>250.00</TRNAMT><MEMO>Refund</MEMO></STMTTRN>\n'
+        '</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>\n'
+    )
+
+    def test_csv_import(self):
+        batches = []
+        result = import_transactions(self.user, StringIO(self.CSV), batch_size=2,
+                                     progress=lambda result: batches.append(result['imported']))
+        self.assertEqual((result['processed'], result['imported'], result['failed']), (5, 3, 2))
+        self.assertEqual([line for line, message in result['errors']], [5, 6])
+        self.assertEqual(batches, [2, 3])
+
+        groceries = Transaction.objects.get(description='Groceries')
+        self.assertEqual(groceries.category, self.food)
+        metro = Transaction.objects.get(description='Metro card')
+        self.assertEqual((metro.transaction_type, metro.amount), ('Expense', Decimal('40.00')))
+        self.assertTrue(Category.objects.filter(user=self.user, name='Salary').exists())
+        self.assertEqual(rollups.verify_rollups(), [])
+        self.assertEqual(rollups.get_balance(self.user), Decimal('4839.50'))
+
+    def test_ofx_import(self):
+        result = import_transactions(self.user, StringIO(self.OFX), 'ofx')
+        self.assertEqual(result['imported'], 2)
+        coffee = Transaction.objects.get(description='Coffee')
+        self.assertEqual((coffee.date, coffee.transaction_type), (date(2026, 2, 5), 'Expense'))
+        self.assertEqual(Transaction.objects.get(description='Refund').transaction_type, 'Income')
+
+    def test_missing_columns(self):
+        result = import_transactions(self.user, StringIO('when,how much\n2026-01-01,1\n'))
+        self.assertEqual(result['imported'], 0)
+        self.assertIn('missing column', result['errors'][0][1])
+
+    def test_upload_view_and_command(self):
+        upload = SimpleUploadedFile('statement.csv', self.CSV.encode('utf-8-sig'))
+        response = self.client.post(reverse('expenses:import_transactions'), {'file': upload})
+        self.assertEqual(response.context['result']['imported'], 3)
+        self.assertContains(response, 'Line 5: Unrecognised date')
+
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = Path(directory.name) / 'statement.ofx'
+        path.write_text(self.OFX)
+        out = StringIO()
+        call_command('import_transactions', 'alice', str(path), stdout=out)
+        self.assertIn('Imported 2 of 2 rows', out.getvalue())
+
+
+class ExportTests(FinanceTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.add_transaction('10.50', self.food, on=date(2026, 1, 5), description='Lunch, with "friends"')
+        self.add_transaction('2000.00', transaction_type='Income', on=date(2026, 1, 31))
+        self.add_transaction('99.00', self.transport, on=date(2026, 2, 1))
+
+    def export(self, **params):
+        response = self.client.get(reverse('expenses:export_transactions'), params)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_export(self):
+        lines = self.export().splitlines()
+        self.assertEqual(lines[0], 'date,type,amount,category,description')
+        self.assertEqual(lines[1], '2026-01-05,Expense,10.50,Food & Dining,"Lunch, with ""friends"""')
+        self.assertEqual(len(lines), 4)
+
+    def test_ndjson_export_with_filters(self):
+        rows = [json.loads(line) for line in self.export(
+            format='ndjson', start='2026-01-01', end='2026-01-31', category=self.food.id).splitlines()]
+        self.assertEqual(rows, [{
+            'date': '2026-01-05', 'type': 'Expense', 'amount': '10.50',
+            'category': 'Food & Dining', 'description': 'Lunch, with "friends"',
+        }])
+
+    def test_bad_parameters(self):
+        url = reverse('expenses:export_transactions')
+        self.assertEqual(self.client.get(url, {'format': 'xml'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'start': 'last week'}).status_code, 400)
+
+
+class AsyncViewTests(FinanceTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.factory = AsyncRequestFactory()
+        self.add_transaction('40.00', self.food, description='Groceries')
+        self.add_transaction('1500.00', transaction_type='Income')
+        Budget.objects.create(user=self.user, category=self.food, amount=Decimal('200.00'),
+                              period='monthly', start_date=date.today())
+
+    def request(self, method='get', path='/', data=None, user=None):
+        request = getattr(self.factory, method)(path, data or {})
+        request.user = user or self.user
+        return request
+
+    async def test_budget_page(self):
+        response = await async_views.view_budget(self.request())
+        self.assertContains(response, 'Food &amp; Dining')
+
+        response = await async_views.view_budget(self.request('post', data={
+            'category': 'Transportation', 'amount': '80.00', 'period': 'monthly',
+        }))
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(await Budget.objects.filter(user=self.user, category=self.transport).aexists())
+
+    async def test_login_required(self):
+        response = await async_views.view_budget(self.request(user=AnonymousUser()))
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('?next=/', response['Location'])
+
+
+class ConcurrentQueryTests(TransactionTestCase):
+
+    def test_queries_run_in_worker_threads(self):
+        user = User.objects.create_user(username='bob')
+        Transaction.objects.create(user=user, amount=Decimal('5.00'), transaction_type='Expense', date=date.today())
+
+        results = async_to_sync(gather_queries)({
+            'count': lambda: Transaction.objects.filter(user=user).count(),
+            'thread': threading.get_ident,
+        })
+        self.assertEqual(results['count'], 1)
+        self.assertNotEqual(results['thread'], threading.get_ident())
+
+    def test_worker_threads_release_old_connections(self):
+        # Worker threads never see request_finished, so each query cleans up
+        with patch('expenses.concurrency.close_old_connections') as close_old:
+            async_to_sync(gather_queries)({'a': lambda: 1, 'b': lambda: 2})
+        self.assertEqual(close_old.call_count, 2)
+
+
+class MetricsTests(FinanceTestCase):
+
+    def setUp(self):
+        super().setUp()
+        metrics.reset()
+        self.add_transaction('12.00', self.food)
+
+    def test_histogram_quantiles(self):
+        histogram = metrics.Histogram((1, 2, 4))
+        for value in (0.5, 1.5, 1.5, 3, 100):
+            histogram.observe(value)
+        self.assertEqual(histogram.count, 5)
+        self.assertEqual(histogram.quantile(0.5), 1.75)
+        self.assertEqual(histogram.quantile(0.99), 4)
+        self.assertEqual(metrics.Histogram((1,)).quantile(0.5), 0)
+
+    def test_request_is_recorded(self):
+        self.client.get(reverse('expenses:dashboard'))
+        histograms = metrics._histograms
+        self.assertGreater(histograms[('db_queries', 'expenses:dashboard')].sum, 0)
+        self.assertGreater(histograms[('db_seconds', 'expenses:dashboard')].sum, 0)
+        self.assertGreater(histograms[('template_seconds', 'expenses:dashboard')].sum, 0)
+        self.assertEqual(histograms[('request_seconds', 'expenses:dashboard')].count, 1)
+
+    def test_nested_renders_are_timed_once(self):
+        engine = engines.all()[0]
+        outer = engine.from_string('{{ card }}')
+        inner = engine.from_string('x')
+
+        class Card:
+            # Renders its own template while the outer one is being timed
+            def __str__(self):
+                return inner.render({})
+
+        clock = iter(range(0, 100, 10))
+        stats = metrics.RequestStats()
+        token = metrics.current_stats.set(stats)
+        try:
+            with patch('expenses.metrics.time.perf_counter', lambda: next(clock)):
+                outer.render({'card': Card()})
+        finally:
+            metrics.current_stats.reset(token)
+        self.assertEqual(stats.template_seconds, 10)
+        self.assertEqual(stats.template_depth, 0)
+
+    def test_endpoint_is_staff_only(self):
+        self.client.get(reverse('expenses:dashboard'))
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 302)
+
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        body = response.content.decode()
+        self.assertIn('# TYPE finance_db_queries summary', body)
+        self.assertIn('finance_request_seconds{view="expenses:dashboard",quantile="0.99"}', body)
+        self.assertIn('finance_db_queries_count{view="expenses:dashboard"} 1', body)
+
+    @override_settings(SLOW_REQUEST_SECONDS=1e-9)
+    def test_slow_request_log(self):
+        with self.assertLogs('expenses.middleware', 'WARNING') as logs:
+            self.client.get(reverse('expenses:dashboard'))
+        self.assertIn('Slow request GET /expenses/ (expenses:dashboard)', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+
+
+@override_settings(
+    SECURE_SSL_REDIRECT=False,
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+)
+class BenchmarkDataTests(TestCase):
+
+    def test_seed_benchmark_data(self):
+        users = seed_benchmark_data(2, 300, days=90, prefix='seed', seed=7)
+        self.assertEqual([user.username for user in users], ['seed_0', 'seed_1'])
+        for user in users:
+            transactions = Transaction.objects.filter(user=user)
+            self.assertEqual(transactions.count(), 300)
+            self.assertTrue(transactions.filter(transaction_type='Income').exists())
+            self.assertTrue(transactions.filter(category__isnull=True).exists())
+            self.assertEqual(
+                sorted(Budget.objects.filter(user=user).values_list('period', flat=True)),
+                sorted(period for period, label in Budget.PERIOD_CHOICES),
+            )
+        self.assertEqual(rollups.verify_rollups(), [])
+
+        delete_users(User.objects.filter(username__startswith='seed_'))
+        self.assertFalse(Transaction.objects.exists())
+        self.assertFalse(MonthlySummary.objects.exists())
+
+    def test_seed_is_reproducible(self):
+        first = seed_benchmark_data(1, 50, prefix='a', seed=3)[0]
+        second = seed_benchmark_data(1, 50, prefix='b', seed=3)[0]
+        fields = ('date', 'amount', 'transaction_type', 'category__name', 'description')
+        self.assertEqual(
+            list(Transaction.objects.filter(user=first).order_by('id').values_list(*fields)),
+            list(Transaction.objects.filter(user=second).order_by('id').values_list(*fields)),
+        )
+
+    def test_run_suite(self):
+        results = benchmarks.run_suite(sizes=[100], repeat=2)
+        self.assertEqual([row['view'] for row in results], [view[0] for view in benchmarks.VIEWS])
+        for row in results:
+            self.assertEqual(row['size'], 100)
+            self.assertGreater(row['queries'], 0)
+            self.assertLessEqual(row['min_ms'], row['p50_ms'])
+
+        pairs = benchmarks.compare_results(results[:1], results)
+        self.assertIs(pairs[0][1], results[0])
+        self.assertIsNone(pairs[1][1])
+
+    def test_time_amount_sums(self):
+        results = benchmarks.time_amount_sums(1000, repeat=1)
+        self.assertEqual(
+            [(row['query'], row['storage']) for row in results],
+            [(query, storage) for query, sql in benchmarks.SUM_QUERIES for storage in ('decimal', 'paise')],
+        )
+        self.assertTrue(all(row['exact'] for row in results))
+
+
+class QueryBudgetTests(FinanceTestCase):
+    """
+    Every view runs a bounded number of queries, whatever the data size
+
+    Each view is requested with a little data and again with a lot; the
+    query count must not change and must stay within the view's budget.
+    """
+
+    # (URL name, method, request data or a function of the test case giving
+    # it, maximum queries)
+    QUERY_BUDGETS = [
+        ('expenses:dashboard', 'get', {}, 3),
+        ('expenses:view_budget', 'get', {}, 6),
+        ('expenses:transactions', 'get', {}, 5),
+        ('expenses:search_transactions', 'get', {}, 5),
+        ('expenses:search_transactions', 'get', {'q': 'coffee'}, 6),
+        ('expenses:quick_add_transaction', 'post', {
+            'category': 'Food & Dining', 'transaction_type': 'Expense', 'amount': '12.00', 'description': 'coffee',
+        }, 8),
+        ('expenses:add_transaction', 'get', {}, 2),
+        ('expenses:import_transactions', 'get', {}, 2),
+        ('expenses:export_transactions', 'get', {}, 5),
+        ('expenses:spending_heatmap', 'get', {}, 4),
+        ('expenses:view_report', 'get', {}, 5),
+        ('expenses:add_transaction', 'post', lambda test: {
+            'category': test.transport.id, 'transaction_type': 'Expense', 'amount': '12.00', 'description': 'coffee',
+        }, 9),
+        ('expenses:add_expense', 'post', {
+            'transaction_type': 'Expense', 'amount': '12.00', 'date': '2026-01-15', 'description': 'coffee',
+        }, 6),
+        ('expenses:import_transactions', 'post', lambda test: {'file': SimpleUploadedFile(
+            'statement.csv', b'Date,Type,Amount,Category,Description\n'
+            b'2026-02-01,Expense,120.50,Food & Dining,Groceries\n2026-02-02,Income,500,Salary,Pay\n',
+        )}, 11),
+    ]
+
+    # (URL name, method, function of the test case giving the URL arguments,
+    # maximum queries) of views consuming a row, so each request gets a new one
+    DELETE_QUERY_BUDGETS = [
+        ('expenses:delete_transaction', 'post',
+         lambda test: [test.add_transaction('5.00', test.food).pk], 7),
+        ('expenses:delete_budget', 'post',
+         lambda test: [Budget.objects.create(user=test.user, category=test.food, amount=Decimal('50.00')).pk], 6),
+    ]
+
+    # Dashboard panel -> maximum queries
+    PANEL_QUERY_BUDGETS = {
+        'balance': 4,
+        'cashflow': 4,
+        'recent': 4,
+        'calendar': 4,
+        'categories': 4,
+    }
+
+    # Rows per model added between the two measurements
+    GROWTH = 30
+
+    def add_data(self, rows, tag):
+        """Add transactions, categories and budgets of every period"""
+        categories = [
+            Category.objects.create(user=self.user, name=f'{tag} {index}', icon='tag', color='#64748b')
+            for index in range(rows)
+        ]
+        for index, category in enumerate(categories):
+            self.add_transaction('10.00', category, description=f'coffee {tag} {index}')
+            self.add_transaction('99.00', transaction_type='Income', description=f'salary {tag} {index}')
+            period = Budget.PERIOD_CHOICES[index % len(Budget.PERIOD_CHOICES)][0]
+            Budget.objects.create(user=self.user, category=category, amount=Decimal('50.00'),
+                                  period=period, start_date=date.today())
+
+    def count_queries(self, url_name, method, data, args=()):
+        # Data or arguments that a request uses up are made anew each time
+        data = data(self) if callable(data) else data
+        args = args(self) if callable(args) else args
+        cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            response = getattr(self.client, method)(reverse(url_name, args=args), data)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertLess(response.status_code, 400, url_name)
+        return captured.captured_queries
+
+    def format_repeated(self, queries):
+        """List statements that ran more than once, ignoring literal values"""
+        shapes = Counter(re.sub(r"\b\d+\b|'[^']*'", '?', query['sql']) for query in queries)
+        return '\n'.join(f'  {count}x {sql}' for sql, count in shapes.most_common() if count > 1)
+
+    def assertQueryBudget(self, url_name, method, data, budget, args=()):
+        # Warm up first; e.g. a write's first call creates its rollup bucket
+        self.count_queries(url_name, method, data, args)
+        small = self.count_queries(url_name, method, data, args)
+        self.add_data(self.GROWTH, 'more')
+        large = self.count_queries(url_name, method, data, args)
+
+        self.assertEqual(
+            len(large), len(small),
+            f"{url_name} ran {len(small)} queries with little data but {len(large)} with more; "
+            f"repeated statements:\n{self.format_repeated(large)}"
+        )
+        self.assertLessEqual(
+            len(large), budget,
+            f"{url_name} ran {len(large)} queries, over its budget of {budget}:\n"
+            + '\n'.join(f"  {query['sql']}" for query in large)
+        )
+
+    def test_query_budgets(self):
+        for url_name, method, data, budget in self.QUERY_BUDGETS:
+            with self.subTest(view=url_name, method=method, data=data), db_transaction.atomic():
+                self.add_data(2, 'initial')
+                self.assertQueryBudget(url_name, method, data, budget)
+                # Start the next view from the same small data set
+                db_transaction.set_rollback(True)
+
+    def test_delete_query_budgets(self):
+        for url_name, method, args, budget in self.DELETE_QUERY_BUDGETS:
+            with self.subTest(view=url_name), db_transaction.atomic():
+                self.add_data(2, 'initial')
+                self.assertQueryBudget(url_name, method, {}, budget, args=args)
+                db_transaction.set_rollback(True)
+
+    def test_dashboard_panel_query_budgets(self):
+        self.assertEqual(self.PANEL_QUERY_BUDGETS.keys(), DASHBOARD_PANELS.keys())
+        for panel, budget in self.PANEL_QUERY_BUDGETS.items():
+            with self.subTest(panel=panel), db_transaction.atomic():
+                self.add_data(2, 'initial')
+                self.assertQueryBudget('expenses:dashboard_panel', 'get', {}, budget, args=[panel])
+                db_transaction.set_rollback(True)
+
+
+class BudgetSpendCounterTests(FinanceTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.today = date.today()
+        self.monthly = Budget.objects.create(
+            user=self.user, category=self.food, amount=Decimal('100.00'), period='monthly')
+        self.yearly = Budget.objects.create(
+            user=self.user, category=self.food, amount=Decimal('1000.00'), period='yearly')
+        self.one_time = Budget.objects.create(
+            user=self.user, category=self.food, amount=Decimal('500.00'),
+            period='one-time', start_date=self.today)
+
+    def assertCountersMatchLedger(self):
+        budgets = [self.monthly, self.yearly, self.one_time]
+        self.assertEqual(get_spent_amounts(budgets), compute_spent_amounts(budgets))
+        out = StringIO()
+        call_command('reconcile_budget_spend', '--dry-run', stdout=out)
+        self.assertIn('Budget counters match the ledger', out.getvalue())
+
+    def test_counters_follow_writes(self):
+        self.assertEqual(BudgetPeriodSpend.objects.count(), 3)
+        expense = self.add_transaction('30.00', self.food)
+        self.add_transaction('999.00', self.food, transaction_type='Income')
+        self.add_transaction('5.00', self.transport)
+        self.assertEqual(get_spent_amounts([self.monthly, self.yearly, self.one_time]),
+                         [Decimal('30.00')] * 3)
+
+        expense.amount = Decimal('45.00')
+        expense.save()
+        self.assertCountersMatchLedger()
+
+        # Moved to another category, then back and before the one-time start
+        expense.category = self.transport
+        expense.save()
+        self.assertEqual(get_spent_amounts([self.monthly]), [Decimal('0.00')])
+        expense.category = self.food
+        expense.date = self.today.replace(day=1) - timedelta(days=1)
+        expense.save()
+        self.assertCountersMatchLedger()
+
+        expense.delete()
+        self.assertCountersMatchLedger()
+
+    def test_counter_lookup_is_single_query(self):
+        self.add_transaction('30.00', self.food)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.monthly.get_spent_amount(), Decimal('30.00'))
+
+    def test_import_updates_counters(self):
+        import_transactions(self.user, [
+            'date,amount,type,category\n',
+            f'{self.today.isoformat()},20.00,expense,Food & Dining\n',
+            f'{self.today.isoformat()},15.00,expense,food & dining\n',
+        ])
+        self.assertEqual(self.monthly.get_spent_amount(), Decimal('35.00'))
+        self.assertCountersMatchLedger()
+
+    def test_editing_budget_recounts(self):
+        self.add_transaction('30.00', self.food)
+        self.add_transaction('7.00', self.transport)
+        self.monthly.category = self.transport
+        self.monthly.save()
+        self.assertEqual(self.monthly.get_spent_amount(), Decimal('7.00'))
+
+    def test_over_budget_check_is_per_period(self):
+        # Last month's spending doesn't count towards this month's budget
+        self.add_transaction('90.00', self.food, on=self.today.replace(day=1) - timedelta(days=1))
+        url = reverse('expenses:add_transaction')
+        data = {'category': self.food.id, 'transaction_type': 'Expense', 'amount': '60.00'}
+        self.assertRedirects(self.client.post(url, data), reverse('expenses:view_budget'))
+
+        response = self.client.post(url, data)
+        self.assertEqual(response.context['error'], 'Transaction exceeds the budget for Food & Dining.')
+        self.assertEqual(self.monthly.get_spent_amount(), Decimal('60.00'))
+
+    def test_reconcile_fixes_drift(self):
+        self.add_transaction('30.00', self.food)
+        BudgetPeriodSpend.objects.filter(budget=self.monthly).update(spent=Decimal('1.00'))
+
+        with self.assertRaises(CommandError):
+            call_command('reconcile_budget_spend', '--dry-run', stdout=StringIO())
+        out = StringIO()
+        call_command('reconcile_budget_spend', '--user', 'alice', stdout=out)
+        self.assertIn('stored=1.00 expected=30', out.getvalue())
+        self.assertCountersMatchLedger()
+
+
+class DailyTotalsTests(FinanceTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.add_transaction('10.00', self.food, on=date(2026, 3, 2))
+        self.add_transaction('5.50', self.transport, on=date(2026, 3, 2))
+        self.add_transaction('100.00', transaction_type='Income', on=date(2026, 3, 2))
+        self.add_transaction('20.00', self.food, on=date(2026, 3, 9))
+        self.add_transaction('99.00', self.food, on=date(2026, 4, 1))
+
+    def test_calendar_days_are_aggregated_in_the_db(self):
+        with patch.object(Transaction, 'from_db', side_effect=AssertionError('materialized')):
+            with self.assertNumQueries(1):
+                days = get_transaction_days(self.user, date(2026, 3, 15))
+        self.assertEqual(days, {
+            2: {'count': 3, 'income': Decimal('100.00'), 'expense': Decimal('15.50')},
+            9: {'count': 1, 'income': Decimal('0'), 'expense': Decimal('20.00')},
+        })
+
+    def test_heatmap_weeks_and_levels(self):
+        heatmap = compute_heatmap(self.user, 2026)
+        cells = [cell for week in heatmap['weeks'] for cell in week]
+        self.assertTrue(all(len(week) == 7 for week in heatmap['weeks']))
+        days = [cell for cell in cells if cell]
+        self.assertEqual(len(days), 365)
+        # 1 January 2026 is a Thursday, so the first week is padded to it
+        self.assertEqual(cells[4]['date'], date(2026, 1, 1))
+        self.assertEqual(cells[:4], [None] * 4)
+
+        by_date = {cell['date']: cell for cell in days}
+        self.assertEqual(by_date[date(2026, 1, 5)]['level'], 0)
+        self.assertEqual(by_date[date(2026, 3, 2)]['level'], 2)
+        self.assertEqual(by_date[date(2026, 3, 9)]['level'], 3)
+        self.assertEqual(by_date[date(2026, 4, 1)]['level'], 4)
+        self.assertEqual(heatmap['active_days'], 3)
+        self.assertEqual(heatmap['total_expense'], Decimal('134.50'))
+
+    def test_heatmap_view_is_cached(self):
+        url = reverse('expenses:spending_heatmap')
+        response = self.client.get(url, {'year': 2026})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Spending in 2026')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url, {'year': 2026})
+        self.assertFalse([query for query in queries if 'expenses_transaction' in query['sql']])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.add_transaction('1.00', self.food, on=date(2026, 6, 1))
+        response = self.client.get(url, {'year': 2026})
+        self.assertEqual(response.context['active_days'], 4)
+
+    @patch('expenses.dashboard.HEATMAP_LEVELS', 2)
+    def test_heatmap_opacity_follows_levels(self):
+        response = self.client.get(reverse('expenses:spending_heatmap'), {'year': 2026})
+        self.assertEqual(response.context['levels'], 2)
+        self.assertEqual(list(response.context['legend_levels']), [1, 2])
+        self.assertContains(response, 'opacity: 50%;')
+        self.assertContains(response, 'opacity: 100%;')
+        self.assertNotContains(response, 'opacity: 25%;')
+
+    def test_heatmap_bad_year(self):
+        url = reverse('expenses:spending_heatmap')
+        self.assertEqual(self.client.get(url, {'year': 'soon'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'year': 0}).status_code, 400)
+
+
+class ReportTests(FinanceTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.today = date(2026, 3, 15)
+        self.add_transaction('1000.00', transaction_type='Income', on=date(2026, 3, 1), description='Salary')
+        self.add_transaction('120.50', self.food, on=date(2026, 3, 2), description='Swiggy order')
+        self.add_transaction('79.50', self.food, on=date(2026, 3, 5), description='  swiggy   ORDER ')
+        self.add_transaction('300.00', self.transport, on=date(2026, 2, 10), description='Uber ride')
+        self.add_transaction('50.00', on=date(2026, 2, 11), description='')
+        self.add_transaction('999.00', self.food, on=date(2025, 12, 31), description='Outside the window')
+
+    def test_report_sections(self):
+        report = reports.compute_report(self.user, 3, self.today)
+        self.assertEqual((report['start'], report['end']), (date(2026, 1, 1), date(2026, 4, 1)))
+        self.assertEqual(report['transaction_count'], 5)
+        self.assertEqual(report['income'], Decimal('1000.00'))
+        self.assertEqual(report['expense'], Decimal('550.00'))
+        self.assertEqual(report['savings_rate'], 45.0)
+
+        self.assertEqual([month['month'] for month in report['monthly_trends']],
+                         [date(2026, 1, 1), date(2026, 2, 1), date(2026, 3, 1)])
+        january, february, march = report['monthly_trends']
+        self.assertEqual((january['count'], january['savings_rate']), (0, None))
+        self.assertEqual((february['expense'], february['net']), (Decimal('350.00'), Decimal('-350.00')))
+        self.assertEqual((march['income'], march['expense'], march['savings_rate']),
+                         (Decimal('1000.00'), Decimal('200.00'), 80.0))
+
+        self.assertEqual(
+            [(row['name'], row['total'], row['count']) for row in report['categories']],
+            [('Transportation', Decimal('300.00'), 1), ('Food & Dining', Decimal('200.00'), 2),
+             ('Uncategorized', Decimal('50.00'), 1)],
+        )
+        self.assertEqual(
+            [(row['name'], row['total'], row['count']) for row in report['top_merchants']],
+            [('Uber ride', Decimal('300.00'), 1), ('Swiggy order', Decimal('200.00'), 2)],
+        )
+
+    def test_empty_report(self):
+        report = reports.compute_report(self.user, 2, date(2020, 6, 1))
+        self.assertEqual(report['transaction_count'], 0)
+        self.assertEqual(report['categories'], [])
+        self.assertEqual(report['top_merchants'], [])
+        self.assertIsNone(report['savings_rate'])
+        self.assertEqual(len(report['monthly_trends']), 2)
+
+    def test_view_is_cached(self):
+        url = reverse('expenses:view_report')
+        response = self.client.get(url, {'months': 24})
+        self.assertContains(response, 'Top Merchants')
+        self.assertEqual(response.context['transaction_count'], 6)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url, {'months': 24})
+        self.assertFalse([query for query in queries if 'expenses_transaction' in query['sql']])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.add_transaction('1.00', self.food)
+        self.assertEqual(self.client.get(url, {'months': 24}).context['transaction_count'], 7)
+
+    def test_bad_months(self):
+        url = reverse('expenses:view_report')
+        for months in ('soon', 0, reports.MAX_REPORT_MONTHS + 1):
+            self.assertEqual(self.client.get(url, {'months': months}).status_code, 400)
+
+
+class TransactionCardCacheTests(FinanceTestCase):
+
+    def setUp(self):
+        super().setUp()
+        card_cache.clear()
+        self.lunch = self.add_transaction('12.00', self.food, description='Lunch')
+        self.ride = self.add_transaction('30.00', self.transport, description='Metro')
+
+    def test_lru_bound_and_stats(self):
+        cache = FragmentCache(2)
+        cache.set(1, 'a', '<one>')
+        cache.set(2, 'a', '<two>')
+        self.assertEqual(cache.get(1, 'a'), '<one>')
+        cache.set(3, 'a', '<three>')  # Evicts 2, the least recently used
+        self.assertIsNone(cache.get(2, 'a'))
+        self.assertIsNone(cache.get(1, 'b'))
+        self.assertEqual(cache.stats(), {
+            'hits': 1, 'misses': 2, 'evictions': 1, 'entries': 2, 'max_entries': 2, 'hit_rate': 1 / 3,
+        })
+
+    def test_list_reuses_cards(self):
+        url = reverse('expenses:search_transactions')
+        first = self.client.get(url).content
+        self.assertEqual(card_cache.stats()['misses'], 2)
+        with patch('expenses.fragments.render_to_string') as render:
+            second = self.client.get(url).content
+        render.assert_not_called()
+        self.assertEqual(first, second)
+        self.assertEqual(card_cache.stats()['hits'], 2)
+
+    def test_changes_render_fresh_cards(self):
+        url = reverse('expenses:search_transactions')
+        self.client.get(url)
+        self.lunch.description = 'Team lunch'
+        self.lunch.save()
+        self.assertContains(self.client.get(url), 'Team lunch')
+
+        self.transport.name = 'Travel'
+        self.transport.save()
+        self.assertContains(self.client.get(url), 'Travel')
+
+        self.client.delete(reverse('expenses:delete_transaction', args=[self.ride.id]))
+        self.assertEqual(card_cache.stats()['entries'], 1)
+
+    def test_stats_are_exported(self):
+        self.client.get(reverse('expenses:transactions'))
+        self.user.is_staff = True
+        self.user.save()
+        body = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('finance_card_cache_misses_total 2', body)
+        self.assertIn('finance_card_cache_entries 2', body)
+
+
+class ConditionalGetTests(FinanceTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.add_transaction('12.00', self.food, description='Lunch')
+
+    def revalidate(self, url, response, **params):
+        with CaptureQueriesContext(connection) as queries:
+            revalidated = self.client.get(url, params, HTTP_IF_NONE_MATCH=response['ETag'])
+        return revalidated, data_queries(queries)
+
+    def test_unchanged_pages_are_not_modified(self):
+        for url_name in ('expenses:dashboard', 'expenses:transactions', 'expenses:search_transactions'):
+            with self.subTest(url_name):
+                url = reverse(url_name)
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('Last-Modified', response)
+                self.assertIn('no-cache', response['Cache-Control'])
+
+                revalidated, queries = self.revalidate(url, response)
+                self.assertEqual(revalidated.status_code, 304)
+                self.assertEqual(revalidated['ETag'], response['ETag'])
+                # Answered before any data query or template render
+                self.assertEqual(queries, [])
+                self.assertEqual(revalidated.templates, [])
+
+    def test_writes_change_the_etag(self):
+        url = reverse('expenses:transactions')
+        response = self.client.get(url)
+        for write in (
+            lambda: self.add_transaction('5.00', self.food),
+            lambda: Budget.objects.create(user=self.user, category=self.food, amount=Decimal('100.00')),
+            lambda: Category.objects.create(user=self.user, name='Pets'),
+        ):
+            with self.captureOnCommitCallbacks(execute=True):
+                write()
+            revalidated, _ = self.revalidate(url, response)
+            self.assertEqual(revalidated.status_code, 200)
+            response = revalidated
+
+    def test_etag_is_per_user(self):
+        url = reverse('expenses:transactions')
+        response = self.client.get(url)
+        self.client.force_login(User.objects.create_user(username='bob', password='secret'))
+        revalidated, _ = self.revalidate(url, response)
+        self.assertEqual(revalidated.status_code, 200)
+
+    def test_version_is_shared_between_processes(self):
+        url = reverse('expenses:transactions')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.add_transaction('5.00', self.food)
+        response = self.client.get(url)
+        # Another worker's cache doesn't have this one's entries
+        cache.clear()
+        revalidated, _ = self.revalidate(url, response)
+        self.assertEqual(revalidated.status_code, 304)
+
+        # A write committed by another process, e.g. a cron command
+        UserDataVersion.objects.filter(user=self.user).update(version=F('version') + 1)
+        revalidated, _ = self.revalidate(url, response)
+        self.assertEqual(revalidated.status_code, 200)
+
+
+@override_settings(REPLICA_DATABASES=['replica1', 'replica2'], REPLICA_PIN_SECONDS=10)
+class ReplicaRoutingTests(FinanceTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.router = ReplicaRouter()
+        self.factory = AsyncRequestFactory()
+
+    def read_database(self, request):
+        return self.router.db_for_read(Transaction)
+
+    def test_router(self):
+        self.assertEqual(self.read_database(None), 'default')
+        self.assertEqual(self.router.db_for_write(Transaction), 'default')
+        self.assertTrue(self.router.allow_migrate('default', 'expenses'))
+        self.assertFalse(self.router.allow_migrate('replica1', 'expenses'))
+
+    def test_read_only_views_use_replicas(self):
+        view = read_from_replicas(self.read_database)
+        self.assertIn(view(self.factory.get('/')), ['replica1', 'replica2'])
+        # Every read of one request goes to the same replica
+        reads = read_from_replicas(lambda request: {self.read_database(request) for _ in range(20)})
+        self.assertEqual(len(reads(self.factory.get('/'))), 1)
+        self.assertEqual(view(self.factory.post('/')), 'default')
+        pinned = self.factory.get('/')
+        pinned.COOKIES[PIN_COOKIE] = '1'
+        self.assertEqual(view(pinned), 'default')
+        # Only for the duration of the view
+        self.assertEqual(self.read_database(None), 'default')
+
+    async def test_async_views_use_replicas(self):
+        async def read_database(request):
+            # Queries run in worker threads, which inherit the routing
+            return await sync_to_async(self.read_database)(request)
+
+        view = read_from_replicas(read_database)
+        self.assertIn(await view(self.factory.get('/')), ['replica1', 'replica2'])
+        self.assertEqual(await view(self.factory.post('/')), 'default')
+
+    def test_etag_version_is_read_from_the_data_replica(self):
+        databases = []
+
+        def get_data_version(user_id):
+            databases.append(self.read_database(None))
+            return 0
+
+        with patch('expenses.conditional.get_data_version', get_data_version):
+            for url in (reverse('expenses:dashboard'), reverse('expenses:search_transactions'),
+                        reverse('expenses:dashboard_panel', args=['calendar'])):
+                self.client.get(url)
+        self.assertEqual(len(databases), 3)
+        self.assertTrue(set(databases) <= {'replica1', 'replica2'}, databases)
+
+    def test_writes_pin_the_browser(self):
+        response = self.client.post(reverse('expenses:quick_add_transaction'), {
+            'category': 'Food & Dining', 'transaction_type': 'Expense', 'amount': '5.00',
+        })
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], 10)
+        self.assertNotIn(PIN_COOKIE, self.client.get(reverse('expenses:dashboard')).cookies)
+
+        with override_settings(REPLICA_DATABASES=[]):
+            response = self.client.post(reverse('expenses:quick_add_transaction'), {
+                'category': 'Food & Dining', 'transaction_type': 'Expense', 'amount': '5.00',
+            })
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+
+class ArchiveTests(FinanceTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.old_year = date.today().year - 3
+        self.salary = self.add_transaction('500.00', transaction_type='Income', on=date(self.old_year, 5, 1),
+                                           description='Old salary')
+        self.lunch = self.add_transaction('40.00', self.food, on=date(self.old_year, 5, 20), description='Old lunch')
+        self.taxi = self.add_transaction('60.00', self.transport, on=date(self.old_year, 7, 3), description='Old taxi')
+        self.coffee = self.add_transaction('5.00', self.food, description='Coffee today')
+        self.budget = Budget.objects.create(user=self.user, category=self.food, amount=Decimal('1000.00'),
+                                            period='one-time', start_date=date(self.old_year, 1, 1))
+
+    def archive(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return archive.archive_transactions(self.user, batch_size=2, **kwargs)
+
+    def restore(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return archive.restore_transactions(self.user, batch_size=2, **kwargs)
+
+    def test_archive_and_restore(self):
+        balance = rollups.get_balance(self.user)
+        self.assertEqual(self.archive(), 3)
+        self.assertEqual(list(Transaction.objects.filter(user=self.user)), [self.coffee])
+        self.assertEqual(ArchivedTransaction.objects.get(pk=self.lunch.pk).category, self.food)
+        self.assertEqual(
+            list(ArchivePeriod.objects.values_list('year', 'month', 'count')),
+            [(self.old_year, 7, 1), (self.old_year, 5, 2)],
+        )
+        self.assertEqual(archive.get_archive_boundary(self.user.id), date(self.old_year, 8, 1))
+        self.assertEqual(rollups.get_balance(self.user), balance)
+        self.assertEqual(rollups.verify_rollups(), [])
+        self.assertEqual(get_spent_amounts([self.budget]), compute_spent_amounts([self.budget]))
+
+        self.assertEqual(self.restore(since=date(self.old_year, 6, 15)), 1)
+        self.assertEqual(archive.get_archive_boundary(self.user.id), date(self.old_year, 6, 1))
+        self.assertEqual(self.restore(), 2)
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 4)
+        self.assertFalse(ArchivePeriod.objects.exists())
+        self.assertEqual(archive.get_archive_boundary(self.user.id), date.min)
+        self.assertEqual(rollups.get_balance(self.user), balance)
+        self.assertEqual(get_search_backend().search(self.user, 'taxi'), [self.taxi.pk])
+
+    def test_boundary_is_read_fresh(self):
+        self.assertEqual(archive.get_archive_boundary(self.user.id), date.min)
+        # As seen by a web worker while archive_transactions runs elsewhere
+        ArchivePeriod.objects.create(user=self.user, year=self.old_year, month=5)
+        self.assertEqual(archive.get_archive_boundary(self.user.id), date(self.old_year, 6, 1))
+
+    def test_queries_span_both_tiers(self):
+        self.archive()
+        pages, cursor = [], None
+        while True:
+            page, cursor = archive.paginate_ledger(self.user, cursor, page_size=2)
+            pages.append([transaction.pk for transaction in page])
+            if cursor is None:
+                break
+        self.assertEqual(pages, [[self.coffee.pk, self.taxi.pk], [self.lunch.pk, self.salary.pk]])
+
+        totals = get_daily_totals(self.user, date(self.old_year, 5, 1), date(self.old_year, 6, 1))
+        self.assertEqual(totals[date(self.old_year, 5, 20)]['expense'], Decimal('40.00'))
+        self.assertEqual(reports.compute_report(self.user, 60, date.today())['transaction_count'], 4)
+
+        lines = b''.join(self.client.get(reverse('expenses:export_transactions')).streaming_content).decode()
+        self.assertEqual([line.split(',')[-1] for line in lines.splitlines()[1:]],
+                         ['Old salary', 'Old lunch', 'Old taxi', 'Coffee today'])
+
+        response = self.client.get(reverse('expenses:search_transactions'), {'q': 'old'})
+        self.assertEqual([transaction.pk for transaction in response.context['transactions']],
+                         [self.taxi.pk, self.lunch.pk, self.salary.pk])
+        self.assertContains(response, 'Archived')
+
+    def test_refinements_match_archived_rows_as_substrings(self):
+        self.archive()
+        self.assertEqual([row[0] for row in get_candidates(self.user, 'ld')],
+                         [self.taxi.pk, self.lunch.pk, self.salary.pk])
+        with CaptureQueriesContext(connection) as captured:
+            narrowed = get_candidates(self.user, 'ld l')
+        self.assertEqual(data_queries(captured), [])
+        self.assertEqual([row[0] for row in narrowed], [self.lunch.pk])
+
+    def test_hot_ranges_skip_the_archive(self):
+        self.archive()
+        cutoff = archive.get_archive_cutoff()
+        with self.assertNumQueries(0):
+            self.assertEqual(archive.get_tiers(self.user.id, cutoff), [Transaction])
+        self.assertEqual(archive.get_tiers(self.user.id), [Transaction, ArchivedTransaction])
+        self.assertEqual(archive.get_tiers(self.user.id, date(self.old_year, 8, 1)), [Transaction])
+        with self.assertRaises(ValueError):
+            archive.archive_transactions(self.user, before=date.today())
+
+    def test_command(self):
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('archive_transactions', '--user', 'alice', stdout=out)
+        self.assertIn('Archived 3 transaction(s)', out.getvalue())
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('archive_transactions', '--restore', '--batch-size', '1', stdout=out)
+        self.assertIn('Restored 3 transaction(s)', out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('archive_transactions', '--before', date.today().isoformat(), stdout=out)
+
+
+class BudgetAlertTests(FinanceTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.food_budget = Budget.objects.create(user=self.user, category=self.food, amount=Decimal('100.00'))
+        Budget.objects.create(user=self.user, category=self.transport, amount=Decimal('100.00'), period='yearly')
+        self.bob = User.objects.create_user(username='bob', password='secret')
+        self.bob_food = Category.objects.get(user=self.bob, name='Food & Dining')
+        Budget.objects.create(user=self.bob, category=self.bob_food, amount=Decimal('10.00'), period='one-time',
+                              start_date=date.today().replace(day=1))
+
+    def test_alerts_are_recorded_once_per_level(self):
+        self.add_transaction('85.00', self.food)
+        self.assertEqual(alerts.evaluate_shard([self.user.id]), {'users': 1, 'budgets': 2, 'alerts': 1})
+        self.assertEqual(alerts.evaluate_shard([self.user.id])['alerts'], 0)
+
+        self.add_transaction('20.00', self.food)
+        self.assertEqual(alerts.evaluate_shard([self.user.id])['alerts'], 1)
+        self.assertEqual(
+            list(BudgetAlert.objects.filter(budget=self.food_budget).order_by('id').values_list('level', 'percentage')),
+            [('warning', 85), ('exceeded', 105)],
+        )
+
+    def test_shard_queries_do_not_grow_with_users(self):
+        Transaction.objects.create(user=self.bob, category=self.bob_food, transaction_type='Expense',
+                                   amount=Decimal('12.00'), date=date.today())
+        self.add_transaction('99.00', self.food)
+        BudgetPeriodSpend.objects.all().delete()
+        with CaptureQueriesContext(connection) as one_user:
+            alerts.evaluate_shard([self.user.id])
+        BudgetPeriodSpend.objects.all().delete()
+        BudgetAlert.objects.all().delete()
+        with CaptureQueriesContext(connection) as two_users:
+            result = alerts.evaluate_shard([self.user.id, self.bob.id])
+        self.assertEqual(len(two_users), len(one_user))
+        self.assertEqual(result, {'users': 2, 'budgets': 3, 'alerts': 2})
+
+        budgets = list(Budget.objects.order_by('id'))
+        self.assertEqual(compute_spent_amounts(budgets),
+                         [compute_spent_amounts([budget])[0] for budget in budgets])
+
+    def test_command_reports_throughput(self):
+        self.add_transaction('150.00', self.food)
+        self.assertEqual(alerts.get_shards(shard_size=1), [[self.user.id], [self.bob.id]])
+        out = StringIO()
+        call_command('evaluate_budget_alerts', '--workers', '1', '--shard-size', '1', stdout=out)
+        self.assertIn('Evaluated 3 budget(s) of 2 user(s) in 2 shard(s) on 1 worker(s)', out.getvalue())
+        self.assertIn('users/s', out.getvalue())
+        self.assertIn('Recorded 1 new alert(s)', out.getvalue())
+
+
+class RecurringTransactionTests(FinanceTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.today = date(2026, 5, 10)
+        self.rent = RecurringTransaction.objects.create(
+            user=self.user, category=self.food, transaction_type='Expense', amount=Decimal('300.00'),
+            description='Rent', frequency='monthly', start_date=date(2026, 1, 31),
+        )
+        self.budget = Budget.objects.create(user=self.user, category=self.food, amount=Decimal('5000.00'),
+                                            period='yearly', start_date=date(2026, 1, 1))
+
+    def materialize(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return recurring.materialize_due(self.today, **kwargs)
+
+    def test_occurrences(self):
+        self.assertEqual(self.rent.next_date, self.rent.start_date)
+        self.assertEqual(recurring.get_due_occurrences(self.rent, self.today), (
+            [date(2026, 1, 31), date(2026, 2, 28), date(2026, 3, 31), date(2026, 4, 30)], date(2026, 5, 31),
+        ))
+        leap = RecurringTransaction(frequency='yearly', start_date=date(2024, 2, 29), next_date=date(2024, 2, 29))
+        self.assertEqual(recurring.get_due_occurrences(leap, date(2026, 12, 31))[0],
+                         [date(2024, 2, 29), date(2025, 2, 28), date(2026, 2, 28)])
+        fortnightly = RecurringTransaction(frequency='weekly', interval=2, start_date=date(2026, 5, 1),
+                                           next_date=date(2026, 5, 1), end_date=date(2026, 5, 20))
+        self.assertEqual(recurring.get_due_occurrences(fortnightly, date(2026, 6, 30)),
+                         ([date(2026, 5, 1), date(2026, 5, 15)], None))
+
+    def test_interval_must_advance(self):
+        stuck = RecurringTransaction(frequency='monthly', interval=0, start_date=date(2026, 1, 31),
+                                     next_date=date(2026, 1, 31))
+        with self.assertRaises(ValueError):
+            recurring.get_due_occurrences(stuck, self.today)
+        with self.assertRaises(ValidationError):
+            stuck.full_clean(exclude=['user', 'transaction_type', 'amount'])
+        with self.assertRaises(IntegrityError), db_transaction.atomic():
+            RecurringTransaction.objects.filter(pk=self.rent.pk).update(interval=0)
+
+    def test_catch_up_is_idempotent(self):
+        self.assertEqual(self.materialize(), {'rules': 1, 'transactions': 4})
+        self.assertEqual(self.materialize(), {'rules': 0, 'transactions': 0})
+        self.assertEqual(
+            list(self.rent.transactions.order_by('date').values_list('date', flat=True)),
+            [date(2026, 1, 31), date(2026, 2, 28), date(2026, 3, 31), date(2026, 4, 30)],
+        )
+        self.rent.refresh_from_db()
+        self.assertEqual(self.rent.next_date, date(2026, 5, 31))
+        self.assertEqual(rollups.verify_rollups(), [])
+        self.assertEqual(get_spent_amounts([self.budget], self.today), [Decimal('1200.00')])
+        self.assertEqual(reconcile_spend(fix=False), [])
+
+        # A rule wound back, e.g. by hand, skips the occurrences it already created
+        RecurringTransaction.objects.filter(pk=self.rent.pk).update(next_date=self.rent.start_date)
+        self.assertEqual(self.materialize(), {'rules': 1, 'transactions': 0})
+
+    def test_cost_follows_due_rules(self):
+        for index in range(3):
+            RecurringTransaction.objects.create(
+                user=self.user, transaction_type='Income', amount=Decimal('10.00'), frequency='daily',
+                start_date=self.today - timedelta(days=index),
+            )
+        RecurringTransaction.objects.create(
+            user=self.user, transaction_type='Income', amount=Decimal('10.00'), start_date=self.today + timedelta(days=1),
+        )
+        self.assertEqual(self.materialize(batch_size=2), {'rules': 4, 'transactions': 10})
+
+        User.objects.create_user(username='bob', password='secret')
+        self.add_transaction('1.00')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(recurring.materialize_due(self.today), {'rules': 0, 'transactions': 0})
+        self.assertEqual(len([query for query in queries if 'SAVEPOINT' not in query['sql']]), 1)
+
+    def test_command(self):
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('materialize_recurring', '--date', '2026-02-28', stdout=out)
+        self.assertIn('Created 2 transaction(s) from 1 due rule(s)', out.getvalue())
+
+
+class MoneyFieldTests(FinanceTestCase):
+
+    def stored_amount(self, transaction):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT amount FROM expenses_transaction WHERE id = %s', [transaction.pk])
+            return cursor.fetchone()[0]
+
+    def test_conversions(self):
+        self.assertEqual(to_paise(Decimal('12.34')), 1234)
+        self.assertEqual(to_paise('0.005'), 0)
+        self.assertEqual(to_paise(7), 700)
+        self.assertEqual(str(to_money(1234)), '12.34')
+        self.assertEqual(str(to_money(0)), '0.00')
+        self.assertEqual(to_money(-5), Decimal('-0.05'))
+
+    def test_amounts_are_stored_in_paise(self):
+        transaction = self.add_transaction('1234.56', self.food)
+        self.assertEqual(self.stored_amount(transaction), 123456)
+        transaction.refresh_from_db()
+        self.assertEqual(transaction.amount, Decimal('1234.56'))
+        self.assertEqual(str(transaction.amount), '1234.56')
+
+        self.add_transaction('0.44', self.food)
+        transactions = Transaction.objects.filter(user=self.user)
+        self.assertEqual(list(transactions.filter(amount__gt=Decimal('0.44')).values_list('amount', flat=True)),
+                         [Decimal('1234.56')])
+        self.assertEqual(transactions.aggregate(total=Sum('amount'))['total'], Decimal('1235.00'))
+        self.assertEqual(transactions.filter(amount__gt=5000).aggregate(total=Sum('amount', default=0))['total'],
+                         Decimal('0.00'))
+
+        Transaction.objects.filter(pk=transaction.pk).update(amount=F('amount') + money(Decimal('0.50')))
+        self.assertEqual(self.stored_amount(transaction), 123506)
+
+
+class WarmStartTests(FinanceTestCase):
+    def test_warm_up_compiles_templates_into_cached_loader(self):
+        timings = warmup.warm_up()
+        self.assertEqual([phase for phase, _, _ in timings], [phase for phase, _ in warmup.WARMUP_PHASES])
+        self.assertFalse([detail for _, _, detail in timings if 'failed' in detail])
+
+        loader = engines.all()[0].engine.template_loaders[0]
+        self.assertIn('expenses/dashboard_tailwind.html', loader.get_template_cache)
+        self.assertIn('expenses/partials/dashboard_calendar.html', loader.get_template_cache)
+        # The warmed templates render as usual
+        self.assertEqual(self.client.get(reverse('expenses:dashboard')).status_code, 200)
+
+    def test_boot_reports_each_phase(self):
+        with override_settings(WARM_START=True), self.assertLogs('expenses.warmup', 'INFO') as logs:
+            application = warmup.get_application(WSGIHandler)
+        self.assertIsInstance(application, WSGIHandler)
+        for phase in ('settings', 'apps', 'middleware', 'urls', 'templates', 'staticfiles', 'database'):
+            self.assertIn(f'{phase} ', logs.output[0])
+
+        _, timings = warmup.boot(WSGIHandler)
+        self.assertEqual([phase for phase, _, _ in timings], ['settings', 'apps', 'middleware'])
+
+    def test_databases_are_connected_only_when_kept(self):
+        settings_dict = connections['default'].settings_dict
+        with patch.dict(settings_dict, CONN_MAX_AGE=0), \
+                patch.object(type(connections['default']), 'ensure_connection') as ensure_connection:
+            self.assertEqual(warmup.connect_databases(), '0 connections, 1 skipped (CONN_MAX_AGE=0)')
+        ensure_connection.assert_not_called()
+        with patch.dict(settings_dict, CONN_MAX_AGE=60):
+            self.assertEqual(warmup.connect_databases(), '1 connections')
+
+    def test_failing_phase_does_not_stop_warm_up(self):
+        def refuse():
+            raise ConnectionError('database is starting up')
+
+        phases = [('database', refuse), ('urls', warmup.resolve_urls)]
+        with patch.object(warmup, 'WARMUP_PHASES', phases), self.assertLogs('expenses.warmup', 'WARNING'):
+            timings = warmup.warm_up()
+        self.assertEqual(timings[0][2], 'failed: database is starting up')
+        self.assertRegex(timings[1][2], r'^\d+ patterns$')
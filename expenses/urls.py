@@ -1,17 +1,26 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
 
 app_name = 'expenses'
 
+# Under ASGI the budget page can run its queries concurrently
+page_views = async_views if settings.ASYNC_VIEWS else views
+
 urlpatterns = [
     path('', views.dashboard, name='dashboard'),
+    path('panels/<slug:panel>/', views.dashboard_panel, name='dashboard_panel'),
+    path('report/', views.view_report, name='view_report'),
+    path('heatmap/', views.spending_heatmap, name='spending_heatmap'),
     path('add/', views.add_expense, name='add_expense'),
     path('add_transaction/', views.add_transaction, name='add_transaction'),
-    path('view_budget/', views.view_budget, name='view_budget'),
+    path('view_budget/', page_views.view_budget, name='view_budget'),
     path('delete_budget/<int:budget_id>/', views.delete_budget, name='delete_budget'),
     path('transactions/', views.all_transactions, name='transactions'),
     path('transactions/delete/<int:transaction_id>/', views.delete_transaction, name='delete_transaction'),
     path('transactions/search/', views.search_transactions, name='search_transactions'),
     path('transactions/quick-add/', views.quick_add_transaction, name='quick_add_transaction'),
+    path('transactions/import/', views.import_transactions, name='import_transactions'),
+    path('transactions/export/', views.export_transactions, name='export_transactions'),
     path('test-tailwind/', views.test_tailwind, name='test_tailwind'),
 ]
@@ -1,12 +1,20 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from .models import Transaction, Budget, Category
+from .budgets import get_spent_amounts, summarize_budgets
+from .archive import paginate_ledger
+from .search import paginate_search
+from .dashboard import DASHBOARD_PANELS, get_calendar_context, get_heatmap, get_panel_data, get_user_categories
+from .caching import get_cached
+from .conditional import condition_on_user_data
+from .routers import read_from_replicas
+from .reports import MAX_REPORT_MONTHS, REPORT_MONTH_CHOICES, REPORT_MONTHS, get_report
+from . import importers, exporters, metrics
 from django.contrib.auth.decorators import login_required
-from django.db.models import Sum, Q, Value
-from django.db.models.functions import Coalesce
+from django.contrib.admin.views.decorators import staff_member_required
 from decimal import Decimal 
-import calendar
+import io
 from datetime import datetime, date
-from django.http import HttpResponse
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 
 
 def test_tailwind(request):
@@ -21,76 +29,66 @@ def index(request):
     return render(request, 'landing.html')
 
 @login_required
+@read_from_replicas
+@condition_on_user_data
 def dashboard(request):
-    # Get the current month and year dynamically
-    current_date = datetime.now()
-    current_month = current_date.month
-    current_year = current_date.year
-
-    # Create a datetime object for the first day of the current month
-    current_month_date = datetime(current_year, current_month, 1)
-
-    # Get all transactions for the current month
-    transactions = Transaction.objects.filter(
-        user=request.user,
-        date__year=current_year,
-        date__month=current_month
-    )
-
-    # Get the last three transactions for the user, ordered by the latest date
-    last_three_transactions = Transaction.objects.filter(user=request.user).order_by('-date')[:5]
-
-    # Calculate incoming and outgoing amounts for the Cash Flow card using Coalesce
-    cashflow = transactions.aggregate(
-        incoming=Coalesce(Sum('amount', filter=Q(transaction_type='Income')), Value(Decimal('0.00'))),
-        outgoing=Coalesce(Sum('amount', filter=Q(transaction_type='Expense')), Value(Decimal('0.00')))
-    )
-    
-    # Calculate total balance (all-time)
-    all_transactions = Transaction.objects.filter(user=request.user)
-    total_balance_data = all_transactions.aggregate(
-        total_income=Coalesce(Sum('amount', filter=Q(transaction_type='Income')), Value(Decimal('0.00'))),
-        total_expense=Coalesce(Sum('amount', filter=Q(transaction_type='Expense')), Value(Decimal('0.00')))
-    )
-    total_balance = total_balance_data['total_income'] - total_balance_data['total_expense']
-
-    # Create a dictionary to store days with transactions
-    transaction_days = {}
-    for transaction in transactions:
-        if transaction.date:  # Ensure the transaction has a valid date
-            day = transaction.date.day
-            if day not in transaction_days:
-                transaction_days[day] = []
-            transaction_days[day].append(transaction)
-
-    # Generate the calendar for the current month
-    cal = calendar.Calendar(firstweekday=6)  # 6 = Sunday
-    month_days = cal.itermonthdays2(current_year, current_month)  # (day, weekday)
-
+    """
+    Dashboard shell; every data panel loads from dashboard_panel via HTMX,
+    so the page renders without running a single aggregate
+    """
     context = {
         'username': request.user.username,
-        'current_month_date': current_month_date,
-        'current_year': current_year,
-        'current_date': current_date,
-        'month_days': month_days,
-        'transaction_days': transaction_days,
-        'last_three_transactions': last_three_transactions,
-        'cashflow': cashflow,
-        'total_balance': total_balance,
-        'monthly_income': cashflow['incoming'],
-        'monthly_expense': cashflow['outgoing'],
-        'user_categories': Category.objects.filter(user=request.user).order_by('name'),
+        **get_calendar_context(datetime.now()),
     }
     return render(request, 'expenses/dashboard_tailwind.html', context)
 
 
 @login_required
+@read_from_replicas
+@condition_on_user_data
+def dashboard_panel(request, panel):
+    """One dashboard panel (balance, cash flow, recent activity, calendar or categories), via HTMX"""
+    if panel not in DASHBOARD_PANELS:
+        raise Http404(f"No dashboard panel named {panel}")
+    current_date = datetime.now()
+    context = {
+        **get_calendar_context(current_date),
+        # Cached per panel and user data version
+        **get_panel_data(request.user, panel, current_date.date()),
+    }
+    return render(request, f'expenses/partials/dashboard_{panel}.html', context)
+
+
+@login_required
+@read_from_replicas
+def spending_heatmap(request):
+    """Year-long daily spending heatmap for the dashboard, via HTMX"""
+    try:
+        year = int(request.GET.get('year', datetime.now().year))
+    except ValueError:
+        return HttpResponse('', status=400)
+    if not date.min.year <= year < date.max.year:
+        return HttpResponse('', status=400)
+
+    heatmap = get_heatmap(request.user, year)
+    return render(request, 'expenses/partials/spending_heatmap.html', {
+        'year': year,
+        'current_year': datetime.now().year,
+        # Legend shades, matching the levels the cells were bucketed into
+        'legend_levels': range(1, heatmap['levels'] + 1),
+        **heatmap,
+    })
+
+
+@login_required
+@condition_on_user_data
 def all_transactions(request):
-    # Fetch all transactions for the user, ordered by the latest date
-    transactions = Transaction.objects.filter(user=request.user).order_by('-date')
+    # Fetch the first page of transactions; later pages load via search_transactions
+    transactions, next_cursor = paginate_ledger(request.user)
 
     context = {
         'transactions': transactions,
+        'next_cursor': next_cursor,
         'user_categories': Category.objects.filter(user=request.user).order_by('name'),
     }
     return render(request, 'expenses/transactions_tailwind.html', context)
@@ -112,14 +110,12 @@ def add_transaction(request):
             # Fallback: create a new category if it doesn't exist
             category = None
 
-        # Check if the transaction is an expense and exceeds the budget
+        # Check if the transaction is an expense and exceeds any budget for its
+        # category in the current period (one counter row per budget)
         if transaction_type == 'Expense' and category:
-            budget = Budget.objects.filter(user=request.user, category=category).first()
-            if budget:
-                total_expenses = Transaction.objects.filter(
-                    user=request.user, category=category, transaction_type='Expense'
-                ).aggregate(Sum('amount'))['amount__sum'] or Decimal(0)
-                if total_expenses + amount > budget.amount:
+            budgets = list(Budget.objects.filter(user=request.user, category=category))
+            for budget, spent in zip(budgets, get_spent_amounts(budgets)):
+                if spent + amount > budget.amount:
                     categories = Category.objects.filter(user=request.user).order_by('name')
                     return render(request, 'expenses/add_transaction.html', {
                         'categories': categories,
@@ -179,72 +175,65 @@ def add_expense(request):
     return render(request, 'expenses/add_transaction.html')
 
 
-@login_required
-def view_budget(request):
-    budgets = Budget.objects.filter(user=request.user)
+def save_budget(request):
+    """Create or update a budget from the budget page form"""
     current_date = date.today()
+    category_name = request.POST.get('category')
+    budget_id = request.POST.get('budget_id')
+    amount = request.POST.get('amount')
+    period = request.POST.get('period', 'monthly')
 
-    # Calculate budget summary with monthly logic
-    budget_summary = []
-    for budget in budgets:
-        spent = budget.get_spent_amount()
-        remaining = budget.get_remaining_amount()
-        percentage = budget.get_percentage_used()
-        period_text = budget.get_period_display_text()
-        status_color = budget.get_status_color()
-        
-        budget_summary.append({
-            'id': budget.id,
-            'category': budget.category.name,
-            'total_budget': budget.amount,
-            'total_expenses': spent,
-            'remaining_budget': remaining,
-            'percentage': percentage,
-            'period_text': period_text,
-            'status_color': status_color,
-            'period': budget.period,
-        })
-
-    if request.method == 'POST':
-        category_name = request.POST.get('category')
-        budget_id = request.POST.get('budget_id')
-        amount = request.POST.get('amount')
-        period = request.POST.get('period', 'monthly')
-
-        if budget_id:  # Update existing budget
-            try:
-                budget = Budget.objects.get(id=budget_id, user=request.user)
-                # Get or create category
-                category, created = Category.objects.get_or_create(
-                    user=request.user,
-                    name=category_name,
-                    defaults={'icon': 'tag', 'color': '#64748b'}
-                )
-                budget.category = category
-                budget.amount = amount
-                budget.period = period
-                budget.save()
-            except Budget.DoesNotExist:
-                pass
-        else:  # Add new budget
+    if budget_id:  # Update existing budget
+        try:
+            budget = Budget.objects.get(id=budget_id, user=request.user)
+            # Get or create category
             category, created = Category.objects.get_or_create(
                 user=request.user,
                 name=category_name,
                 defaults={'icon': 'tag', 'color': '#64748b'}
             )
-            Budget.objects.create(
-                user=request.user,
-                category=category,
-                amount=amount,
-                period=period,
-                start_date=current_date
-            )
+            budget.category = category
+            budget.amount = amount
+            budget.period = period
+            budget.save()
+        except Budget.DoesNotExist:
+            pass
+    else:  # Add new budget
+        category, created = Category.objects.get_or_create(
+            user=request.user,
+            name=category_name,
+            defaults={'icon': 'tag', 'color': '#64748b'}
+        )
+        Budget.objects.create(
+            user=request.user,
+            category=category,
+            amount=amount,
+            period=period,
+            start_date=current_date
+        )
 
-        return redirect('expenses:view_budget')
+    return redirect('expenses:view_budget')
+
+
+@login_required
+@read_from_replicas
+def view_budget(request):
+    if request.method == 'POST':
+        return save_budget(request)
+
+    current_date = date.today()
+
+    # Spent/remaining/status for every budget in one grouped query
+    budgets = Budget.objects.filter(user=request.user).select_related('category')
+    budget_summary = get_cached(
+        request.user.id, 'budget_summary',
+        lambda: summarize_budgets(budgets, current_date),
+        current_date,
+    )
 
     context = {
         'budget_summary': budget_summary,
-        'categories': Category.objects.filter(user=request.user).order_by('name'),
+        'categories': get_user_categories(request.user),
         'current_date': current_date,
     }
     return render(request, 'expenses/view_budget_tailwind.html', context)
@@ -280,26 +269,46 @@ def add_budget(request):
     return render(request, 'expenses/add_budget.html', {'categories': categories})
 
 @login_required
+@read_from_replicas
 def view_report(request):
-    transactions = Transaction.objects.filter(user=request.user)
-    return render(request, 'expenses/report.html', {'transactions': transactions})
+    """Monthly trends, category breakdown, savings rate and top merchants"""
+    try:
+        months = int(request.GET.get('months', REPORT_MONTHS))
+    except ValueError:
+        return HttpResponse('', status=400)
+    if not 1 <= months <= MAX_REPORT_MONTHS:
+        return HttpResponse('', status=400)
+
+    context = {
+        'months': months,
+        'month_choices': REPORT_MONTH_CHOICES,
+        # Cached per user data version
+        **get_report(request.user, months, date.today()),
+    }
+    return render(request, 'expenses/report.html', context)
 
 
 @login_required
+@read_from_replicas
+@condition_on_user_data
 def search_transactions(request):
-    """Search transactions by category or description"""
+    """Search transactions by category or description, one page at a time"""
     query = request.GET.get('q', '').strip()
-    
-    transactions = Transaction.objects.filter(user=request.user).order_by('-date')
-    
-    if query:
-        transactions = transactions.filter(
-            Q(category__name__icontains=query) | 
-            Q(description__icontains=query)
-        )
+    cursor = request.GET.get('cursor')
+
+    try:
+        if query:
+            # Ranked matches from the search backend's index
+            transactions, next_cursor = paginate_search(request.user, query, cursor)
+        else:
+            transactions, next_cursor = paginate_ledger(request.user, cursor)
+    except ValueError:
+        return HttpResponse('', status=400)
     
     return render(request, 'expenses/partials/transaction_list_tailwind.html', {
-        'transactions': transactions
+        'transactions': transactions,
+        'next_cursor': next_cursor,
+        'query': query,
     })
 
 
@@ -337,3 +346,47 @@ def quick_add_transaction(request):
         })
     
     return HttpResponse('', status=400)
+
+
+@login_required
+def import_transactions(request):
+    """Import transactions from an uploaded CSV or OFX file"""
+    result = None
+    if request.method == 'POST' and request.FILES.get('file'):
+        upload = request.FILES['file']
+        file_format = request.POST.get('format')
+        if file_format not in importers.READERS:
+            file_format = 'ofx' if upload.name.lower().endswith(('.ofx', '.qfx')) else 'csv'
+
+        # Django spools large uploads to disk; read them back line by line
+        lines = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        result = importers.import_transactions(request.user, lines, file_format)
+
+    return render(request, 'expenses/import_transactions.html', {'result': result})
+
+
+@login_required
+def export_transactions(request):
+    """Stream the user's transactions as CSV or NDJSON, optionally filtered"""
+    file_format = request.GET.get('format', 'csv')
+    if file_format not in exporters.FORMATS:
+        return HttpResponse('', status=400)
+
+    try:
+        start = date.fromisoformat(request.GET['start']) if request.GET.get('start') else None
+        end = date.fromisoformat(request.GET['end']) if request.GET.get('end') else None
+        category_ids = [int(category_id) for category_id in request.GET.getlist('category')]
+    except ValueError:
+        return HttpResponse('', status=400)
+
+    stream, content_type, extension = exporters.FORMATS[file_format]
+    rows = exporters.get_export_rows(request.user, start, end, category_ids)
+    response = StreamingHttpResponse(stream(rows), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="transactions.{extension}"'
+    return response
+
+
+@staff_member_required
+def metrics_endpoint(request):
+    """Per-view latency, query and render time percentiles in Prometheus text format"""
+    return HttpResponse(metrics.render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,177 @@
+"""
+Warm start for web workers
+
+A fresh worker otherwise pays on its first requests for resolving the
+URLconfs, compiling templates into the cached loader, reading the static
+files manifest and connecting to the database. boot() does all of that
+while the worker starts, timing each phase, and get_application() logs the
+breakdown. `python -m expenses.warmup` boots a fresh interpreter and
+prints its timings for manage.py warmup.
+"""
+import json
+import logging
+import time
+from pathlib import Path
+
+import django
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def resolve_urls():
+    """Import every URLconf and build the resolver's lookup tables"""
+    from django.urls import URLResolver, get_resolver
+
+    def count_patterns(patterns):
+        return sum(
+            count_patterns(pattern.url_patterns) if isinstance(pattern, URLResolver) else 1
+            for pattern in patterns
+        )
+
+    resolver = get_resolver()
+    resolver.reverse_dict  # Populates nested resolvers too
+    return f'{count_patterns(resolver.url_patterns)} patterns'
+
+
+def compile_templates():
+    """Compile the project's own templates into each engine's cached loader"""
+    from django.template import TemplateSyntaxError, engines
+
+    base_dir = Path(settings.BASE_DIR).resolve()
+    compiled = failed = 0
+    for engine in engines.all():
+        for directory in engine.template_dirs:
+            directory = Path(directory).resolve()
+            # Skip Django's and third-party apps' templates
+            if not directory.is_relative_to(base_dir) or not directory.is_dir():
+                continue
+            for path in sorted(directory.rglob('*.html')):
+                name = path.relative_to(directory).as_posix()
+                try:
+                    engine.get_template(name)
+                    compiled += 1
+                except TemplateSyntaxError as exc:
+                    logger.warning("Warm start could not compile %s: %s", name, exc)
+                    failed += 1
+    return f'{compiled} templates' + (f', {failed} failed' if failed else '')
+
+
+def load_static_manifest():
+    """Load the staticfiles manifest that {% static %} looks hashed names up in"""
+    from django.contrib.staticfiles.storage import staticfiles_storage
+
+    return f"{len(getattr(staticfiles_storage, 'hashed_files', {}))} manifest entries"
+
+
+def connect_databases():
+    """
+    Open this thread's connection to every database kept between requests
+
+    Databases with CONN_MAX_AGE 0 (the default) are skipped: Django closes
+    their connections at the end of the first request anyway.
+    """
+    from django.db import connections
+
+    connected = skipped = 0
+    for connection in connections.all():
+        if connection.settings_dict['CONN_MAX_AGE'] == 0:
+            skipped += 1
+            continue
+        connection.ensure_connection()
+        connected += 1
+    return f'{connected} connections' + (f', {skipped} skipped (CONN_MAX_AGE=0)' if skipped else '')
+
+
+# (phase, function) run by warm_up() in order; each returns a short detail
+WARMUP_PHASES = [
+    ('urls', resolve_urls),
+    ('templates', compile_templates),
+    ('staticfiles', load_static_manifest),
+    ('database', connect_databases),
+]
+
+
+def timed(timings, phase, function):
+    """Run function, appending (phase, seconds, '') to timings"""
+    started = time.perf_counter()
+    result = function()
+    timings.append((phase, time.perf_counter() - started, ''))
+    return result
+
+
+def warm_up():
+    """
+    Run every warm-up phase, carrying on past a failing one
+
+    A phase that fails (e.g. the database not accepting connections yet)
+    only leaves that cost to the first request, so the worker still starts.
+
+    Returns:
+        List of (phase, seconds, detail)
+    """
+    timings = []
+    for phase, function in WARMUP_PHASES:
+        started = time.perf_counter()
+        try:
+            detail = function()
+        except Exception as exc:
+            logger.warning("Warm start phase %s failed: %s", phase, exc)
+            detail = f'failed: {exc}'
+        timings.append((phase, time.perf_counter() - started, detail))
+    return timings
+
+
+def boot(handler_class, warm=None):
+    """
+    Load settings and apps, build the request handler and optionally warm it
+
+    Args:
+        handler_class: WSGIHandler or ASGIHandler
+        warm: Whether to run warm_up(); defaults to the WARM_START setting
+
+    Returns:
+        (application, timings), timings a list of (phase, seconds, detail)
+    """
+    timings = []
+    timed(timings, 'settings', lambda: settings.INSTALLED_APPS)
+    timed(timings, 'apps', lambda: django.setup(set_prefix=False))
+    # Middleware is instantiated here, e.g. WhiteNoise scanning static files
+    application = timed(timings, 'middleware', handler_class)
+    if warm is None:
+        warm = getattr(settings, 'WARM_START', False)
+    if warm:
+        timings.extend(warm_up())
+    return application, timings
+
+
+def format_timings(timings):
+    """One-line boot report, e.g. 'settings 40.1ms, apps 210.5ms (…), total 251ms'"""
+    phases = ', '.join(
+        f'{phase} {seconds * 1000:.1f}ms' + (f' ({detail})' if detail else '')
+        for phase, seconds, detail in timings
+    )
+    return f"{phases}, total {sum(seconds for _, seconds, _ in timings) * 1000:.0f}ms"
+
+
+def get_application(handler_class):
+    """
+    Boot the application for finance_tracker.wsgi/asgi and log its timings
+
+    Args:
+        handler_class: WSGIHandler or ASGIHandler
+
+    Returns:
+        The application
+    """
+    application, timings = boot(handler_class)
+    logger.info("Worker booted: %s", format_timings(timings))
+    return application
+
+
+if __name__ == '__main__':
+    from django.core.handlers.wsgi import WSGIHandler
+
+    _, timings = boot(WSGIHandler, warm=True)
+    # Last line of output; settings may print before it
+    print(json.dumps(timings))
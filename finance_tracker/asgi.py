@@ -9,8 +9,12 @@ https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+from django.core.handlers.asgi import ASGIHandler
+
+from expenses.warmup import get_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'finance_tracker.settings')
 
-application = get_asgi_application()
+# Same as get_asgi_application(), plus the warm start (WARM_START) and a
+# per-phase boot time report; see expenses/warmup.py
+application = get_application(ASGIHandler)
@@ -39,6 +39,67 @@ else:
     }
     print("✅ Using SQLite Database")
 
+# Seconds a worker keeps its database connection between requests (0 closes
+# it after each one); a warm start only connects up front when this is set
+DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('CONN_MAX_AGE', '0'))
+
+# Read replicas (optional): comma-separated replica hosts (host[:port]) when
+# using PostgreSQL, or database file paths when using SQLite. Read-only views
+# read from them; see expenses/routers.py
+REPLICA_DATABASES = []
+for index, replica in enumerate(filter(None, os.environ.get('DATABASE_REPLICAS', '').split(',')), 1):
+    alias = f'replica{index}'
+    if USE_DOCKER:
+        host, _, port = replica.strip().partition(':')
+        DATABASES[alias] = {**DATABASES['default'], 'HOST': host, 'PORT': port or DATABASES['default']['PORT']}
+    else:
+        DATABASES[alias] = {**DATABASES['default'], 'NAME': replica.strip()}
+    # Tests run replica reads against the test primary
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+    REPLICA_DATABASES.append(alias)
+
+if REPLICA_DATABASES:
+    DATABASE_ROUTERS = ['expenses.routers.ReplicaRouter']
+    print(f"✅ Reading from {len(REPLICA_DATABASES)} replica(s)")
+
+# Seconds a browser keeps reading from the primary after it writes; should
+# exceed the replicas' replication lag
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', '10'))
+
+# Cache for per-user dashboard/budget data. Defaults to a bounded in-process
+# cache, fine for a single process; deployments with several workers or
+# instances must point CACHE_BACKEND/CACHE_LOCATION at file-based or Redis
+# storage to share it (Redis bounds itself via maxmemory). manage.py check
+# --deploy warns otherwise (expenses/checks.py).
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'finance-tracker'),
+        'TIMEOUT': int(os.environ.get('CACHE_TIMEOUT', '300')),
+    }
+}
+if 'redis' not in CACHE_BACKEND:
+    CACHES['default']['OPTIONS'] = {
+        'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', '5000')),
+    }
+
+# Rendered transaction cards kept per process by the fragment cache
+FRAGMENT_CACHE_SIZE = int(os.environ.get('FRAGMENT_CACHE_SIZE', '5000'))
+
+# Calendar years of transactions kept in the live table, counting the current
+# one; manage.py archive_transactions moves older ones to the archive table
+ARCHIVE_HOT_YEARS = int(os.environ.get('ARCHIVE_HOT_YEARS', '2'))
+
+# Serve the budget page from an async view (expenses/async_views.py).
+# Only worth enabling under ASGI, e.g. uvicorn finance_tracker.asgi:application
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', 'False') == 'True'
+
+# Warm each web worker before it takes traffic: resolve the URLconfs, compile
+# the project's templates, load the static manifest and connect to the
+# databases; see expenses/warmup.py and manage.py warmup
+WARM_START = os.environ.get('WARM_START', 'False') == 'True'
+
 ALLOWED_HOSTS = os.environ.get('ALLOWED_HOSTS', 'localhost,127.0.0.1').split(',')
 
 if not DEBUG:
@@ -73,6 +134,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its timings cover the whole stack; see /metrics/
+    'expenses.middleware.InstrumentationMiddleware',
+    # One data version read per request; see expenses/caching.py
+    'expenses.middleware.DataVersionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -82,13 +147,18 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'django_htmx.middleware.HtmxMiddleware',
+    'expenses.middleware.ReplicaPinMiddleware',
 ]
 
+# Requests slower than this are logged with their slowest SQL (0 disables)
+SLOW_REQUEST_SECONDS = float(os.environ.get('SLOW_REQUEST_SECONDS', '1.0'))
+
 ROOT_URLCONF = 'finance_tracker.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates plus render timing for InstrumentationMiddleware
+        'BACKEND': 'expenses.metrics.InstrumentedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
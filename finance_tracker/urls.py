@@ -6,5 +6,6 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('users/', include('users.urls')),
     path('expenses/', include('expenses.urls')),
+    path('metrics/', expense_views.metrics_endpoint, name='metrics'),
     path('', expense_views.index, name='home'),
 ]
@@ -9,8 +9,12 @@ https://docs.djangoproject.com/en/5.1/howto/deployment/wsgi/
 
 import os
 
-from django.core.wsgi import get_wsgi_application
+from django.core.handlers.wsgi import WSGIHandler
+
+from expenses.warmup import get_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'finance_tracker.settings')
 
-application = get_wsgi_application()
+# Same as get_wsgi_application(), plus the warm start (WARM_START) and a
+# per-phase boot time report; see expenses/warmup.py
+application = get_application(WSGIHandler)